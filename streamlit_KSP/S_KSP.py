@@ -9,13 +9,12 @@
 # - 불필요한 슬라이더/옵션 제거: 워드클라우드 소스 고정, Top-K 조절/Jeffreys+롤링 윈도 조절 제거
 # - FIX: with/else 들여쓰기 정리, 블록 사이에 코드 삽입으로 인한 SyntaxError 해결
 # ===============================================
-import os, io, re, json, urllib.request, hashlib, pathlib, copy, colorsys
+import os, io, re, hashlib, colorsys, fnmatch
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 os.environ.setdefault("HF_HUB_DISABLE_TELEMETRY", "1")
 os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "True")
-from typing import List, Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional
 from collections import Counter, defaultdict, OrderedDict
-import urllib.request
 from pathlib import Path
 import traceback, platform, numpy as np
 import pandas as pd
@@ -31,13 +30,58 @@ import plotly.graph_objects as go
 from matplotlib import font_manager, rcParams
 import math
 from sklearn.feature_extraction.text import TfidfVectorizer
-from functools import lru_cache     
+from functools import lru_cache
+
+
+# --------------------- 캐시 레지스트리 ---------------------
+# 캐시 함수를 네임스페이스에 등록하고, 리로드 버튼은 해당 네임스페이스와 그 하위만 비운다.
+# (전역 st.cache_data.clear()는 세계 GeoJSON/폰트/브리프까지 모든 세션에서 날려버림)
+CACHE_DEPS = {                   # 네임스페이스 → 이것이 바뀌면 같이 무효화할 하위 네임스페이스
+    "data":     ["bridges"],     # 원본 프레임/파일 탐색
+    "bridges":  ["keywords"],    # 문서↔국가/연도 브리지, 코퍼스 인덱스
+    "keywords": ["figures"],     # 키워드×연도 표, 대비 키워드
+    "figures":  [],              # 렌더링 결과(지도/차트)
+    "briefs":   [],              # 국가/ICT 유형 브리프 노트북
+    "geo":      [],              # 세계 경계 GeoJSON
+    "fonts":    [],              # 한글 폰트 탐색
+}
+_CACHE_FUNCS: dict = defaultdict(list)   # 이번 실행에서 등록된 캐시 함수(리런마다 새로 채워짐)
+_CACHE_PENDING: set = set()              # 무효화 요청됐지만 아직 정의되지 않은 네임스페이스
+
+def cached(ns: str, resource: bool = False, **kw):
+    """st.cache_data / st.cache_resource + 네임스페이스 등록"""
+    assert ns in CACHE_DEPS, ns
+    deco = st.cache_resource if resource else st.cache_data
+    def wrap(fn):
+        f = deco(**kw)(fn)
+        _CACHE_FUNCS[ns].append(f)
+        if ns in _CACHE_PENDING:   # 버튼이 정의보다 위에 있는 경우: 첫 호출 전에 비움
+            f.clear()
+        return f
+    return wrap
+
+def cache_subgraph(ns: str) -> list[str]:
+    out, stack = [], [ns]
+    while stack:
+        cur = stack.pop()
+        if cur not in out:
+            out.append(cur); stack.extend(CACHE_DEPS[cur])
+    return out
+
+def invalidate_cache(ns: str) -> list[str]:
+    """ns와 의존 네임스페이스만 비움(다른 세션도 같은 전역 캐시를 보므로 그 범위만 재계산)"""
+    spaces = cache_subgraph(ns)
+    _CACHE_PENDING.update(spaces)
+    for s in spaces:
+        for f in _CACHE_FUNCS[s]:
+            f.clear()
+    return spaces
 
 
 # --------------------- 페이지/테마 ---------------------
 st.set_page_config(page_title="KSP Explorer (Pro v4)", layout="wide", page_icon="🌍")
 
-@st.cache_resource
+@cached("fonts", resource=True)
 def resolve_korean_font() -> str | None:
     # 1) 리포에 동봉된 폰트 우선
     candidates = [
@@ -138,36 +182,15 @@ st.title("KSP Explorer 🌍 — Pro v4")
 
 
 
-# --------------------- 불용어 ---------------------
-STOP = {
-    "및","등","관련","수립","방안","개선","전략","지원","정책","사업","프로젝트","제도", "한국과", "멕시코의", "향상을", "프로젝트는", "현대화를", "헬프데스크와", "기능", "상승", "탑재", "과제", "100위에서", "모니터링을", "공유", "지적", "높은", "28중", "미흡", "9대항목",
-    "구축","도입","개요","현황","위한","활용","분석","제공","개발","기반","디지털","data", "근거", "경험", "67소", "9대", "3그룹", "제도적", "변화", "기관", "조사", "부문", "확대", "기업", "혁신을", "활용한", "등이다", "효과는", "경험을", "방안을",
-    "데이터","system","정부","ksp","koica","kdi","idb","ebrd","wb","adb","국가","한국", "제도와", "시스템을", "검색", "전문가", "업체", "사업은", "제도개선을", "로드맵과", "설문을", "디지털정부의", "체계를", "순위", "순위가", "80위로", "필요성", "표준", "기관의", "28중항목",
-    "연구","보고","최종","중간","성과","향상","제고","도움","차세대","로드맵","운영","서비스", "바탕으로", "말레이시아의", "진단하고", "정부와", "KSP는", "지원했다", "한국의", "시스템", "회의", "논의", "참여", "시스템과", "KSP에서", "참고하여", "구축을", "방문", "풀텍스트",
-    "라오스","2030","ntca","to be","헝가리","be","사례","모델","산업", "비교", "강조", "최종보고", "위해", "연수", "비전", "개최", "협의", "제2", "구축", "권고", "문제", "온나라", "중앙", "도입과", "하부", "성장", "등을", '품질', "연구개발과", "거버넌스를", "설립",
-    "격차","해소","역량","강화","실행계획","연금","vision","실용신안", "평가", "제시", "통해", "설치", "제시했다", "권고하며", "분석하고", "시스템의", "개선안을", "했다", "통해", "목표로", "향상과", "제안", "관리", "통합", "협력", "제안하였다", "체계", "비교하여", "설명가능",
-    "가지", "장기", "투명성과", "기대했다", "진행되었으며", "전환과", "마련했다", "모델로", "협의와", "비교와", "개발을", "이후", "마련", "부족을", "수립을", "사례를", "정부와", "프레임워크", "통한", "기반으로", "카하", "발전", "제안했다", "제시하고", "정책을", "화상회의를",
-    "적용", "포털", "수립하였다", "것이다", "도입을", "정부의", "성숙도", "과정", "계획을", "희수", "따른", "계획과", "TV", "새로운", "중소기업의", "자료", "추정", "안정", "선정", "경쟁력", "전략을", "현황을", "개선을", "활성화를", "To", "검토", "실행계획과", "단계별",
-    "강화와", "현행", "생태계를", "현황과", "가치평가", "전환에", "활동", "국민", "포함", "기본계획", "접근성", "전환", "할당", "양국", "효과", "추진", "협력과", "이용계획", "담은", "로드맵을", "제시하였다", "WASH", "기술", "기대효과", "가나의", "솔루션을", "수행하였다", "분야",
-    "67소항목으로", "분야", "진단", "중복조사와", "사용", "항목", "포용적", "규제", "기업들의", "혁신", "라오스의", "메콩강", "베트남의", "통계", "처리", "제도의", "제안합니다", "유역의", "이를", "강화를", "있습니다", "폐기물", "필리핀의", "tuneps", "표준화", "재정감사감독청", "이집트의",
-    "개혁을", "체계적으로", "dur", "파라과이의", "과테말라의", "제안한다", "보고서는", "강화하고", "국가들의", "회원국", "도출했습니다", "분석하여", "팀은", "제안한다", "것을", "제시한다", "국가들의", "우즈베키스탄의", "검토하였습니다", "낮은", "그룹", "경쟁력을", "강조한다", "중요성을",
-    "핵심", "수동", "지연", "그리고", "또한", "보고서입니다", "겪고", "인해", "현재", "다니는", "다룬다", "중심으로", "가능한", "한다", "위치", "부문의", "가장", "온두라스의", "운영을", "센터", "특히", "참여를", "등록", "초점을", "지원을", "제시했습니다", "행정의",
-    "접근성을", "발생하는", "수립합니다", "제시합니다", "성공적인", "효율적인", "전환을", "대응", "자문을", "합니다", "기술을", "서비스에", "등의", "주요", "분절된", "시스템은", "기능이", "세르비아의", "방글라데시의", "강화하기", "체계적인", "문제를", "지원합니다", "높이는", "기본", "단지의", "산업의",
-    "미흡한", "시스템이", "비롯한", "다각화와", "타지키스탄은", "타지키스탄의", "정보", "이에", "따라", "실정입니다", "데이터의", "데이터를", "공유하고", "것입니다", "궁극적으로", "기여할", "정확성을", "자동화하여", "수립의", "공유를", "융합하여", "부문을", "지속", "달성하도록", "성장을", "돕는", "산업과",
-    "경제에서", "경제로", "전환하고자", "그러나" ,"부문은", "부족으로", "잠재력을", "충분히", "활용하지", "못하고", "호주는", "호주의", "분야에서", "인도네시아는", "문제점을", "효율성을", "것으로", "지역의", "벤치마킹하여", "기대됩니다"
-}
-STOP_LOW = {w.lower() for w in STOP}
-
-# ---- Trend config (safe defaults; can be overridden later) ----
-# 코드 어디서든 참조해도 NameError가 안 나도록 안전 기본값을 먼저 깔아둔다.
-YEAR_SOURCE = globals().get("YEAR_SOURCE", None)   # 예: "연도"로 바꾸면 해당 컬럼만 사용
-STOP_CUSTOM = globals().get("STOP_CUSTOM", set())  # 코드에서 직접 추가할 불용어
-BASE_STOP   = globals().get("BASE_STOP", set())
-
-STOP_LOW_ALL = (
-    {w.lower() for w in STOP} |
-    {w.lower() for w in STOP_CUSTOM} |
-    {w.lower() for w in BASE_STOP}
+# --------------------- 전처리 코어 ---------------------
+# 불용어 / 컬럼 정규화 / 스냅샷 적재 / 명사 필터 / 국가 매핑 / 연도·해시태그 파서 / 증분 코퍼스 인덱스는
+# ksp_core.py(오프라인 빌드 CLI ksp_build.py와 공유). 규칙을 바꿀 때는 그쪽을 고칠 것.
+from ksp_core import (
+    STOP, STOP_LOW, STRONG_STOP,
+    load_path_split, load_bytes_split, corpus_digests, TextStore, derive_rows,
+    CategoryCodes, TokenStore, TermMatrix,
+    extract_nouns_korean, _vocab_tokens, COUNTRY_MAP, country_bridge, CountryIncidence,
+    year_bridge, group_summary, CorpusIndex, CorpusView, BUNDLE_DIR,
 )
 
 # --------------------- 데이터 입력 ---------------------
@@ -215,129 +238,128 @@ def pick_existing_columns(df: pd.DataFrame, preferred: list[str], fallback_max:
     return existing
 
 
-def ensure_unique_columns(df: pd.DataFrame) -> pd.DataFrame:
-    cols = pd.Series(df.columns)
-    if cols.duplicated().any():
-        # 동일 이름 열이 여러 개면 첫 번째만 남기고 나머지는 버림
-        df = df.loc[:, ~cols.duplicated()].copy()
-    return df
-
-# === NEW: 컬럼 정규화(유사명 → 표준명) ===
-def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    - 공백/개행 제거, 대소문자 틀어짐 보정
-    - 자주 쓰이는 변형명을 표준 컬럼으로 통일
-    """
-    if df is None or df.empty:
-        return df
-
-    # 1) 트리밍
-    new_cols = []
-    for c in df.columns:
-        c2 = str(c).replace("\n", " ").strip()
-        c2 = re.sub(r"\s+", " ", c2)
-        new_cols.append(c2)
-    df = df.copy()
-    df.columns = new_cols
-
-    # 2) 유사명 매핑
-    #   표준: "사업 기간", "연도", "요약", "주요 내용", "Hashtag", "Hashtag_str", "ICT 유형", "주제분류(대)", "대상국", "대상기관", "지원기관", "파일명"
-    rename_map = {
-        "사업기간": "사업 기간",
-        "프로젝트 기간": "사업 기간",
-        "기간": "사업 기간",
-        "Project Period": "사업 기간",
-        "Years": "연도",
-        "Year": "연도",
-        "year": "연도",
-        "Hashtags": "Hashtag",
-        "해시태그": "Hashtag",
-        "해시태그_문자열": "Hashtag_str",
-        "ICT유형": "ICT 유형",
-        "주제(대)": "주제분류(대)",
-        "주제 대분류": "주제분류(대)",
-        "Country": "대상국",
-        "기관": "대상기관",
-        "기관명": "대상기관",
-        "지원 기관": "지원기관",
-        "Filename": "파일명",
-        "파일 이름": "파일명",
-        "요약문": "요약",
-        "내용 요약": "요약",
-        "본문": "주요 내용",
-    }
-    for k, v in list(rename_map.items()):
-        if k in df.columns and v not in df.columns:
-            df = df.rename(columns={k: v})
-
-    # 3) 최소 필요한 핵심 컬럼이 없을 때도 후속 로직이 죽지 않도록 보정
-    for must in ["파일명", "대상국", "ICT 유형", "주제분류(대)"]:
-        if must not in df.columns:
-            # 없는 경우라도 차트 전체가 죽지 않게 placeholder 생성
-            df[must] = df.get(must, pd.Series(["-"] * len(df)))
-
-    return df
-
-
-@st.cache_data(show_spinner=False)
-def load_from_path(path: str) -> pd.DataFrame:
-    ext = os.path.splitext(path)[1].lower()
-    if ext in [".xlsx", ".xls"]: return pd.read_excel(path)
-    if ext == ".csv": return pd.read_csv(path, encoding_errors="ignore")
-    return pd.read_excel(path)
-
-def load_from_uploader(f) -> pd.DataFrame:
-    name = f.name.lower()
-    if name.endswith((".xlsx", ".xls")): return pd.read_excel(f)
-    if name.endswith(".csv"): return pd.read_csv(f, encoding_errors="ignore")
-    return pd.read_excel(f)
-
-def load_from_csv_text(txt: str) -> pd.DataFrame:
-    return pd.read_csv(io.StringIO(txt), encoding_errors="ignore")
-
-@st.cache_data(show_spinner=False)
-def discover_data_files(dirs: list[Path]) -> list[Path]:
-    """같은 폴더(+ 관용 서브폴더)에서 엑셀/CSV 후보 탐색 & 스코어링"""
-    cands: list[Path] = []
-    for base in dirs:
-        if not base.exists(): continue
-        for pat in ("*.xlsx", "*.xls", "*.csv"):
-            cands.extend(sorted(base.glob(pat)))
-    # 스코어: 파일명 힌트(가중) + 최신 수정시간
-    def score(p: Path) -> tuple:
-        name = p.name.lower()
-        s = 0
-        # 프로젝트에서 자주 쓰는 패턴 가중치
-        if "df1" in name: s += 8
-        if "ksp" in name: s += 6
-        if "state_of_the_table" in name: s += 5
-        if "export" in name or "table" in name: s += 2
-        if name.startswith("~$") or name.endswith(".tmp"): s -= 100
-        # 최신 파일 우선
-        return (-s, -p.stat().st_mtime)
-    # 가장 높은 점수(음수 정렬 보정 위해 -s)부터 오름차순 → 우리가 원하는 건 점수 큰 순이므로 다시 정렬 기준 주의
-    # 위 score에서 -s, -mtime을 줬으니 "오름차순"으로 정렬하면 실질적으로 점수↓ → 원하는 건 반대.
-    # 간단히 별도 key로 다시 정렬:
-    def _rank_value(path: Path) -> int:
-        name = path.name.lower()
-        score = 0
-        score += 8 if "df1" in name else 0
-        score += 6 if "ksp" in name else 0
-        score += 5 if "state_of_the_table" in name else 0
-        score += 2 if ("export" in name or "table" in name) else 0
-        return score
-    
-    cands = sorted(
-        cands,
-        key=lambda p: (-_rank_value(p), -p.stat().st_mtime)  # 점수↓, 최근파일↑
-    )
+# 적재 결과 = (본문 없는 메타 프레임, TextStore, CategoryCodes). 리소스 캐시라 세션 간 한 벌만 두고
+# 리런마다 언피클 복사하지 않는다 → 반환 프레임은 읽기 전용으로 다룬다(가공은 복사본에서).
+def _ingest(meta: pd.DataFrame, texts: TextStore) -> tuple[pd.DataFrame, TextStore, CategoryCodes]:
+    return meta, texts, CategoryCodes(meta)
+
+@cached("data", resource=True, show_spinner=False, max_entries=8)
+def _load_path_snapshot(path: str, mtime_ns: int, size: int) -> tuple[pd.DataFrame, TextStore, CategoryCodes]:
+    # mtime/size는 캐시 키 용도(파일이 바뀌면 새 항목), 디스크 스냅샷은 내용 해시로 찾는다
+    return _ingest(*load_path_split(path, size))
+
+def load_from_path(path: str) -> tuple[pd.DataFrame, TextStore, CategoryCodes]:
+    """정규화까지 끝난 (메타 프레임, 본문 저장소) 반환(스냅샷 캐시 경유)"""
+    stt = os.stat(path)
+    return _load_path_snapshot(str(path), stt.st_mtime_ns, stt.st_size)
+
+@cached("data", resource=True, show_spinner=False, max_entries=4)
+def _load_bytes_snapshot(digest: str, name: str, _data: bytes) -> tuple[pd.DataFrame, TextStore, CategoryCodes]:
+    # 원문 바이트는 키에서 제외(수십 MB를 매 리런 다시 해싱하지 않음) — digest가 곧 내용
+    return _ingest(*load_bytes_split(_data, name, digest))
+
+def load_from_uploader(f) -> tuple[pd.DataFrame, TextStore, CategoryCodes]:
+    """업로드 파일 → 정규화 프레임. 같은 업로드(file_id)면 세션 안에서 해시도 재계산하지 않음"""
+    memo = st.session_state.setdefault("_upload_digests", {})
+    key = (getattr(f, "file_id", None), f.name, f.size)
+    digest = memo.get(key) if key[0] else None
+    if digest is None:
+        digest = hashlib.sha1(f.getvalue()).hexdigest()
+        if key[0]:
+            memo[key] = digest
+    return _load_bytes_snapshot(digest, f.name, f.getvalue())
+
+def load_from_csv_text(txt: str) -> tuple[pd.DataFrame, TextStore, CategoryCodes]:
+    data = txt.encode("utf-8")
+    return _load_bytes_snapshot(hashlib.sha1(data).hexdigest(), "pasted.csv", data)
+
+# --------------------- 데이터 파일 탐색(stat 스냅샷 + 폴링) ---------------------
+# 후보 파일의 (mtime, size)를 한 번만 stat해 기억하고, 몇 초 간격으로 디렉터리만 다시 훑어 바뀐 파일을 찾는다.
+# 바뀐 파일은 그 경로의 적재 캐시 항목만 버린다(전역 새로고침 불필요).
+import threading, time
+
+DATA_PATTERNS = ("*.xlsx", "*.xls", "*.csv")
+DISCOVERY_POLL_SEC = 3.0
+
+def _rank_value(path: Path) -> int:
+    """파일명 힌트 점수(프로젝트에서 자주 쓰는 패턴 가중치)"""
+    name = path.name.lower()
+    score = 0
+    score += 8 if "df1" in name else 0
+    score += 6 if "ksp" in name else 0
+    score += 5 if "state_of_the_table" in name else 0
+    score += 2 if ("export" in name or "table" in name) else 0
+    return score
+
+class DataFileWatcher:
+    """SEARCH_DIRS 후보 파일의 stat 스냅샷. 여러 세션이 공유(cache_resource)."""
+
+    def __init__(self, dirs):
+        self.dirs = [Path(d) for d in dirs]
+        self._lock = threading.Lock()
+        self._last = 0.0
+        self.generation = 0                 # 후보 목록/stat이 바뀔 때마다 +1 (세션별 자동 리런 판단용)
+        self.stats: dict = self._scan()     # Path → (mtime_ns, size)
+        self.files: list[Path] = self._ranked(self.stats)
+
+    def _scan(self) -> dict:
+        """디렉터리 항목당 stat 1회(DirEntry 캐시). 같은 파일(심볼릭 링크/중복 폴더)은 처음 것만"""
+        out, seen = {}, set()
+        for base in self.dirs:
+            try:
+                entries = sorted(os.scandir(base), key=lambda e: e.name)
+            except OSError:
+                continue
+            for pat in DATA_PATTERNS:
+                for e in entries:
+                    if not fnmatch.fnmatchcase(e.name, pat):
+                        continue
+                    try:
+                        if not e.is_file(): continue
+                        stt = e.stat()
+                    except OSError:
+                        continue   # 스캔 도중 삭제됨
+                    ident = (stt.st_dev, stt.st_ino) if stt.st_ino else os.path.realpath(e.path)
+                    if ident in seen: continue
+                    seen.add(ident)
+                    out[Path(e.path)] = (stt.st_mtime_ns, stt.st_size)
+        return out
 
-    # 중복 제거(동일 경로 대비 안전)
-    seen = set(); out = []
-    for p in cands:
-        if p.resolve() not in seen:
-            out.append(p); seen.add(p.resolve())
-    return out
+    @staticmethod
+    def _ranked(stats: dict) -> list[Path]:
+        # 점수↓, 최근파일↑ (동점은 스캔 순서 유지)
+        return sorted(stats, key=lambda p: (-_rank_value(p), -stats[p][0]))
+
+    def poll(self, min_interval: float = DISCOVERY_POLL_SEC) -> list[tuple[Path, Optional[tuple]]]:
+        """min_interval이 지났으면 다시 스캔. 반환: [(바뀐/사라진/새 파일, 이전 stat 또는 None)]"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last < min_interval:
+                return []
+            self._last = now
+            new = self._scan()
+            changed = [(p, self.stats.get(p)) for p in (self.stats.keys() | new.keys())
+                       if self.stats.get(p) != new.get(p)]
+            if changed:
+                self.stats, self.files = new, self._ranked(new)
+                self.generation += 1
+            return changed
+
+@cached("data", resource=True, show_spinner=False)
+def _data_file_watcher(dirs: tuple) -> DataFileWatcher:
+    return DataFileWatcher(dirs)
+
+def discover_data_files(dirs: list[Path]) -> DataFileWatcher:
+    """같은 폴더(+ 관용 서브폴더)에서 엑셀/CSV 후보 탐색 & 스코어링(변경 시 해당 파일 캐시만 무효화)"""
+    w = _data_file_watcher(tuple(str(d) for d in dirs))
+    for p, old in w.poll():
+        if old is None:
+            continue
+        try:
+            _load_path_snapshot.clear(str(p), *old)   # 그 파일의 이전 (mtime, size) 항목만
+        except TypeError:
+            _load_path_snapshot.clear()               # 인자별 clear 미지원(구버전) → 적재 캐시만
+    return w
 
 # ── UI: 소스 선택(자동이 기본) ──────────────────────────────────────────
 src_mode = st.sidebar.radio(
@@ -346,26 +368,38 @@ src_mode = st.sidebar.radio(
     index=0
 )
 
-# 캐시 리로드
+# 캐시 리로드(데이터 → 브리지 → 키워드 → 그림만; 브리프/GeoJSON/폰트는 유지)
 if st.sidebar.button("로드/새로고침", use_container_width=True):
-    st.cache_data.clear()
-
-df = None
-auto_files = discover_data_files(SEARCH_DIRS)
+    invalidate_cache("data")
+
+df, texts, cats = None, None, None
+watcher = discover_data_files(SEARCH_DIRS)
+auto_files = watcher.files
+
+_fragment = getattr(st, "fragment", None)
+if _fragment is not None:
+    @_fragment(run_every=DISCOVERY_POLL_SEC)
+    def _watch_data_files():
+        # 위젯 조작이 없어도 폴더 변화(새 export, 덮어쓰기)를 감지하면 전체 리런
+        w = discover_data_files(SEARCH_DIRS)
+        if st.session_state.get("_data_files_gen") != w.generation:
+            st.session_state["_data_files_gen"] = w.generation
+            st.rerun()
+    with st.sidebar:
+        _watch_data_files()
+st.session_state["_data_files_gen"] = watcher.generation
 
 if src_mode == "자동(같은 폴더)":
     if auto_files:
         # 후보가 여러 개면 선택 박스 제공(기본: 최우선 후보)
-        labels = [f"{p.name}  —  {p.parent.name}/  (수정: {pd.to_datetime(p.stat().st_mtime, unit='s'):%Y-%m-%d %H:%M})"
+        labels = [f"{p.name}  —  {p.parent.name}/  (수정: {pd.to_datetime(watcher.stats[p][0], unit='ns'):%Y-%m-%d %H:%M})"
                   for p in auto_files]
         sel_idx = 0
         if len(auto_files) > 1:
             sel_idx = st.sidebar.selectbox("자동 탐지된 파일", list(range(len(auto_files))),
                                            index=0, format_func=lambda i: labels[i])
         st.sidebar.caption(f"경로: `{auto_files[sel_idx]}`")
-        df = load_from_path(str(auto_files[sel_idx]))
-        df = normalize_columns(df)
-        df = ensure_unique_columns(df)
+        df, texts, cats = load_from_path(str(auto_files[sel_idx]))
 
     else:
         st.sidebar.info("같은 폴더(또는 ./data, ./assets)에서 적합한 데이터 파일을 찾지 못했습니다. 다른 소스 방식을 사용하세요.")
@@ -373,17 +407,13 @@ if src_mode == "자동(같은 폴더)":
 elif src_mode == "파일 업로드":
     up = st.sidebar.file_uploader("엑셀(.xlsx/.xls) 또는 CSV 업로드", type=["xlsx", "xls", "csv"])
     if up is not None:
-        df = load_from_uploader(up)
-        df = normalize_columns(df)
-        df = ensure_unique_columns(df)
+        df, texts, cats = load_from_uploader(up)
 
 
 elif src_mode == "CSV 붙여넣기":
     pasted = st.sidebar.text_area("CSV 원문 붙여넣기(헤더 포함)", height=160)
     if pasted.strip():
-        df = load_from_csv_text(pasted)
-        df = normalize_columns(df)
-        df = ensure_unique_columns(df)
+        df, texts, cats = load_from_csv_text(pasted)
 
 
 else:  # 파일 경로
@@ -391,9 +421,7 @@ else:  # 파일 경로
     default_path = str(auto_files[0]) if auto_files else DEFAULT_DATA_PATH
     data_path = st.sidebar.text_input("엑셀/CSV 경로", default_path)
     if os.path.exists(data_path):
-        df = load_from_path(data_path)
-        df = normalize_columns(df)
-        df = ensure_unique_columns(df)
+        df, texts, cats = load_from_path(data_path)
 
         st.sidebar.caption(f"경로: `{Path(data_path).resolve()}`")
 
@@ -404,21 +432,22 @@ if df is None or df.empty:
 # 필수 컬럼 진단
 REQ = ["파일명","대상국","대상기관","주요 분야","지원기관","주요 내용","기대 효과",
        "요약","ICT 유형","주제분류(대)","Hashtag","Hashtag_str","full_text"]
-missing = [c for c in REQ if c not in df.columns]
+missing = [c for c in REQ if c not in df.columns and c not in texts.columns]
 if missing:
     st.warning(f"필수 컬럼 누락: {missing}")
 
 with st.expander("데이터 미리보기 / 진단", expanded=False):
     st.write(f"행 수: {len(df):,}  |  고유 대상국: {df['대상국'].nunique()}  |  고유 ICT 유형: {df['ICT 유형'].nunique()}")
-    st.dataframe(df.head(25), use_container_width=True)
+    st.dataframe(texts.attach(df.head(25)), use_container_width=True)
 # --------------------- 데이터 입력 (끝) ---------------------
 # ========================= 전역 컬러 팔레트 =========================
 
 
 # ---------- 1) df 로드 이후 ----------
 # 반드시 df가 이미 로드된 뒤 실행!
-WB_ORDER   = [str(v).strip() for v in df["ICT 유형"].fillna("미분류").astype(str).unique().tolist()]
-SUBJ_ORDER = [str(v).strip() for v in df["주제분류(대)"].fillna("미분류").astype(str).unique().tolist()]
+# 라벨 순서 = 적재 시 만든 카테고리 사전(정규화 라벨, 결측 → 미분류, 행 첫 등장 순서)
+WB_ORDER   = list(cats.labels.get("ICT 유형", []))
+SUBJ_ORDER = list(cats.labels.get("주제분류(대)", []))
 
 # ---------- 2) 기본 팔레트 ----------
 _BASE_QUALS = (
@@ -515,25 +544,54 @@ def split_sentences(txt: str, max_len: int = 500) -> list[str]:
             out.append(p)
     return [s for s in out if len(s) >= 20]
 
+@lru_cache(maxsize=1024)
+def _kw_pattern(kw: str) -> re.Pattern:
+    """
+    키워드 검색 패턴(대소문자 무시). 여러 낱말 키워드(구 후보)는 명사 필터 토큰을 이은 것이라
+    원문에서는 낱말마다 조사/어미가 붙을 수 있음 → '전자 조달' ≈ '전자의 조달', 'single window' 그대로
+    """
+    words = kw.split()
+    if len(words) <= 1:
+        return re.compile(re.escape(kw), re.IGNORECASE)
+    return re.compile(r"\S*\s+".join(re.escape(w) for w in words), re.IGNORECASE)
+
 def shorten_around_keyword(sent: str, kw: str, half: int = 140) -> str:
     """키워드 기준 좌우로 문맥만 남겨 280자 내로 축약"""
-    i = sent.lower().find(kw.lower())
-    if i < 0:
+    m = _kw_pattern(kw).search(sent)
+    if m is None and " " in kw.strip():
+        # 명사 토큰열로만 맞은 구 후보 → 첫 낱말 위치 기준
+        m = _kw_pattern(kw.split()[0]).search(sent)
+    if m is None:
         return sent[:280] + ("…" if len(sent) > 280 else "")
-    left = max(0, i - half)
-    right = min(len(sent), i + len(kw) + half)
+    left = max(0, m.start() - half)
+    right = min(len(sent), m.end() + half)
     clip = (("…" if left > 0 else "") + sent[left:right] + ("…" if right < len(sent) else ""))
     return clip
 
 def highlight(text: str, kw: str) -> str:
-    pat = re.compile(re.escape(kw), re.IGNORECASE)
-    return pat.sub(lambda m: f"<mark style='background:#fff3a1; padding:0 2px; border-radius:4px'>{m.group(0)}</mark>", text)
+    return _kw_pattern(kw).sub(lambda m: f"<mark style='background:#fff3a1; padding:0 2px; border-radius:4px'>{m.group(0)}</mark>", text)
+
+def sentence_index(df_in: pd.DataFrame, text_cols: list[str]) -> list[tuple[str, list[str], list[str]]]:
+    """
+    문서별 (파일명, 문장들, 문장별 " 명사 토큰열 ") — 본문이 빈 문서는 뺀다.
+    문서당 한 번 쪼개고 명사 필터를 돌려 두면 키워드마다 다시 하지 않는다.
+    """
+    cols = [c for c in text_cols if c in df_in.columns]
+    out = []
+    for _, row in df_in.iterrows():
+        blob = " ".join(str(row.get(c, "") or "") for c in cols).strip()
+        if not blob:
+            continue
+        sents = split_sentences(blob)
+        fname = str(row.get("파일명") or row.get("Filename") or "").strip()
+        out.append((fname, sents, [f" {' '.join(_vocab_tokens(extract_nouns_korean(s)))} " for s in sents]))
+    return out
 
 # === 교체: sample_sentences_for_keyword ===
 def sample_sentences_for_keyword(df_in: pd.DataFrame, kw: str, text_cols: list[str], 
-                                 per_kw: int = 3, seed: int = 42) -> list[tuple[str, str]]:
+                                 per_kw: int = 3, seed: int = 42, sents_ix: Optional[list] = None) -> list[tuple[str, str]]:
     """
-    kw를 포함하는 문장을 최대 per_kw개 샘플링.
+    kw를 포함하는 문장을 최대 per_kw개 샘플링(sents_ix = sentence_index(df_in, text_cols) 재사용).
     반환: [(파일명, 문장_HTML), ...]
     """
     # ✔ 지역 임포트로 NameError 방지
@@ -551,15 +609,16 @@ def sample_sentences_for_keyword(df_in: pd.DataFrame, kw: str, text_cols: list[s
     cols = [c for c in text_cols if c in df_in.columns]
     if not cols:
         return []
+    pat = _kw_pattern(kw)
+    # 구 후보는 명사 필터 토큰열에서 뽑힌 것 → 사이 낱말(불용어·짧은 토큰)이 빠진 문장도 토큰열로 판정
+    needle = f" {kw.strip().lower()} " if " " in kw.strip() else None
 
-    for _, row in df_in.iterrows():
-        blob = " ".join(str(row.get(c, "") or "") for c in cols).strip()
-        if not blob:
-            continue
-        sents = split_sentences(blob)
-        hits = [s for s in sents if kw.lower() in s.lower()]
+    if sents_ix is None:
+        sents_ix = sentence_index(df_in, cols)
+
+    for fname, sents, nouns in sents_ix:
+        hits = [s for s, ns in zip(sents, nouns) if pat.search(s) or (needle is not None and needle in ns)]
         if hits:
-            fname = str(row.get("파일명") or row.get("Filename") or "").strip()
             rng.shuffle(hits)
             for s in hits[:per_kw * 2]:   # 약간 넉넉히 가져와 중복 제거/축약 후 선택
                 texts.append((fname, s))
@@ -585,102 +644,6 @@ def sample_sentences_for_keyword(df_in: pd.DataFrame, kw: str, text_cols: list[s
 
 
 
-
-USE_NOUN_FILTER: bool = True   # ← 명사 필터 사용 여부(사이드바 토글로 바꿔도 됨)
-
-# ==== 규칙 기반 명사 필터 (kiwi 불필요) ====
-
-_HANGUL_RE = re.compile(r"[가-힣]+")
-_TOKEN_RE  = re.compile(r"[A-Za-z]+(?:[-_][A-Za-z0-9]+)*|[0-9]+(?:\.[0-9]+)?|[가-힣]+")
-_KO_POSTFIX_DROP = (
-    "하다","적인","스러운","스러움","스럽다","되다","시키다","되며","하며","하다가",
-    "으로","부터","처럼","까지","대로","라서","면서","면서도","하면서",
-    "에서","에게","에게서","한테","이라서","이라도",
-)
-_KO_SINGLE_PARTICLE = set(list("은는이가을를의에와과도만"))
-_EN_SHORT_MIN = 2
-
-def _strip_ko_suffix(tok: str) -> str:
-    for suf in _KO_POSTFIX_DROP:
-        if tok.endswith(suf) and len(tok) > len(suf) + 1:
-            tok = tok[:-len(suf)]
-            break
-    if len(tok) >= 3 and tok[-1] in _KO_SINGLE_PARTICLE:
-        tok = tok[:-1]
-    return tok
-
-def _valid_token(tok: str) -> bool:
-    if not tok: return False
-    if re.fullmatch(r"[0-9]+(?:\.[0-9]+)?", tok): return False
-    if len(tok) == 1: return False
-    return True
-
-def extract_nouns_korean(text: str) -> str:
-    if not isinstance(text, str) or not text.strip(): return ""
-    toks = _TOKEN_RE.findall(text)
-    out = []
-    for t in toks:
-        if _HANGUL_RE.fullmatch(t):
-            t = _strip_ko_suffix(t).strip()
-            if not t: continue
-            if t.lower() in STOP_ALL: continue
-            if _valid_token(t): out.append(t)
-        else:
-            tl = t.lower()
-            if len(tl) < _EN_SHORT_MIN: continue
-            if tl in STOP_ALL: continue
-            out.append(tl)
-    return " ".join(out)
-
-def _prep_docs(df_in: pd.DataFrame, text_cols: list[str]) -> list[str]:
-    cols = [c for c in (text_cols or []) if c in df_in.columns]
-    out = []
-    for _, r in df_in.iterrows():
-        t = " ".join(str(r.get(c, "") or "") for c in cols).strip()
-        if not t: continue
-        if USE_NOUN_FILTER:
-            t = extract_nouns_korean(t)
-        out.append(t)
-    return out
-
-
-
-
-# ===== 강한 stop/필터 =====
-GENERIC_KO = {
-    "경제","사회","정책","데이터","디지털","서비스","시장","운영","현황","전략","방안","도입","개선","구축","체계",
-    "기반","중장기","보고","분석","지원","정부","공공","프로젝트","로드맵","비전","활용","강화","확대","평가","계획",
-    "사례","현지","과제","인프라","플랫폼","시스템","포털","조달","법제","제도","가이드라인","기획","추진","성과",
-    "과학기술","교육","보건","안전","보안","전자정부","스마트","혁신","연구","중소기업","산업","도시","센터","플렛폼",
-    "현안","자료","분야","지원기관","대상기관","주제분류","ict","ICT","AI","인공지능","빅데이터","클라우드", "기대됩니다",
-    "생산성", "IT", "대한", "자원", "투자", "디지털화", "무역", "법정", "재정", "정보화", "법적", "인력", "민간", "맞춤형", "행정", "비즈니스", "제조업", "건설", "광업", "BIM", "에너지", "불가리아", "지속가능한", "IP", "중남미", "공장", "양성", "우즈베키스탄", "높이고", "이러한", "유치", "전문",
-    "정책적", "촉진할", "성공", "루마니아", "특허", "상황입니다", "검토하여", "환경", "생태계", "온두라스", "구축하여", "거버넌스", "필리핀", "시범", "심사", "업무", "데이터베이스", "온라인", "있으며", "산학연", "전자", "사이버", "다룹니다", "감사", "교통", "담고", "조세", "예산", "강조합니다", "세수",
-    "투명성", "인센티브", "법률", "기술적", "함께", "인도네시아", "세무", "조직", "높여", "방글라데시", "수집", "확보하고", "멕시코", "효율성", "제공합니다", "적합한", "국제", "컨설팅", "분석한다", "공무원", "납세자", "납세", "가능하게", "크게", "선진", "향상", "공격", "이집트", "악성", "징수",
-    "코드", "인적자원", "강조함", "제시함", "재활용", "요약됨", "시스템적", "슬로바키아", "재설계", "중복", "순환", "포함됨", "물류", "이루어지고", "진행", "진료", "도입하기", "통신", "원격", "빠르게", "도출합니다", "토지", "비현금", "농업", "방송", "축산물", "경매", "경영", "진료비", "원산지", "공기업",
-    "관광", "교사", "주파수", "경보", "만성질환", "요르단", "재해복구", "Konza", "홍수", "가뭄", "식량", "JONEPS", "증명", "비기술적", "미디어", "전자회계감사", "수자원", "KLIS", "누락", "건설기술", "의료진", "공공의료", "설계하였습니다", "현금영수증", "공공재산", "처분", "이중화", "아날로그",
-    "국세청", "자문", "시민들", "문서", "세르비아", "가입", "창출", "기업들", "crm", "육성", "장애", "인재", "협업", "기초", "업그레이드", "백업", "기관별", "유역", "의료", "환자", "안보", "지속가능성", "콘텐츠", "넘어", "증진", "공정한", "불평등", "피해", "칠레", "극복하기", "회계", "일부", "향후", "제공한다", "재정관리",
-    "지원한다", "부가가치", "생산", "국가를", "분석합니다", "요인", "중점", "부족", "공공부문", "공공조달", "강화하", "오프라인", "탈세", "증대", "타지키스탄", "단지", "리투아니아", "말레이시아", "대응책", "탄자니아", "db", "이행계획", "벨라루스", "모로코", "브라질", "몰도바", "경영평", "우크라이나", "조지아", "카타르", "르완다",
-    "케냐", "호주", "태국", "건설산업", "아크라", "대역", "학생", "DMA", "지질", "소득세", "운영자", "자메이카", "하드웨어", "수수료", "윤리", "아프리카", "도입률", "위험기반", "금융결제원", "문해력", "D-IP", "법인세", "오프", "ID", "상암", "메콩강위원회", "산업혁명", "범위", "만이", "농촌", "공정", "스마트시티로",
-    "조직적", "SUPPORTERS", "지식관리", "MRC", "19", "세수입", "공무원연금", "코스타리카", "이력제", "전자폐기물", "문화산업", "상용화", "DNPI", "청정", "ALLBARO", "분류체계", "CCI", "축산업", "FDI", "INPI", "축산시설", "우루과", "수거", "대기업과"
-}
-GENERIC_EN = {
-    "data","digital","service","services","system","systems","platform","portal","project","program","policy","policies",
-    "plan","roadmap","model","models","evaluation","implementation","phase","final","interim","infrastructure","innovation"
-}
-STRONG_STOP = {s.lower() for s in (STOP | BASE_STOP | STOP_CUSTOM | GENERIC_KO | GENERIC_EN)}
-
-# 이미 정의된 STOP/BASE_STOP/STOP_CUSTOM/GENERIC_KO/GENERIC_EN을 한데 모아 통합
-def _collect_stop_all():
-    STOP_ALL = set()
-    for s in [globals().get("STOP"), globals().get("BASE_STOP"),
-              globals().get("STOP_CUSTOM"), globals().get("GENERIC_KO"),
-              globals().get("GENERIC_EN"), globals().get("STOP_LOW_ALL")]:
-        if s:
-            STOP_ALL |= {str(w).lower() for w in s}
-    return STOP_ALL
-
-STOP_ALL = _collect_stop_all()
-
 def _normalize_token(t: str) -> str:
     t = re.sub(r"[\"'’“”()\[\]{}<>]", "", str(t)).strip()
     t = re.sub(r"\s{2,}", " ", t)
@@ -696,84 +659,6 @@ def _is_valid_kw(t: str) -> bool:
     return (t.lower() not in STRONG_STOP)
 
 
-def contrastive_keywords_tfidf(
-    docs_class: list[str],
-    docs_neg: list[str],
-    top_n: int = 60,
-    ngram_bonus=(0.10, 0.20),
-    eps: float = 1e-6,
-) -> list[tuple[str, float]]:
-    """
-    score = log((tf_c/len_c + eps) / (tf_n/len_n + eps)) * log(1 + N / df)
-            + n-그램 보너스
-    - 불용어(STOP_ALL) 적용
-    - KeyBERT/임베딩 없이 '클래스 vs 나머지' 대비로 구분력 확보
-    - 영어 키워드는 최종 출력 시 대문자로 변환
-    """
-    def _tokenize_for_vocab(docs):
-        out = []
-        for d in docs:
-            if not isinstance(d, str) or not d.strip():
-                out.append([])
-                continue
-            toks = re.split(r"\s+", d.strip())
-            toks = [t.lower() for t in toks if t and t.lower() not in STOP_ALL]
-            out.append(toks)
-        return out
-
-    toks_c = _tokenize_for_vocab(docs_class)
-    toks_n = _tokenize_for_vocab(docs_neg)
-
-    N_docs = len(toks_c) + len(toks_n)
-    df_term, cnt_c, cnt_n = Counter(), Counter(), Counter()
-    len_c = len_n = 0
-
-    for toks in toks_c + toks_n:
-        if not toks: continue
-        for t in set(toks): df_term[t] += 1
-
-    for toks in toks_c:
-        cnt_c.update(toks); len_c += len(toks)
-    for toks in toks_n:
-        cnt_n.update(toks); len_n += len(toks)
-
-    len_c = max(len_c, 1); len_n = max(len_n, 1)
-
-    picked = []
-    for t in set(cnt_c.keys()) | set(cnt_n.keys()):
-        if t in STOP_ALL: 
-            continue
-        tfc = cnt_c[t] / len_c
-        tfn = cnt_n[t] / len_n
-        lift = np.log((tfc + eps) / (tfn + eps))
-        idf  = np.log(1.0 + N_docs / max(1, df_term[t]))
-        score = lift * idf
-        n = len(t.split())
-        if n == 2: score += ngram_bonus[0]
-        elif n >= 3: score += ngram_bonus[1]
-        picked.append((t, float(score)))
-
-    # === ▼ 영문 단어는 대문자화 ▼ ===
-    def _upper_if_english(term: str) -> str:
-        if re.fullmatch(r"[a-zA-Z0-9\-\_]+", term):  # 영문/숫자/하이픈 조합이면
-            return term.upper()
-        return term
-
-    picked.sort(key=lambda x: x[1], reverse=True)
-    uniq, seen = [], []
-    for term, sc in picked:
-        low = term
-        if any(low in s or s in low for s in seen):
-            continue
-        seen.append(low)
-        uniq.append((_upper_if_english(term), sc))   # ← 여기에 적용
-        if len(uniq) >= top_n:
-            break
-    return uniq
-
-
-
-
 def mmr_select_text(candidates: list[tuple[str, float]], k: int, lambda_div: float = 0.65) -> list[str]:
     if not candidates: return []
     candidates = sorted(candidates, key=lambda x: x[1], reverse=True)
@@ -798,34 +683,6 @@ def mmr_select_text(candidates: list[tuple[str, float]], k: int, lambda_div: flo
 
 
 
-def _docs_texts(df_in: pd.DataFrame, text_cols: List[str]) -> List[str]:
-    cols = [c for c in (text_cols or []) if c in df_in.columns]
-    if not cols:
-        return []
-    out = []
-    for _, r in df_in.iterrows():
-        blob = " ".join(str(r.get(c, "") or "") for c in cols).strip()
-        if blob:
-            out.append(blob)
-    return out
-
-
-
-
-
-
-
-
-def _contains_kw_doclevel(txt: str, kw: str) -> bool:
-    # 영문은 단어경계, 한국어/혼합은 서브스트링도 허용
-    pat = re.compile(rf"(?i)(\b{re.escape(kw)}\b)|({re.escape(kw)})")
-    return bool(pat.search(txt))
-
-def _doc_share(docs: list[str], kw: str) -> tuple[int, int, float]:
-    n = len(docs) or 1
-    c = sum(1 for t in docs if _contains_kw_doclevel(t, kw))
-    return c, n, c / n
-
 def _monroe_log_odds_z(c_a, n_a, c_b, n_b, alpha=0.5):
     pa = (c_a + alpha) / (n_a + 2*alpha)
     pb = (c_b + alpha) / (n_b + 2*alpha)
@@ -855,10 +712,8 @@ def _cos(a, b):
 
 def rerank_with_negative_contrast(
     candidates: list[tuple[str, float]],  # (kw, tfidf_score)
-    df_all: pd.DataFrame,
-    df_class: pd.DataFrame,
-    df_negative: pd.DataFrame,
-    text_cols: list[str],
+    terms: TermMatrix,                    # _term_matrix(...) — 전체 문서×용어 행렬
+    class_mask: np.ndarray,               # 클래스 문서 bool(나머지 = 전체 − 클래스)
     w_lift=0.65,
     w_logodds=0.35,
     # w_embed 제거
@@ -869,9 +724,9 @@ def rerank_with_negative_contrast(
     """
     반환: [(kw, final, lift, logodds_z, emb_delta(=0), kb_like_score)]
     여기서 kb_like_score는 TF-IDF score를 대입.
+    문서 포함 비율은 TermMatrix.doc_share — 키워드 포함 문서를 코퍼스 전체에서 한 번 구해 두고
+    나머지 쪽은 전체 − 클래스로 센다(나머지 문서의 본문을 다시 읽지 않음).
     """
-    docs_cls = _prep_docs(df_class, text_cols)
-    docs_neg = _prep_docs(df_negative, text_cols)
 
     out = []
     for kw, tfidf_sc in candidates:
@@ -879,8 +734,7 @@ def rerank_with_negative_contrast(
             continue
 
         # 문서 내 포함 비율 (클래스/나머지)
-        hit_c, n_c, share_c = _doc_share(docs_cls, kw)
-        hit_n, n_n, share_n = _doc_share(docs_neg, kw)
+        (hit_c, n_c, share_c), (hit_n, n_n, share_n) = terms.doc_share(kw, class_mask)
         lift = (share_c + 1e-6) / (share_n + 1e-6)
         z = _monroe_log_odds_z(hit_c, n_c, hit_n, n_n, alpha=0.5)
 
@@ -903,7 +757,7 @@ def rerank_with_negative_contrast(
 # ========================= 국가 브리프(요약) 입력 =========================
 st.sidebar.header("국가 브리프(요약)")
 
-@st.cache_data(show_spinner=False)
+@cached("briefs", show_spinner=False)
 def load_country_briefs_from_ipynb_bytes(b: bytes) -> dict:
     """ipynb 안의 code cell에서 'briefs = {...}' 딕셔너리를 찾아 반환"""
     import json
@@ -922,7 +776,7 @@ def load_country_briefs_from_ipynb_bytes(b: bytes) -> dict:
                     return briefs
     return {}
 
-@st.cache_data(show_spinner=False)
+@cached("briefs", show_spinner=False)
 def load_country_briefs_auto(app_dir: Path) -> tuple[dict, str | None]:
     """
     스크립트와 같은 폴더(또는 관용 서브폴더)에서 CountryBriefs.ipynb 자동 탐색
@@ -946,7 +800,7 @@ APP_DIR = Path(__file__).resolve().parent if "__file__" in globals() else Path.c
 
 brief_mode = st.sidebar.radio("소스", ["자동(같은 폴더)", "파일 업로드", "비활성화"], index=0, horizontal=True)
 if st.sidebar.button("브리프 리로드", use_container_width=True):
-    st.cache_data.clear()
+    invalidate_cache("briefs")   # 트렌드 파이프라인 캐시는 건드리지 않음
 
 briefs_map: dict = {}
 brief_path_used: str | None = None
@@ -967,7 +821,7 @@ elif brief_mode == "파일 업로드":
 # ========================= ICT 유형 브리프(요약) 입력 =========================
 st.sidebar.header("ICT 유형 브리프(요약)")
 
-@st.cache_data(show_spinner=False)
+@cached("briefs", show_spinner=False)
 def load_wb_briefs_from_ipynb_bytes(b: bytes) -> dict:
     """ipynb 안의 code cell에서 'wb_briefs' (또는 'briefs', 'class_briefs') 딕셔너리 찾아 반환"""
     import json
@@ -995,7 +849,7 @@ def load_wb_briefs_from_ipynb_bytes(b: bytes) -> dict:
     return {}
 
 
-@st.cache_data(show_spinner=False)
+@cached("briefs", show_spinner=False)
 def load_wb_briefs_auto(app_dir: Path) -> tuple[dict, str | None]:
     """
     스크립트와 같은 폴더/자주 쓰는 서브폴더에서 WB_ClassBriefs 노트북 자동 탐색
@@ -1021,7 +875,7 @@ def load_wb_briefs_auto(app_dir: Path) -> tuple[dict, str | None]:
 wb_brief_mode = st.sidebar.radio("소스 (ICT 유형)", ["자동(같은 폴더)", "파일 업로드", "비활성화"],
                                  index=0, horizontal=True)
 
-# '브리프 리로드' 버튼은 위에서 st.cache_data.clear()를 호출하므로 여기에도 적용됨
+# '브리프 리로드' 버튼은 위에서 'briefs' 네임스페이스를 비우므로 여기에도 적용됨
 wb_briefs_map: dict = {}
 wb_brief_path_used: str | None = None
 
@@ -1039,156 +893,41 @@ elif wb_brief_mode == "파일 업로드":
 
 
 # --------------------- 국가 매핑 ---------------------
-COUNTRY_MAP = {
-    # 🌏 아시아
-    "대한민국": ("KOR","Korea, Republic of","대한민국"), "한국": ("KOR","Korea, Republic of","대한민국"),
-    "북한": ("PRK","Korea, Democratic People's Republic of","북한"),
-    "일본": ("JPN","Japan","일본"), "중국": ("CHN","China","중국"), "몽골": ("MNG","Mongolia","몽골"),
-    "베트남": ("VNM","Vietnam","베트남"), "라오스": ("LAO","Laos","라오스"), "캄보디아": ("KHM","Cambodia","캄보디아"),
-    "태국": ("THA","Thailand","태국"), "미얀마": ("MMR","Myanmar","미얀마"),
-    "말레이시아": ("MYS","Malaysia","말레이시아"), "싱가포르": ("SGP","Singapore","싱가포르"),
-    "인도네시아": ("IDN","Indonesia","인도네시아"), "필리핀": ("PHL","Philippines","필리핀"),
-    "브루나이": ("BRN","Brunei Darussalam","브루나이"), "동티모르": ("TLS","Timor-Leste","동티모르"),
-    "인도": ("IND","India","인도"), "파키스탄": ("PAK","Pakistan","파키스탄"), "네팔": ("NPL","Nepal","네팔"),
-    "부탄": ("BTN","Bhutan","부탄"), "스리랑카": ("LKA","Sri Lanka","스리랑카"), "몰디브": ("MDV","Maldives","몰디브"),
-    "카자흐스탄": ("KAZ","Kazakhstan","카자흐스탄"), "우즈베키스탄": ("UZB","Uzbekistan","우즈베키스탄"),
-    "키르기스스탄": ("KGZ","Kyrgyzstan","키르기스스탄"), "타지키스탄": ("TJK","Tajikistan","타지키스탄"),
-    "투르크메니스탄": ("TKM","Turkmenistan","투르크메니스탄"), "아프가니스탄": ("AFG","Afghanistan","아프가니스탄"),
-    "이란": ("IRN","Iran","이란"), "이라크": ("IRQ","Iraq","이라크"), "시리아": ("SYR","Syrian Arab Republic","시리아"),
-    "레바논": ("LBN","Lebanon","레바논"), "이스라엘": ("ISR","Israel","이스라엘"), "팔레스타인": ("PSE","Palestine","팔레스타인"),
-    "요르단": ("JOR","Jordan","요르단"), "사우디아라비아": ("SAU","Saudi Arabia","사우디아라비아"),
-    "예멘": ("YEM","Yemen","예멘"), "오만": ("OMN","Oman","오만"), "아랍에미리트": ("ARE","United Arab Emirates","아랍에미리트"),
-    "카타르": ("QAT","Qatar","카타르"), "바레인": ("BHR","Bahrain","바레인"), "쿠웨이트": ("KWT","Kuwait","쿠웨이트"),
-
-    # 🌍 유럽
-    "영국": ("GBR","United Kingdom","영국"), "아일랜드": ("IRL","Ireland","아일랜드"), "프랑스": ("FRA","France","프랑스"),
-    "독일": ("DEU","Germany","독일"), "이탈리아": ("ITA","Italy","이탈리아"), "스페인": ("ESP","Spain","스페인"),
-    "포르투갈": ("PRT","Portugal","포르투갈"), "네덜란드": ("NLD","Netherlands","네덜란드"),
-    "벨기에": ("BEL","Belgium","벨기에"), "룩셈부르크": ("LUX","Luxembourg","룩셈부르크"),
-    "스위스": ("CHE","Switzerland","스위스"), "오스트리아": ("AUT","Austria","오스트리아"),
-    "덴마크": ("DNK","Denmark","덴마크"), "노르웨이": ("NOR","Norway","노르웨이"), "스웨덴": ("SWE","Sweden","스웨덴"),
-    "핀란드": ("FIN","Finland","핀란드"), "아이슬란드": ("ISL","Iceland","아이슬란드"),
-    "체코": ("CZE","Czechia","체코"), "폴란드": ("POL","Poland","폴란드"), "헝가리": ("HUN","Hungary","헝가리"),
-    "슬로바키아": ("SVK","Slovakia","슬로바키아"), "슬로베니아": ("SVN","Slovenia","슬로베니아"),
-    "크로아티아": ("HRV","Croatia","크로아티아"), "세르비아": ("SRB","Serbia","세르비아"),
-    "몬테네그로": ("MNE","Montenegro","몬테네그로"), "보스니아헤르체고비나": ("BIH","Bosnia and Herzegovina","보스니아헤르체고비나"),
-    "북마케도니아": ("MKD","North Macedonia","북마케도니아"), "알바니아": ("ALB","Albania","알바니아"),
-    "그리스": ("GRC","Greece","그리스"), "터키": ("TUR","Türkiye","터키"),
-    "루마니아": ("ROU","Romania","루마니아"), "불가리아": ("BGR","Bulgaria","불가리아"),
-    "몰도바": ("MDA","Moldova","몰도바"), "우크라이나": ("UKR","Ukraine","우크라이나"), "벨라루스": ("BLR","Belarus","벨라루스"),
-    "리투아니아": ("LTU","Lithuania","리투아니아"), "라트비아": ("LVA","Latvia","라트비아"), "에스토니아": ("EST","Estonia","에스토니아"),
-    "조지아": ("GEO","Georgia","조지아"), "아르메니아": ("ARM","Armenia","아르메니아"), "아제르바이잔": ("AZE","Azerbaijan","아제르바이잔"),
-    "러시아": ("RUS","Russian Federation","러시아"),
-
-    # 🌍 아프리카
-    "이집트": ("EGY","Egypt","이집트"), "리비아": ("LBY","Libya","리비아"), "알제리": ("DZA","Algeria","알제리"),
-    "모로코": ("MAR","Morocco","모로코"), "튀니지": ("TUN","Tunisia","튀니지"), "수단": ("SDN","Sudan","수단"),
-    "남수단": ("SSD","South Sudan","남수단"), "에티오피아": ("ETH","Ethiopia","에티오피아"),
-    "에리트레아": ("ERI","Eritrea","에리트레아"), "지부티": ("DJI","Djibouti","지부티"),
-    "소말리아": ("SOM","Somalia","소말리아"), "케냐": ("KEN","Kenya","케냐"), "탄자니아": ("TZA","Tanzania","탄자니아"),
-    "우간다": ("UGA","Uganda","우간다"), "르완다": ("RWA","Rwanda","르완다"), "부룬디": ("BDI","Burundi","부룬디"),
-    "콩고민주공화국": ("COD","Democratic Republic of the Congo","콩고민주공화국"),
-    "콩고공화국": ("COG","Republic of the Congo","콩고공화국"),
-    "앙골라": ("AGO","Angola","앙골라"), "잠비아": ("ZMB","Zambia","잠비아"), "짐바브웨": ("ZWE","Zimbabwe","짐바브웨"),
-    "말라위": ("MWI","Malawi","말라위"), "모잠비크": ("MOZ","Mozambique","모잠비크"), "마다가스카르": ("MDG","Madagascar","마다가스카르"),
-    "남아프리카공화국": ("ZAF","South Africa","남아프리카공화국"), "보츠와나": ("BWA","Botswana","보츠와나"),
-    "나미비아": ("NAM","Namibia","나미비아"), "레소토": ("LSO","Lesotho","레소토"), "에스와티니": ("SWZ","Eswatini","에스와티니"),
-    "가나": ("GHA","Ghana","가나"), "코트디부아르": ("CIV","Côte d'Ivoire","코트디부아르"), "나이지리아": ("NGA","Nigeria","나이지리아"),
-    "세네갈": ("SEN","Senegal","세네갈"), "말리": ("MLI","Mali","말리"), "니제르": ("NER","Niger","니제르"),
-    "차드": ("TCD","Chad","차드"), "카메룬": ("CMR","Cameroon","카메룬"), "가봉": ("GAB","Gabon","가봉"),
-    "적도기니": ("GNQ","Equatorial Guinea","적도기니"),
-
-    # 🌎 아메리카
-    "미국": ("USA","United States of America","미국"), "캐나다": ("CAN","Canada","캐나다"),
-    "멕시코": ("MEX","Mexico","멕시코"), "브라질": ("BRA","Brazil","브라질"), "아르헨티나": ("ARG","Argentina","아르헨티나"),
-    "칠레": ("CHL","Chile","칠레"), "페루": ("PER","Peru","페루"), "콜롬비아": ("COL","Colombia","콜롬비아"),
-    "에콰도르": ("ECU","Ecuador","에콰도르"), "우루과이": ("URY","Uruguay","우루과이"), "파라과이": ("PRY","Paraguay","파라과이"),
-    "볼리비아": ("BOL","Bolivia","볼리비아"), "베네수엘라": ("VEN","Venezuela","베네수엘라"),
-    "쿠바": ("CUB","Cuba","쿠바"), "도미니카공화국": ("DOM","Dominican Republic","도미니카공화국"),
-    "자메이카": ("JAM","Jamaica","자메이카"), "아이티": ("HTI","Haiti","아이티"),
-    "코스타리카": ("CRI","Costa Rica","코스타리카"), "파나마": ("PAN","Panama","파나마"),
-    "온두라스": ("HND","Honduras","온두라스"), "엘살바도르": ("SLV","El Salvador","엘살바도르"),
-    "니카라과": ("NIC","Nicaragua","니카라과"), "과테말라": ("GTM","Guatemala","과테말라"),
-
-    # 🌊 오세아니아
-    "호주": ("AUS","Australia","호주"), "뉴질랜드": ("NZL","New Zealand","뉴질랜드"),
-    "파푸아뉴기니": ("PNG","Papua New Guinea","파푸아뉴기니"), "피지": ("FJI","Fiji","피지"),
-    "사모아": ("WSM","Samoa","사모아"), "통가": ("TON","Tonga","통가"), "바누아투": ("VUT","Vanuatu","바누아투"),
-}
-
-REGION_RULES = {
-    "메콩강위원회": [
-        ("KHM","Cambodia","캄보디아"),
-        ("LAO","Laos","라오스"),
-        ("THA","Thailand","태국"),
-        ("VNM","Vietnam","베트남"),
-    ],
-    "호주·한국": [
-        ("AUS","Australia","호주"),
-        ("KOR","Korea, Republic of","대한민국"),
-    ],
-    "중남미 지역": [
-        ("ARG","Argentina","아르헨티나"),("BRA","Brazil","브라질"),("CHL","Chile","칠레"),
-        ("URY","Uruguay","우루과이"),("PRY","Paraguay","파라과이"),("BOL","Bolivia","볼리비아"),
-        ("PER","Peru","페루"),("ECU","Ecuador","에콰도르"),("COL","Colombia","콜롬비아"),
-        ("VEN","Venezuela","베네수엘라"),("GUY","Guyana","가이아나"),("SUR","Suriname","수리남"),
-        ("MEX","Mexico","멕시코"),("GTM","Guatemala","과테말라"),("BLZ","Belize","벨리즈"),
-        ("HND","Honduras","온두라스"),("SLV","El Salvador","엘살바도르"),("NIC","Nicaragua","니카라과"),
-        ("CRI","Costa Rica","코스타리카"),("PAN","Panama","파나마"),
-        ("CUB","Cuba","쿠바"),("DOM","Dominican Republic","도미니카공화국"),("HTI","Haiti","아이티"),
-        ("JAM","Jamaica","자메이카"),("BRB","Barbados","바베이도스"),("BHS","Bahamas","바하마"),
-        ("TTO","Trinidad and Tobago","트리니다드토바고"),("LCA","Saint Lucia","세인트루시아"),
-        ("VCT","Saint Vincent and the Grenadines","세인트빈센트그레나딘"),
-        ("KNA","Saint Kitts and Nevis","세인트키츠네비스"),
-        ("GRD","Grenada","그레나다"),("DMA","Dominica","도미니카연방"),
-        ("ATG","Antigua and Barbuda","앤티가바부다"),("PRI","Puerto Rico","푸에르토리코"),
-        ("VIR","Virgin Islands (U.S.)","미국령 버진 아일랜드"),
-        ("CYM","Cayman Islands","케이맨 제도"),("TCA","Turks and Caicos Islands","터크스 케이커스 제도"),
-        ("ABW","Aruba","아루바"),("CUW","Curaçao","퀴라소"),("SXM","Sint Maarten","신트마르턴"),
-        ("MAF","Saint Martin (French part)","생마르탱"),
-    ],
-}
-
-def split_countries(x: str):
-    if pd.isna(x): return []
-    return [tok for tok in re.split(r"[·/,;|&]+|\s*,\s*|\s*&\s*", str(x).strip()) if tok]
 
-def map_country_token(token: str):
-    tkn = token.strip()
-    if tkn in COUNTRY_MAP: return [COUNTRY_MAP[tkn]]
-    if tkn in REGION_RULES: return REGION_RULES[tkn]
-    out = []
-    for s in re.split(r"[·/,;|&]+", tkn):
-        s = s.strip()
-        if s in COUNTRY_MAP: out.append(COUNTRY_MAP[s])
-    return out
-
-def expand_by_country(df_in: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for _, row in df_in.iterrows():
-        tokens = split_countries(row.get("대상국",""))
-        mapped = []
-        for tk in tokens: mapped.extend(map_country_token(tk))
-        if not mapped: continue
-        for iso3, en, ko in mapped:
-            d = row.to_dict()
-            d.update({"iso3": iso3, "country_en": en, "country_ko": ko})
-            rows.append(d)
-    return pd.DataFrame(rows)
-
-dfx = expand_by_country(df)
+def expand_by_country(df_in: pd.DataFrame, bridge: pd.DataFrame, cols: Optional[list] = None) -> pd.DataFrame:
+    """
+    보고서 × 대상국 확장. 좁은 브리지(country_bridge)에 원본 컬럼 중 cols만 위치 인덱스로 붙인다.
+    index = 문서 id(본문은 texts.attach로 필요한 행에만).
+    """
+    cols = [c for c in (df_in.columns if cols is None else cols) if c in df_in.columns]
+    out = df_in[cols].iloc[bridge["doc_id"].to_numpy()]
+    return out.assign(iso3=bridge["iso3"].to_numpy(), country_en=bridge["country_en"].to_numpy(),
+                      country_ko=bridge["country_ko"].to_numpy())
 
 # --------------------- 세계 경계 + key_on 자동 ---------------------
-@st.cache_data(show_spinner=False)
-def get_world_geojson_auto() -> Dict:
-    url = "https://raw.githubusercontent.com/python-visualization/folium/master/examples/data/world-countries.json"
-    cache_dir = pathlib.Path(".ksp_cache"); cache_dir.mkdir(exist_ok=True)
-    local = cache_dir / ("world-countries." + hashlib.md5(url.encode()).hexdigest() + ".json")
-    if not local.exists():
-        with urllib.request.urlopen(url, timeout=20) as resp: local.write_bytes(resp.read())
-    return json.loads(local.read_text(encoding="utf-8"))
-
-world_geojson = get_world_geojson_auto()
+# 경계는 번들(assets/geo/world_lod.json, ksp_build.py --geo로 생성)에서만 읽는다 — 네트워크 없는 호스트 기준.
+# 지도 줌 범위(기본 줌 + 확대 여유)에 맞는 단순화 단계를 고른다. 번들이 없거나 읽을 수 없으면
+# 지도 자리에만 안내를 띄우고(국가는 목록에서 선택) 대시보드/추이/키워드 패널은 그대로 그린다.
+from ksp_geo import GEO_ASSET, pick_lod, load_world_lod
+
+MAP_ZOOM, MAP_MIN_ZOOM = 3, 2      # make_base_map 기본값
+MAP_LOD = pick_lod(MAP_ZOOM + 2)
+
+# 경계는 리소스 캐시(세션 공유 · 읽기 전용). 리런마다 수 MB 지오메트리를 언피클 복사하지 않는다.
+@cached("geo", resource=True, show_spinner=False)
+def get_world_geojson_auto(level: int = MAP_LOD) -> Dict:
+    return load_world_lod(level)
+
+_GEO_HELP = ("세계 경계 GeoJSON(예: folium의 world-countries.json)을 받아 앱 폴더에서 "
+             "`python ksp_build.py --geo world-countries.json` 을 실행하면 번들이 만들어집니다.")
+world_geojson, GEO_PROBLEM = None, None
+if not GEO_ASSET.exists():
+    GEO_PROBLEM = f"세계 경계 번들이 없어 지도를 건너뜁니다: {GEO_ASSET}"
+else:
+    try:
+        world_geojson = get_world_geojson_auto()
+    except Exception as e:
+        GEO_PROBLEM = f"세계 경계 번들을 읽지 못해 지도를 건너뜁니다({e})."
 
 def resolve_geojson_key_on(gj: dict):
     feat0 = gj["features"][0]; props = feat0.get("properties", {})
@@ -1197,29 +936,211 @@ def resolve_geojson_key_on(gj: dict):
     if "id" in feat0: return "feature.id", "id", False
     raise ValueError("GeoJSON에서 ISO3 키를 찾지 못했습니다.")
 
-key_on_info = resolve_geojson_key_on(world_geojson)
+key_on_info = resolve_geojson_key_on(world_geojson) if world_geojson is not None else None
 
-def augment_geojson_values(gj: dict, key_on_info, value_map: dict, value_prop: str):
+@cached("geo", resource=True, show_spinner=False, max_entries=64)
+def _augmented_geojson(gj_id: int, key_on_info: tuple, value_prop: str, values: tuple, tips: tuple, _gj: dict) -> dict:
     key_on_str, iso_key, in_props = key_on_info
-    new_gj = copy.deepcopy(gj)
-    for feat in new_gj["features"]:
-        props = feat.setdefault("properties", {})
+    vm, tm = dict(values), dict(tips)
+    feats = []
+    for feat in _gj["features"]:
+        props = feat.get("properties") or {}
         iso = props.get(iso_key) if in_props else feat.get("id")
-        props["ISO3"] = iso
-        props[value_prop] = value_map.get(str(iso), 0)
-    return new_gj
+        # geometry는 원본 객체를 그대로 참조, feature 껍데기와 properties만 새로
+        extra = {TIP_PROP: tm.get(str(iso), "")} if tm else {}
+        feats.append({**feat, "properties": {**props, "ISO3": iso, value_prop: vm.get(str(iso), 0), **extra}})
+    return {**_gj, "features": feats}
+
+TIP_PROP = "요약"
+
+def augment_geojson_values(gj: dict, key_on_info, value_map: dict, value_prop: str, tips: Optional[dict] = None):
+    """
+    ISO3별 값(과 선택적 툴팁 문자열 tips → properties[TIP_PROP])을 feature properties에 주입(툴팁/색칠용).
+    지오메트리는 공유하고 복사하지 않으며, 결과는 (경계, 값 맵) 조합별로 메모 → 같은 보기로 돌아오면
+    재생성 없음. 반환 dict는 읽기 전용.
+    """
+    values = tuple(sorted((str(k), v) for k, v in value_map.items()))
+    tips = tuple(sorted((str(k), v) for k, v in (tips or {}).items()))
+    return _augmented_geojson(id(gj), tuple(key_on_info), value_prop, values, tips, gj)
 
 # --------------------- 지도/클릭 유틸 ---------------------
-def make_base_map(center=[15,10], zoom=3):
+def make_base_map(center=[15,10], zoom=MAP_ZOOM):
     m = folium.Map(
         location=center, zoom_start=zoom, tiles=None,
         control_scale=True, prefer_canvas=True,
         world_copy_jump=False, max_bounds=True, max_bounds_viscosity=1.0,
-        min_zoom=2
+        min_zoom=MAP_MIN_ZOOM
     )
     folium.TileLayer(tiles="CartoDB Positron", name="Base", control=False, no_wrap=True).add_to(m)
     return m
 
+# 지도 컴포넌트: (모드, ICT 유형, 데이터 버전, 경계)별로 만든 folium 지도를 세션에 보관해 리런 때 재구성하지 않고,
+# st_folium이 돌려주는 값을 클릭 이벤트로 한정 → 팬/줌/bounds 변화로는 스크립트가 다시 돌지 않는다.
+# (st_folium이 렌더 중 지도 구조를 고치므로 세션 간 공유 캐시에는 두지 않음)
+MAP_EVENTS = ["last_object_clicked", "last_object_clicked_popup"]
+MAP_CACHE_MAX = 4
+
+def session_map(key: tuple, build):
+    store = st.session_state.setdefault("_map_cache", OrderedDict())
+    m = store.get(key)
+    if m is None:
+        m = store[key] = build()
+        while len(store) > MAP_CACHE_MAX:
+            store.popitem(last=False)
+    else:
+        store.move_to_end(key)
+    return m
+
+def show_map(m, key: str, height: int):
+    return st_folium(m, key=key, height=height, use_container_width=True, returned_objects=MAP_EVENTS)
+
+# --------------------- 국가 지도 백엔드(folium | plotly) ---------------------
+# 두 지도 모드가 같은 진입점(render_country_map)을 쓰고, 백엔드는 배포별로 KSP_MAP_BACKEND 또는 사이드바에서 고른다.
+# 경계/값 주입은 augment_geojson_values 결과(properties.ISO3 + 값)를 공통으로 사용.
+MAP_BACKENDS = ["folium", "plotly"]
+MAP_BACKEND_DEFAULT = os.environ.get("KSP_MAP_BACKEND", "folium").strip().lower()
+if MAP_BACKEND_DEFAULT not in MAP_BACKENDS:
+    MAP_BACKEND_DEFAULT = "folium"
+# 연도별 보기는 plotly 기본: 경계 한 벌 + 연도별 값 배열. folium 시간 슬라이더는 국가×연도마다
+# 스타일 dict를 따로 실어 보내 payload가 연도 수에 비례해 커진다
+MAP_YEAR_BACKEND_DEFAULT = os.environ.get("KSP_YEAR_MAP_BACKEND", "plotly").strip().lower()
+if MAP_YEAR_BACKEND_DEFAULT not in MAP_BACKENDS:
+    MAP_YEAR_BACKEND_DEFAULT = "plotly"
+
+def _folium_country_map(gj: dict, agg: pd.DataFrame, value_col: str, value_prop: str,
+                        legend: str, alias: str, style: dict, tips: bool = False):
+    base = make_base_map()
+    ch = folium.Choropleth(
+        geo_data=gj, data=agg, columns=["iso3", value_col],
+        key_on=key_on_info[0],
+        fill_color=style["fill_color"], fill_opacity=style["fill_opacity"],
+        line_opacity=style["line_opacity"], line_color=style["line_color"],
+        legend_name=legend, nan_fill_color=style["nan_fill_color"],
+        highlight=True
+    ); ch.add_to(base)
+    ch.geojson.add_child(folium.features.GeoJsonTooltip(
+        fields=["ISO3", "name" if "name" in gj["features"][0]["properties"] else "ISO3", value_prop] + ([TIP_PROP] if tips else []),
+        aliases=["ISO3", "국가", alias] + ([TIP_PROP] if tips else []), sticky=False
+    ))
+    ch.geojson.add_child(folium.features.GeoJsonPopup(fields=["ISO3"], aliases=["ISO3"]))
+    return base
+
+def _plotly_country_map(gj: dict, agg: pd.DataFrame, value_col: str, legend: str, alias: str,
+                        style: dict, height: int, tips: Optional[dict] = None):
+    tip = agg["iso3"].map(tips or {}).fillna("")
+    fig = go.Figure(go.Choropleth(
+        geojson=gj, featureidkey="properties.ISO3",
+        locations=agg["iso3"], z=agg[value_col], customdata=np.column_stack([agg["country_ko"], tip]),
+        colorscale=style["fill_color"], marker_opacity=style["fill_opacity"],
+        marker_line_color=style["line_color"], marker_line_width=0.5,
+        colorbar_title_text=legend,
+        hovertemplate="%{location} · %{customdata[0]}<br>" + alias + ": %{z}<br>%{customdata[1]}<extra></extra>",
+    ))
+    fig.update_geos(projection_type="natural earth", showframe=False, showcoastlines=False,
+                    showland=True, landcolor=style["nan_fill_color"], showcountries=True,
+                    countrycolor="#d0d0d0", lataxis_range=[-58, 85])
+    fig.update_layout(height=height, margin=dict(l=0, r=0, t=0, b=0), clickmode="event+select")
+    return fig
+
+# ---- 연도 애니메이션: 경계는 한 번, 연도별로는 값 배열만(프레임 전환은 브라우저에서 → 슬라이더 조작에 리런 없음)
+def _year_frames(mask: Optional[np.ndarray]) -> tuple[list, np.ndarray]:
+    return geo_inc.counts_by_year(corpus.year_ptr, corpus.year_vals, mask)   # (연도, 연도×국가 건수)
+
+def _plotly_year_map(gj: dict, mask: Optional[np.ndarray], legend: str, alias: str, style: dict, height: int):
+    ys, mat = _year_frames(mask)
+    keep = np.flatnonzero(mat.sum(axis=0))          # 한 해라도 값이 있는 국가만
+    iso, names = geo_inc.iso3[keep], geo_inc.country_ko[keep]
+    zs = [np.where(row[keep] > 0, row[keep], np.nan) for row in mat]   # 0 = 미색칠(무자료)
+    zmax = max(int(mat.max()) if mat.size else 1, 1)
+    trace = dict(geojson=gj, featureidkey="properties.ISO3", locations=iso, customdata=names,
+                 colorscale=style["fill_color"], zmin=0, zmax=zmax, marker_opacity=style["fill_opacity"],
+                 marker_line_color=style["line_color"], marker_line_width=0.5, colorbar_title_text=legend,
+                 hovertemplate="%{location} · %{customdata}<br>" + alias + ": %{z}<extra></extra>")
+    fig = go.Figure(go.Choropleth(z=zs[0] if zs else [], **trace),
+                    frames=[go.Frame(name=str(y), data=[go.Choropleth(z=z)]) for y, z in zip(ys, zs)])
+    steps = [dict(method="animate", label=str(y),
+                  args=[[str(y)], dict(mode="immediate", frame=dict(duration=0, redraw=True), transition=dict(duration=0))])
+             for y in ys]
+    fig.update_layout(
+        height=height, margin=dict(l=0, r=0, t=0, b=0), clickmode="event+select",
+        sliders=[dict(active=0, steps=steps, currentvalue=dict(prefix="연도 "), pad=dict(t=10))],
+        updatemenus=[dict(type="buttons", showactive=False, x=0, y=0, xanchor="left", yanchor="top",
+                          buttons=[dict(label="▶", method="animate",
+                                        args=[None, dict(frame=dict(duration=700, redraw=True), fromcurrent=True)]),
+                                   dict(label="❚❚", method="animate",
+                                        args=[[None], dict(mode="immediate", frame=dict(duration=0, redraw=False))])])],
+    )
+    fig.update_geos(projection_type="natural earth", showframe=False, showcoastlines=False,
+                    showland=True, landcolor=style["nan_fill_color"], showcountries=True,
+                    countrycolor="#d0d0d0", lataxis_range=[-58, 85])
+    return fig
+
+def _folium_year_map(gj: dict, mask: Optional[np.ndarray], legend: str, style: dict):
+    from folium.plugins import TimeSliderChoropleth
+    import branca.colormap as bcm
+    ys, mat = _year_frames(mask)
+    base = make_base_map()
+    scale = getattr(bcm.linear, f"{style['fill_color']}_09", bcm.linear.YlGnBu_09).scale(0, max(int(mat.max()) if mat.size else 1, 1))
+    scale.caption = legend
+    stamps = [str(int(pd.Timestamp(year=int(y), month=1, day=1).timestamp())) for y in ys]
+    col = {iso: j for j, iso in enumerate(geo_inc.iso3)}
+    # 시간 슬라이더는 feature.id로 스타일을 찾으므로 id = ISO3인 얕은 사본(지오메트리 공유)
+    feats = [{**f, "id": f["properties"]["ISO3"]} for f in gj["features"]]
+    styledict = {}
+    for f in feats:
+        j = col.get(f["id"])
+        styledict[str(f["id"])] = {
+            t: ({"color": scale(int(mat[i, j])), "opacity": style["fill_opacity"]} if j is not None and mat[i, j] > 0
+                else {"color": style["nan_fill_color"], "opacity": 0.6})
+            for i, t in enumerate(stamps)}
+    TimeSliderChoropleth({**gj, "features": feats}, styledict=styledict, date_options="YYYY",
+                         stroke_color=style["line_color"], stroke_opacity=style["line_opacity"]).add_to(base)
+    scale.add_to(base)
+    return base
+
+def render_country_map(view: tuple, agg: pd.DataFrame, value_col: str, value_prop: str,
+                       legend: str, alias: str, height: int, key: str, backend: str = "folium",
+                       by_year: bool = False, mask: Optional[np.ndarray] = None, tips: Optional[dict] = None,
+                       **style) -> Optional[str]:
+    """
+    국가별 값 지도(agg: iso3/country_ko/value_col). view = 캐시 키(모드, 클래스, 데이터 버전 …).
+    by_year면 mask 문서의 연도×국가 건수로 연도 슬라이더/애니메이션 지도를 그린다.
+    tips = ISO3 → 툴팁 보조 문구(요약표에서, 정적 지도에만).
+    반환 = 클릭한 국가 ISO3(없으면 None). '지도 성능 표시'를 켜면 서버 처리 시간/payload 크기를 표시.
+    """
+    if world_geojson is None:
+        return _country_picker(agg, value_col, alias, key)
+    t0 = time.perf_counter()
+    gj = augment_geojson_values(world_geojson, key_on_info,
+                                {r.iso3: int(getattr(r, value_col)) for r in agg.itertuples()}, value_prop, tips)
+    view = (backend,) + tuple(view) + (id(world_geojson), by_year)
+    if backend == "plotly":
+        build = ((lambda: _plotly_year_map(gj, mask, legend, alias, style, height)) if by_year
+                 else (lambda: _plotly_country_map(gj, agg, value_col, legend, alias, style, height, tips)))
+        obj = session_map(view, build)
+        event = st.plotly_chart(obj, key=f"{key}_plotly", on_select="rerun", selection_mode="points",
+                                use_container_width=True, config={"displayModeBar": False})
+        pts = event.get("selection", {}).get("points", []) if event else []
+        iso = pts[0].get("location") if pts else None
+    else:
+        build = ((lambda: _folium_year_map(gj, mask, legend, style)) if by_year
+                 else (lambda: _folium_country_map(gj, agg, value_col, value_prop, legend, alias, style, bool(tips))))
+        obj = session_map(view, build)
+        iso = extract_iso_from_stfolium(show_map(obj, key, height=height))
+    if st.session_state.get("map_bench"):
+        ms = (time.perf_counter() - t0) * 1e3
+        size = len(obj.to_json()) if backend == "plotly" else len(obj.get_root().render())   # 측정 시에만 직렬화
+        st.caption(f"지도 엔진 {backend} · 서버 처리 {ms:.1f} ms · payload {size / 1e3:,.0f} KB")
+    return iso
+
+def _country_picker(agg: pd.DataFrame, value_col: str, alias: str, key: str) -> Optional[str]:
+    """경계 번들이 없을 때 지도 대신: 안내 + 국가 목록 선택(건수 순). 반환 = 선택 ISO3"""
+    st.warning(f"{GEO_PROBLEM}\n\n{_GEO_HELP}")
+    agg = agg.sort_values(value_col, ascending=False)
+    label = {r.iso3: f"{r.country_ko} ({alias} {int(getattr(r, value_col)):,})" for r in agg.itertuples()}
+    return st.selectbox("국가 선택", [None] + list(label), key=f"{key}_pick",
+                        format_func=lambda iso: "—" if iso is None else label[iso])
+
 def extract_iso_from_stfolium(ret: dict):
     if not ret: return None
     iso_keys = ["ISO3","id","iso_a3","ISO_A3","adm0_a3","ADM0_A3","wb_a3","WB_A3"]
@@ -1240,103 +1161,110 @@ def extract_iso_from_stfolium(ret: dict):
     return None
 
 # --------------------- 연도 파서 ---------------------
-# === KEEP ONLY THIS ===
-YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+# 연도는 코퍼스 인덱스에서 한 번 파싱(year_spans)해 문서→연도 CSR / (doc_id, 연도) 브리지로만 들고 다닌다.
+# 전체 프레임(본문 포함)을 연도 수만큼 explode해 두지 않는다.
 
-def years_from_span(text):
+def expand_by_year(df_in: pd.DataFrame, ybr: pd.DataFrame, cols: Optional[list] = None) -> pd.DataFrame:
     """
-    '2025-2026' → [2025,2026], '2025' → [2025]
-    숫자(정수/실수)도 허용. 범위가 뒤집혀도 정상화.
+    보고서 × 연도 확장(필요할 때만). 좁은 브리지(year_bridge)에 원본 컬럼 중 cols만 위치 인덱스로 붙인다.
+    index = 문서 id, 첫 열 = '연도'.
     """
-    if pd.isna(text):
-        return []
-
-    if isinstance(text, (int, np.integer, float, np.floating)):
-        y = int(text)
-        return [y] if 1990 <= y <= 2035 else []
-
-    t = str(text)
-    t = t.replace("~", "-").replace("–", "-").replace("—", "-")
-    t = re.sub(r"[()]", " ", t)
-
-    years = [int(y) for y in YEAR_RE.findall(t)]
-    years = [y for y in years if 1990 <= y <= 2035]
-
-    # 범위 확장
-    for a, b in re.findall(r"((?:19|20)\d{2})\s*-\s*((?:19|20)\d{2})", t):
-        a, b = int(a), int(b)
-        lo, hi = min(a, b), max(a, b)
-        years.extend(range(lo, hi + 1))
-
-    years = sorted(set(years))
-    return years
-
-
-# === 연도 텍스트 시리즈 선택 ===
-def _year_text_series(df_in: pd.DataFrame) -> pd.Series:
-    """연도 원천: 지정 컬럼 > 관용 컬럼들 > 요약/본문 등 텍스트 결합 → 문자열 시리즈 반환"""
-    ys_col = globals().get("YEAR_SOURCE", None)
-    if ys_col and ys_col in df_in.columns:
-        return df_in[ys_col].astype(str)
-
-    for c in ["사업 기간","연도","기간","Project Period","Years","Year","year"]:
-        if c in df_in.columns:
-            return df_in[c].astype(str)
-
-    pool = [c for c in ["요약","주요 내용","파일명"] if c in df_in.columns]
-    if pool:
-        return df_in[pool].fillna("").astype(str).agg(" ".join, axis=1)
-
-    # 최후: 빈 문자열 시리즈 (길이 맞춰서 반환)
-    return pd.Series([""] * len(df_in), index=df_in.index, dtype=str)
-
-
-@st.cache_data(show_spinner=False)
-def expand_years(df_in: pd.DataFrame) -> pd.DataFrame:
-    """
-    - YEAR_SOURCE 지정/자동 탐색(_year_text_series)로 연도 텍스트를 확보
-    - years_from_span으로 연도 리스트 추출 후 explode
-    - '연도'가 DataFrame(중복명)으로 생겨도 안전하게 1-D로 강제
-    """
-    if df_in is None or df_in.empty:
-        return pd.DataFrame({"연도": pd.Series([], dtype="Int64")})
-
-    # ① 중복 컬럼 제거
-    df1 = df_in.loc[:, ~df_in.columns.duplicated()].copy()
-
-    # ② 연도 원천 시리즈 확보 (지정 컬럼 > 관용 컬럼들 > 텍스트 결합)
-    ser = _year_text_series(df1)  # ← 앞서 추가한 헬퍼
-
-    # ③ 연도 파싱
-    years_list = ser.apply(years_from_span)
-    if not years_list.apply(lambda x: bool(x)).any():
-        return pd.DataFrame({"연도": pd.Series([], dtype="Int64")})
-
-    # ④ explode
-    dfy = df1.assign(__years=years_list).explode("__years").rename(columns={"__years": "연도"})
-
-    # ⑤ '연도'를 반드시 1-D Series로 강제
-    y = dfy["연도"]
-    if isinstance(y, pd.DataFrame):  # 혹시라도 또 중복되면 첫 열 사용
-        y = y.iloc[:, 0]
-    y = pd.to_numeric(y, errors="coerce").astype("Int64")
-
-    # 동일 이름 컬럼들 정리 후 삽입
-    dup_cols = [c for c in dfy.columns if c == "연도"]
-    dfy = dfy.drop(columns=dup_cols)
-    dfy.insert(0, "연도", y.values)
-
-    return dfy
-
+    cols = [c for c in (df_in.columns if cols is None else cols) if c in df_in.columns and c != "연도"]
+    out = df_in[cols].iloc[ybr["doc_id"].to_numpy()]
+    out.insert(0, "연도", ybr["연도"].to_numpy())
+    return out
 
 
+# --------------------- 증분 코퍼스 인덱스 ---------------------
+# 프로세스당 스키마별 CorpusIndex 1개. ksp_build.py로 만든 번들이 있으면 첫 sync에서 mmap으로 열어
+# 그 상태에서 시작한다(같은 버전이면 텍스트 처리 없이 바로 뷰 반환, 다르면 변경분만 파싱).
 
+@cached("bridges", resource=True, show_spinner=False)
+def _corpus_indexes() -> dict:
+    return {}
 
-dfy = expand_years(df)     # 키워드/주제 상대 트렌드는 '국가 중복 없는' 원본 df 기준
+def sync_corpus(df_in: pd.DataFrame, texts_in: Optional[TextStore] = None) -> CorpusView:
+    """현재 df 버전의 파생 구조(같은 스키마의 이전 버전과는 변경분만 계산)"""
+    texts_in = texts_in if texts_in is not None else texts
+    pool = _corpus_indexes()
+    schema = tuple(map(str, df_in.columns))
+    idx = pool.get(schema)
+    if idx is None:
+        idx = pool.setdefault(schema, CorpusIndex(bundle_root=BUNDLE_DIR))
+    # 파싱이 필요한 변경 행에만 본문을 붙인다(행 해시는 본문 포함 — ksp_build.py와 동일)
+    return idx.sync(df_in, derive=lambda part: derive_rows(texts_in.attach(part)),
+                    digests=corpus_digests(df_in, texts_in))
+
+@cached("bridges", show_spinner=False, max_entries=4)
+def _country_bridge(version: str, _countries: list) -> pd.DataFrame:
+    return country_bridge(_countries)
+
+@cached("bridges", resource=True, show_spinner=False, max_entries=4)
+def _country_incidence(version: str, _bridge: pd.DataFrame, _doc_keys: pd.Series) -> CountryIncidence:
+    # 문서×국가 CSR(버전당 1회). 지도 집계는 필터 마스크 × 행렬로만 계산
+    return CountryIncidence(_bridge, len(_doc_keys), _doc_keys)
+
+@cached("bridges", show_spinner=False, max_entries=4)
+def _year_bridge(version: str, _year_ptr: np.ndarray, _year_vals: np.ndarray) -> pd.DataFrame:
+    # 버전 문자열만 캐시 키(대용량 배열 해싱 생략)
+    return year_bridge(_year_ptr, _year_vals)
+
+@cached("bridges", resource=True, show_spinner=False, max_entries=4)
+def _group_summary(version: str, _df_in: pd.DataFrame, _bridge: pd.DataFrame, _ybr: pd.DataFrame,
+                   _cats: CategoryCodes) -> dict:
+    # 국가/ICT 유형별 패널 지표(버전당 1회, 읽기 전용 공유) → 클릭 시 dict 조회만
+    return group_summary(_df_in, _bridge, _ybr, _cats)
+
+def summary_tips(recs: dict) -> dict:
+    """요약표 → 지도 툴팁 문구(ISO3/유형 → '2014–2019 · 기관 3곳 · ICT 유형 2')"""
+    return {k: f"{r['year_min'] or '-'}–{r['year_max'] or '-'} · 기관 {r['n_inst']}곳 · ICT 유형 {r['n_ict']}"
+            for k, r in recs.items()}
+
+# 토큰은 코퍼스 인덱스가 문서당 한 번 만든 TokenStore(corpus.tokens)에서 잘라 센다.
+# 필터(불용어/숫자)는 어휘 단위 bool 마스크로 버전당 한 번만 평가.
+@cached("keywords", resource=True, show_spinner=False, max_entries=8)
+def _token_keep(version: str, kind: str, rule: str, _tokens: TokenStore, _pred) -> np.ndarray:
+    return _tokens.keep(kind, _pred)
+
+@cached("keywords", resource=True, show_spinner=False, max_entries=2)
+def _term_matrix(version: str, _tokens: TokenStore, _has_text: np.ndarray) -> TermMatrix:
+    # 대비 키워드용 문서×용어 CSR(공유, 선택 변경 시 mat-vec 한 번). 키워드 포함 문서는 키워드당 1회 계산해 보관
+    return TermMatrix.from_tokens(_tokens, has_text=_has_text, phrases=True)
+
+@cached("keywords", resource=True, show_spinner=False, max_entries=4)
+def _sentence_index(version: str, sel: str, cols: tuple, _df: pd.DataFrame) -> list:
+    # 문장 샘플용 문장/명사 토큰열(클래스 선택당 1회 — 키워드·리런마다 다시 쪼개지 않음)
+    return sentence_index(_df, list(cols))
+
+def _cloud_ok(w: str) -> bool:
+    return bool(w) and w.lower() not in STOP_LOW and not re.fullmatch(r"\d+(\.\d+)?", w)
+
+def cloud_freq(doc_ids) -> Counter:
+    """워드클라우드 빈도(해시태그 조각 → 요약/주요 내용 낱말 순으로 이어 셈, 불용어/숫자 제외)"""
+    tok = corpus.tokens
+    keep = _token_keep(corpus.version, "cloud_tags", "cloud", tok, _cloud_ok)
+    return tok.counter(("cloud_tags", "cloud_words"), doc_ids, keep)
+
+corpus = sync_corpus(df, texts)
+bridge = _country_bridge(corpus.version, corpus.countries)   # (doc_id, iso3, country_en, country_ko)
+geo_inc = _country_incidence(corpus.version, bridge, df["파일명"] if "파일명" in df.columns else pd.Series(range(len(df))))
+ybr = _year_bridge(corpus.version, corpus.year_ptr, corpus.year_vals)   # (doc_id, 연도) — 트렌드는 '국가 중복 없는' 원본 df 기준
+summary = _group_summary(corpus.version, df, bridge, ybr, cats)                  # {"country": {iso3: …}, "class": {유형: …}}
 
 # --------------------- 보기 모드 ---------------------
 st.sidebar.header("보기 모드")
 mode = st.sidebar.radio("지도 유형", ["국가별 총계", "ICT 유형 단일클래스"], index=0)
+map_by_year = st.sidebar.checkbox("지도 연도별 보기(슬라이더/재생)", value=False, key="map_by_year")
+# 엔진 선택은 정적/연도별 보기마다 따로 기억(기본값이 다름)
+if map_by_year:
+    map_backend = st.sidebar.radio("지도 엔진", MAP_BACKENDS, index=MAP_BACKENDS.index(MAP_YEAR_BACKEND_DEFAULT),
+                                   horizontal=True, key="map_backend_year",
+                                   help="기본값은 환경변수 KSP_YEAR_MAP_BACKEND(folium|plotly)")
+else:
+    map_backend = st.sidebar.radio("지도 엔진", MAP_BACKENDS, index=MAP_BACKENDS.index(MAP_BACKEND_DEFAULT),
+                                   horizontal=True, key="map_backend",
+                                   help="기본값은 환경변수 KSP_MAP_BACKEND(folium|plotly)")
+st.sidebar.checkbox("지도 성능 표시", value=False, key="map_bench")
 
 # 연도 시각화 옵션 (히트맵 제거)
 st.sidebar.header("연도 시각화 방식")
@@ -1349,26 +1277,12 @@ clicked_iso = None
 # ===================== ① 국가별 총계 (클릭) =====================
 if mode == "국가별 총계":
     st.subheader("국가별 총 프로젝트 수")
-    agg_country = dfx.groupby(["iso3","country_ko"], as_index=False).agg(n_docs=("파일명","nunique"))
-    base = make_base_map()
-    value_map = {r.iso3: int(r.n_docs) for _, r in agg_country.iterrows()}
-    gj = augment_geojson_values(world_geojson, key_on_info, value_map, "ksp_docs")
-
-    ch = folium.Choropleth(
-        geo_data=gj, data=agg_country, columns=["iso3","n_docs"],
-        key_on=key_on_info[0],
-        fill_color="YlGnBu", fill_opacity=0.88,
-        line_opacity=0.55, line_color="#7f7f7f",
-        legend_name="보고서 수", nan_fill_color="#f0f0f0",
-        highlight=True
-    ); ch.add_to(base)
-    ch.geojson.add_child(folium.features.GeoJsonTooltip(
-        fields=["ISO3", "name" if "name" in gj["features"][0]["properties"] else "ISO3", "ksp_docs"],
-        aliases=["ISO3", "국가", "보고서 수"], sticky=False
-    ))
-    ch.geojson.add_child(folium.features.GeoJsonPopup(fields=["ISO3"], aliases=["ISO3"]))
-    ret = st_folium(base, height=560, use_container_width=True)
-    clicked_iso = extract_iso_from_stfolium(ret)
+    clicked_iso = render_country_map(
+        ("total", corpus.version), geo_inc.frame(name="n_docs"), "n_docs", "ksp_docs",
+        legend="보고서 수", alias="보고서 수", height=560, key="map_total", backend=map_backend,
+        by_year=map_by_year, tips=summary_tips(summary["country"]),
+        fill_color="YlGnBu", fill_opacity=0.88, line_opacity=0.55, line_color="#7f7f7f", nan_fill_color="#f0f0f0",
+    )
 
 
 
@@ -1575,10 +1489,11 @@ def force_legend_top_padding(fig, base_top=120,
 if mode == "국가별 총계":
     st.subheader("상세 패널")
     if clicked_iso:
-        sub = dfx[dfx["iso3"]==clicked_iso].copy()
-        if not sub.empty:
-            country_name = sub["country_ko"].iloc[0]
-            st.markdown(f"### {country_name} — 프로젝트 {sub['파일명'].nunique()}건")
+        info = summary["country"].get(clicked_iso)
+        if info:
+            sub = texts.attach(expand_by_country(df, bridge[bridge["iso3"]==clicked_iso]))
+            country_name = info["name"]
+            st.markdown(f"### {country_name} — 프로젝트 {info['n_docs']}건")
 
             tab_overview, tab_cloud, tab_table = st.tabs(["개요", "워드클라우드 / 키워드", "테이블"])
 
@@ -1593,38 +1508,17 @@ if mode == "국가별 총계":
                 st.divider()
 
                 st.markdown("#### 핵심 지표")
-                _suby = expand_years(sub)  # 기존에 정의된 함수
-                sub_years = sorted(set(_suby["연도"].dropna().astype(int).tolist()))
                 cA, cB, cC = st.columns(3)
-                with cA: st.metric("연도 범위", f"{min(sub_years) if sub_years else '-'}–{max(sub_years) if sub_years else '-'}")
-                with cB: st.metric("ICT 유형 고유", f"{sub['ICT 유형'].astype(str).str.strip().nunique():,}")
-                with cC: st.metric("대상기관 수", f"{sub['대상기관'].nunique():,}")
+                with cA: st.metric("연도 범위", f"{info['year_min'] or '-'}–{info['year_max'] or '-'}")
+                with cB: st.metric("ICT 유형 고유", f"{info['n_ict']:,}")
+                with cC: st.metric("대상기관 수", f"{info['n_inst']:,}")
+                if info["top"]:
+                    st.caption("함께 수행된 대상국: " + ", ".join(f"{c}({n})" for c, n in info["top"]))
 
             with tab_cloud:
                 st.markdown("#### 워드클라우드 (해시태그 + 요약/내용)")
-                # 0) 토큰 수집 (해시태그 + 요약/내용)
-                tokens: list[str] = []
-                if "Hashtag_str" in sub.columns and sub["Hashtag_str"].notna().any():
-                    for txt in sub["Hashtag_str"].dropna().astype(str):
-                        tokens += [z.strip() for z in re.split(r"[;,]", txt) if z.strip()]
-                elif "Hashtag" in sub.columns and sub["Hashtag"].notna().any():
-                    for txt in sub["Hashtag"].dropna().astype(str):
-                        tokens += [z.strip() for z in re.split(r"[;,]", txt) if z.strip()]
-
-                pool_cols = [c for c in ["요약", "주요 내용"] if c in sub.columns]
-                if pool_cols:
-                    for txt in sub[pool_cols].fillna("").astype(str).agg(" ".join, axis=1).tolist():
-                        for w in re.split(r"[^0-9A-Za-z가-힣]+", txt):
-                            w = w.strip()
-                            if len(w) >= 2:
-                                tokens.append(w)
-
-                # 1) 정제
-                tokens = [
-                    w for w in tokens
-                    if w and w.lower() not in STOP_LOW and not re.fullmatch(r"\d+(\.\d+)?", w)
-                ]
-                freq = Counter(tokens)
+                # 0) 토큰 빈도 (해시태그 + 요약/내용, 불용어/숫자 제외) — 문서별 토큰 id에서
+                freq = cloud_freq(sub.index)
                 top_freqs = dict(freq.most_common(220))
                 top20 = freq.most_common(10)
 
@@ -1693,7 +1587,7 @@ elif mode == "ICT 유형 단일클래스":
     st.subheader("ICT 유형 단일클래스 프로젝트 수")
 
     # 1) 클래스 선택
-    wb_classes = [c for c in sorted(df["ICT 유형"].astype(str).str.strip().dropna().unique()) if c and c != "nan"]
+    wb_classes = cats.classes("ICT 유형")
     if not wb_classes:
         st.info("ICT 유형 값이 없습니다.")
         st.stop()
@@ -1701,37 +1595,26 @@ elif mode == "ICT 유형 단일클래스":
     sel = st.selectbox("ICT 유형 선택", wb_classes, index=0, key="wb_class_select_main")
 
     # 2) 지도(개요): 이 Class가 수행된 '국가 하이라이트'만, 클릭은 집계에 영향 X
-    sub_wb_geo = dfx[dfx["ICT 유형"].astype(str).str.strip() == sel]  # 지도용(국가 확장본 사용)
-    agg_geo = sub_wb_geo.groupby(["iso3", "country_ko"], as_index=False).agg(n=("파일명", "nunique"))
-    value_map = {r.iso3: int(r.n) for _, r in agg_geo.iterrows()}
-    gj = augment_geojson_values(world_geojson, key_on_info, value_map, "ksp_wb_cnt")
-
-    base = make_base_map()
-    ch = folium.Choropleth(
-        geo_data=gj, data=agg_geo, columns=["iso3","n"],
-        key_on=key_on_info[0],
-        fill_color="PuBuGn", fill_opacity=0.90,
-        line_opacity=0.5, line_color="#888",
-        nan_fill_color="#fbfbfb", legend_name=f"{sel} 건수", highlight=True
-    ); ch.add_to(base)
-    ch.geojson.add_child(folium.features.GeoJsonTooltip(
-        fields=["ISO3", "name" if "name" in gj["features"][0]["properties"] else "ISO3", "ksp_wb_cnt"],
-        aliases=["ISO3","국가","건수"], sticky=False
-    ))
-    ch.geojson.add_child(folium.features.GeoJsonPopup(fields=["ISO3"], aliases=["ISO3"]))
+    wb_mask = cats.mask("ICT 유형", sel)   # 문서 마스크(지도/본문 공용) — 정수 코드 비교
+    agg_geo = geo_inc.frame(wb_mask)   # 지도용: 국가별 보고서 수(희소 행렬 × 마스크)
     # 클릭은 보조 정보로만 사용(선택국가 표시에만 쓰고, 본문 집계에는 영향 X)
-    ret = st_folium(base, height=520, use_container_width=True)
-    clicked_iso = extract_iso_from_stfolium(ret)
+    clicked_iso = render_country_map(
+        ("class", sel, corpus.version), agg_geo, "n", "ksp_wb_cnt",
+        legend=f"{sel} 건수", alias="건수", height=520, key="map_class", backend=map_backend,
+        by_year=map_by_year, mask=wb_mask,
+        fill_color="PuBuGn", fill_opacity=0.90, line_opacity=0.5, line_color="#888", nan_fill_color="#fbfbfb",
+    )
 
     # 3) 상세 패널 — ★ 핵심: '클래스 전체' 기준으로 집계/시각화 ★
     st.subheader("상세 패널 — ICT 유형")
 
     # 본문 집계용은 '국가 확장 없는 원본 df'에서 필터 (동일 보고서가 다국가에 중복 집계되는 문제 방지)
-    sub_wb = df[df["ICT 유형"].astype(str).str.strip() == sel].copy()
+    sub_wb = texts.attach(df[wb_mask])
 
     # 상단 타이틀 + 메트릭
-    n_docs = sub_wb["파일명"].nunique()
-    part_countries = sub_wb_geo["iso3"].nunique()  # 참여국가 수(지도용 확장 df로 계산)
+    info = summary["class"].get(sel) or {"n_docs": 0, "n_inst": 0, "year_min": None, "year_max": None, "top": []}
+    n_docs = info["n_docs"]
+    part_countries = geo_inc.n_countries(wb_mask)  # 참여국가 수(문서×국가 행렬로 계산)
     st.markdown(f"### {sel} — 전체 프로젝트 {n_docs:,}건 · 참여국가 {part_countries:,}개국")
 
     tab_overview, tab_brief, tab_cloud, tab_extract, tab_table = st.tabs(
@@ -1741,24 +1624,20 @@ elif mode == "ICT 유형 단일클래스":
 
     # ---- (1) 개요: 연도 범위, 대상기관 수, 참여국가 상위 보기(선택 국가 보조 표기) ----
     with tab_overview:
-        _suby = expand_years(sub_wb)
-        sub_years = sorted(set(_suby["연도"].dropna().astype(int).tolist()))
         cA, cB, cC = st.columns(3)
         with cA:
-            st.metric("연도 범위", f"{min(sub_years) if sub_years else '-'}–{max(sub_years) if sub_years else '-'}")
+            st.metric("연도 범위", f"{info['year_min'] or '-'}–{info['year_max'] or '-'}")
         with cB:
             st.metric("프토젝트 수", f"{n_docs:,}")
         with cC:
-            st.metric("대상기관 수", f"{sub_wb['대상기관'].nunique():,}")
+            st.metric("대상기관 수", f"{info['n_inst']:,}")
 
         # 참여국가 Top-10 (프로젝트 수 기준)
         st.markdown("#### 참여국가 (프로젝트 수 Top 10)")
-        top_c = (sub_wb_geo.groupby(["country_ko"], as_index=False)
-                          .agg(건수=("파일명","nunique"))
-                          .sort_values("건수", ascending=False).head(10))
+        top_c = pd.DataFrame(info["top"], columns=["country_ko", "건수"])
         if clicked_iso:
             # 클릭한 국가가 있으면 칩으로 보조 표기
-            iso_name = sub_wb_geo.loc[sub_wb_geo["iso3"]==clicked_iso, "country_ko"]
+            iso_name = agg_geo.loc[agg_geo["iso3"]==clicked_iso, "country_ko"]
             if len(iso_name):
                 st.caption(f"지도로 선택된 국가: **{iso_name.iloc[0]}** (집계에는 영향 없음)")
 
@@ -1777,24 +1656,7 @@ elif mode == "ICT 유형 단일클래스":
 
     # ---- (3) 워드클라우드/키워드: 클래스 전체 텍스트에서 생성 (국가 무관) ----
     with tab_cloud:
-        tokens: list[str] = []
-        if "Hashtag_str" in sub_wb.columns and sub_wb["Hashtag_str"].notna().any():
-            for txt in sub_wb["Hashtag_str"].dropna().astype(str):
-                tokens += [z.strip() for z in re.split(r"[;,]", txt) if z.strip()]
-        elif "Hashtag" in sub_wb.columns and sub_wb["Hashtag"].notna().any():
-            for txt in sub_wb["Hashtag"].dropna().astype(str):
-                tokens += [z.strip() for z in re.split(r"[;,]", txt) if z.strip()]
-
-        pool_cols = [c for c in ["요약", "주요 내용"] if c in sub_wb.columns]
-        if pool_cols:
-            for txt in sub_wb[pool_cols].fillna("").astype(str).agg(" ".join, axis=1).tolist():
-                for w in re.split(r"[^0-9A-Za-z가-힣]+", txt):
-                    w = w.strip()
-                    if len(w) >= 2:
-                        tokens.append(w)
-
-        tokens = [w for w in tokens if w and w.lower() not in STOP_LOW and not re.fullmatch(r"\d+(\.\d+)?", w)]
-        freq   = Counter(tokens)
+        freq   = cloud_freq(sub_wb.index)
         top20  = freq.most_common(10)
         top_freqs = dict(freq.most_common(220))
 
@@ -1848,13 +1710,12 @@ elif mode == "ICT 유형 단일클래스":
             
             # --- 여기부터 당신의 기존 코드 ---
             # (2) 문서 준비
-            docs_class = _prep_docs(sub_wb, text_cols)
-            docs_neg   = _prep_docs(df[df["ICT 유형"].astype(str).str.strip() != sel], text_cols)
+            # 문서×용어 행렬(버전당 1회)에서 클래스 마스크 열합 vs 나머지 열합으로 바로 점수화
+            # (text_cols == TERM_TEXT_COLS ∩ df.columns 이므로 인덱스와 같은 문서 텍스트)
         
             # (3) 대비형 TF-IDF 키워드
-            candidates = contrastive_keywords_tfidf(
-                docs_class=docs_class,
-                docs_neg=docs_neg,
+            candidates = _term_matrix(corpus.version, corpus.tokens, corpus.has_text).contrastive(
+                wb_mask, corpus.n_text_docs,
                 top_n=80,
                 ngram_bonus=(0.10, 0.20)
             )
@@ -1878,11 +1739,13 @@ elif mode == "ICT 유형 단일클래스":
             else:
                 st.markdown("<style>.ksp-quote{background:var(--card);border:1px solid var(--border);padding:10px;border-radius:10px;margin:6px 0}</style>", unsafe_allow_html=True)
                 cols = st.columns(2, gap="large") if len(kw_selected) >= 6 else [st.container()]
+                sents_ix = _sentence_index(corpus.version, sel, tuple(text_cols), sub_wb)
                 for i, kw in enumerate(kw_selected):
                     target_col = cols[i % len(cols)]
                     with target_col:
                         st.markdown(f"**🔎 {kw}**")
-                        sents = sample_sentences_for_keyword(sub_wb, kw, text_cols, per_kw=int(per_kw), seed=int(seed))
+                        sents = sample_sentences_for_keyword(sub_wb, kw, text_cols, per_kw=int(per_kw), seed=int(seed),
+                                                             sents_ix=sents_ix)
                         if not sents:
                             st.caption("· 일치 문장을 찾지 못했습니다.")
                         else:
@@ -1911,8 +1774,7 @@ st.markdown("---")
 st.subheader("전체 분포 대시보드")
 
 # 주제 도넛
-subj_counts = df["주제분류(대)"].fillna("미분류").astype(str).str.strip().replace({"nan":"미분류"}).value_counts().reindex(SUBJ_ORDER, fill_value=0).reset_index()
-subj_counts.columns = ["주제분류(대)","count"]
+subj_counts = pd.DataFrame({"주제분류(대)": SUBJ_ORDER, "count": cats.counts("주제분류(대)")})
 fig1 = px.pie(subj_counts, names="주제분류(대)", values="count", hole=0.55,
               category_orders={"주제분류(대)": SUBJ_ORDER},
               color="주제분류(대)", color_discrete_map=COLOR_SUBJ)
@@ -1920,9 +1782,7 @@ fig1 = style_fig(fig1, "주제분류(대) 분포", legend="right", top_margin=12
                  bg_color=VIZ_BG["donut_subj"], bg_alpha=0.5)
 
 # ICT 도넛
-wb_counts = (df["ICT 유형"].astype(str).str.strip().replace({"nan":"미분류"}).fillna("미분류").value_counts()
-             .reindex(WB_ORDER, fill_value=0).reset_index())
-wb_counts.columns = ["ICT 유형","count"]
+wb_counts = pd.DataFrame({"ICT 유형": WB_ORDER, "count": cats.counts("ICT 유형")})
 fig2 = px.pie(wb_counts, names="ICT 유형", values="count", hole=0.55,
               category_orders={"ICT 유형": WB_ORDER},
               color="ICT 유형", color_discrete_map=COLOR_WB)
@@ -1935,8 +1795,10 @@ with c0: st.plotly_chart(fig1, use_container_width=True)
 with c00: st.plotly_chart(fig2, use_container_width=True)
 
 # (3) 주제×WB 100% 누적 막대
-cross = (df.assign(WB=df["ICT 유형"].astype(str).str.strip().replace({"nan":"미분류"}).fillna("미분류"))
-           .groupby(["주제분류(대)","WB"], as_index=False).size())
+k_wb = max(len(WB_ORDER), 1)   # (주제 코드, ICT 코드) 정수 키로 교차 집계
+key, size = np.unique(cats.codes["주제분류(대)"].astype(np.int64) * k_wb + cats.codes["ICT 유형"], return_counts=True)
+cross = pd.DataFrame({"주제분류(대)": cats.label_array("주제분류(대)")[key // k_wb],
+                      "WB": cats.label_array("ICT 유형")[key % k_wb], "size": size})
 
 pivot = cross.pivot(index="주제분류(대)", columns="WB", values="size").fillna(0)
 pivot_pct = (pivot
@@ -1961,27 +1823,19 @@ st.plotly_chart(fig3, use_container_width=True)
 
 
 # ---------- (4)(5) 연도별 비중 — 선택형 시각화 (히트맵 제거) ----------
-dfy_valid = dfy.dropna(subset=["연도"]).copy()
-
-def time_share(df_in: pd.DataFrame, group_col: str) -> pd.DataFrame:
+def time_share(ybr: pd.DataFrame, cats: CategoryCodes, col: str, group_col: str) -> pd.DataFrame:
     """
-    - 중복 컬럼 제거
-    - '연도'와 group_col이 DataFrame로 들어오면 첫 열만 사용
+    연도×그룹 건수/비중. ybr = (doc_id, 연도) 브리지, 그룹 = cats의 col 코드(행 위치 = doc_id).
+    (연도, 코드) 정수 키로 집계하고 라벨(group_col 컬럼)은 결과에만 붙인다.
     """
-    df1 = df_in.loc[:, ~df_in.columns.duplicated()].copy()
-
-    y = df1["연도"]
-    if isinstance(y, pd.DataFrame):
-        y = y.iloc[:, 0]
-
-    gcol = df1[group_col]
-    if isinstance(gcol, pd.DataFrame):
-        gcol = gcol.iloc[:, 0]
-
-    tmp = pd.DataFrame({"연도": y, group_col: gcol})
-    g = tmp.groupby(["연도", group_col], as_index=False).size()
-    totals = g.groupby("연도")["size"].transform("sum")
-    g["pct"] = g["size"] / totals
+    if col not in cats:
+        return pd.DataFrame(columns=["연도", group_col, "size", "pct"])
+    c = cats.codes[col][ybr["doc_id"].to_numpy()].astype(np.int64)
+    y = ybr["연도"].to_numpy()
+    k = max(len(cats.labels[col]), 1)
+    key, size = np.unique(y * k + c, return_counts=True)
+    g = pd.DataFrame({"연도": key // k, group_col: cats.label_array(col)[key % k], "size": size})
+    g["pct"] = g["size"] / g.groupby("연도")["size"].transform("sum")
     return g
 
 
@@ -2021,9 +1875,9 @@ def draw_year_chart(g, group_col, title_prefix):
         return style_fig(fig, f"{title_prefix} — 비중 Bump", legend="top", top_margin=120)
 
 
-if not dfy_valid.empty:
-    g_subj = time_share(dfy_valid, "주제분류(대)")
-    g_wb   = time_share(dfy_valid.assign(WB=dfy_valid["ICT 유형"].astype(str).str.strip().replace({"nan":"미분류"}).fillna("미분류")), "WB")
+if not ybr.empty:
+    g_subj = time_share(ybr, cats, "주제분류(대)", "주제분류(대)")
+    g_wb   = time_share(ybr, cats, "ICT 유형", "WB")
 else:
     g_subj = pd.DataFrame(columns=["연도","주제분류(대)","size","pct"])
     g_wb   = pd.DataFrame(columns=["연도","WB","size","pct"])
@@ -2081,121 +1935,46 @@ def clean(s): return s.astype(str).str.replace(r"\s+"," ",regex=True).str.strip(
 
 
 
-SYN = {"sme":"SME","pki":"PKI","ai":"AI","ict":"ICT","bigdata":"빅데이터","big data":"빅데이터",
-       "e-gp":"전자조달","egp":"전자조달","e-procurement":"전자조달","data center":"데이터센터","cloud":"클라우드",
-       "platform":"플랫폼","platfrom":"플랫폼","플렛폼":"플랫폼", "ifmis":"IFMIS", "bim":"BIM"}
-
-def norm_token(x: str) -> str:
-    x = re.sub(r"[\"'’“”()\[\]{}<>]", "", x.strip()); xl = x.lower()
-    return SYN.get(xl, x)
-
-import ast
-
-def _clean_token(x: str) -> str:
-    # 따옴표/대괄호/괄호류 제거 + 공백 정리 + 동의어 매핑
-    x = re.sub(r"[\"'’“”()\[\]{}<>]", "", str(x).strip())
-    x = re.sub(r"\s{2,}", " ", x)
-    xl = x.lower()
-    return SYN.get(xl, x)
-
-def split_hashtags(s, stopset):
-    """
-    해시태그 셀 하나를 -> 토큰 리스트로.
-    - "['조달','전자조달']" 같은 리스트 문자열은 literal_eval로 파싱
-    - 실패하면 일반 구분기호(,;/ 공백2+)로 분할
-    - 국가/숫자/불용어/잡문자 제거
-    """
-    if not isinstance(s, str) or not s.strip():
-        return []
-
-    items = []
-    txt = s.strip()
-
-    # 1) 리스트 문자열이면 안전 파싱
-    if txt.startswith("[") and txt.endswith("]"):
-        try:
-            arr = ast.literal_eval(txt)
-            if isinstance(arr, (list, tuple)):
-                items = [str(z) for z in arr]
-        except Exception:
-            items = []  # 파싱 실패하면 아래 fallback로 이어감
-
-    # 2) fallback: 일반 분할
-    if not items:
-        items = re.split(r"[,\;/]| {2,}", txt)
-
-    out = []
-    for t in items:
-        t = _clean_token(t)
-        core = re.sub(r"\s+", "", t.lower())
-        if not core or len(core) < 2:
-            continue
-        if re.fullmatch(r"[\W_]+", core) or re.fullmatch(r"\d+(\.\d+)?", core):
-            continue
-        if core in stopset:
-            continue
-        out.append(t)
-
-    # 중복 제거(대소문자 무시)
-    seen = set()
-    dedup = []
-    for w in out:
-        k = w.lower()
-        if k not in seen:
-            seen.add(k)
-            dedup.append(w)
-    return dedup
-
-
 def jeffreys_rolling_ratio(num, den, k=ROLL, alpha=ALPHA):
     numr = (num + alpha).rolling(k, center=True, min_periods=1).sum()
     denr = (den + 2*alpha).rolling(k, center=True, min_periods=1).sum()
     return (numr/denr*100.0).fillna(0.0)
 
-@st.cache_data(show_spinner=False)
-def build_keyword_time(df_in: pd.DataFrame, stop_extra: set):
-    df_local = df_in.loc[:, ~df_in.columns.duplicated()].copy()
+def build_keyword_time(df_in: pd.DataFrame, stop_extra: set, view: Optional[CorpusView] = None):
+    """
+    연도별 문서수/해시태그 등장수. 행 단위 파싱·집계는 코퍼스 인덱스(증분)에서 가져오고
+    여기서는 불용어(고정 + 데이터 의존 동적 불용어)만 적용한다.
+    """
+    view = view if view is not None else sync_corpus(df_in)
 
-    # 연도 소스: 지정/자동(요약·내용 포함) → 리스트로 확장
-    ser_year = _year_text_series(df_local)
-    years_list = ser_year.apply(years_from_span)
-    all_years = sorted({y for ys in years_list for y in (ys or [])})
+    # 연도 소스: 지정/자동(요약·내용 포함) → 인덱스에서 행별로 파싱 완료
+    all_years = sorted(view.docs_per_year)
     if not all_years:
         return [], {}, pd.Series([], dtype=int), pd.DataFrame()
 
     # 동적 불용어(대분류/클래스/국가 등)
     dyn = set()
     for col in ["주제분류(대)", "ICT 유형", "대상국", "대상기관", "지원기관"]:
-        if col in df_local.columns:
-            dyn |= {str(v).strip().lower() for v in df_local[col].dropna().unique()}
+        if col in df_in.columns:
+            dyn |= {str(v).strip().lower() for v in df_in[col].dropna().unique()}
     stopset = {w.lower() for w in stop_extra} | dyn
 
-    # 해시태그 토큰 (리스트 문자열 포함 안전 파싱)
-    HASHTAG_COL = "Hashtag" if "Hashtag" in df_local.columns else ("Hashtag_str" if "Hashtag_str" in df_local.columns else None)
-    if HASHTAG_COL:
-        tokens_by_row = [split_hashtags(s, stopset) for s in df_local[HASHTAG_COL].fillna("").astype(str)]
-    else:
-        tokens_by_row = [[] for _ in range(len(df_local))]
+    # 해시태그 토큰은 불용어 없이 파싱돼 있으므로 split_hashtags와 같은 기준(core)으로 걸러냄
+    vocab = set().union(*[c.keys() for c in view.kw_doc.values()]) if view.kw_doc else set()
+    allowed = {t for t in vocab if re.sub(r"\s+", "", t.lower()) not in stopset}
 
     # 연도별 총 문서 수
-    docs_per_year = pd.Series(0, index=all_years, dtype=int)
-    for ys in years_list:
-        for y in (ys or []):
-            docs_per_year[y] += 1
+    docs_per_year = pd.Series([view.docs_per_year[y] for y in all_years], index=all_years, dtype=int)
 
     # 연도별 키워드 등장 수(문서 단위 중복 제거)
-    kw_doc = {y: Counter() for y in all_years}
-    for toks, ys in zip(tokens_by_row, years_list):
-        if not ys or not toks:
-            continue
-        for y in ys:
-            kw_doc[y].update(set(toks))
+    kw_doc = {y: Counter({t: c for t, c in view.kw_doc.get(y, Counter()).items() if t in allowed})
+              for y in all_years}
 
-    return all_years, kw_doc, docs_per_year, df_local
+    return all_years, kw_doc, docs_per_year, df_in
 
 
 
-all_years, kw_doc, docs_per_year, _ = build_keyword_time(df, STOP | BASE_STOP)
+all_years, kw_doc, docs_per_year, _ = build_keyword_time(df, STOP | BASE_STOP, corpus)
 
 
 def ensure_topk(pool_tokens, need_k, docs_per_year, kw_doc, years):
@@ -2475,9 +2254,8 @@ st.markdown("---")
 st.subheader("키워드 트렌드 — 직접 선택")
 # 사이드바 어딘가에:
 if st.sidebar.button("캐시 초기화", use_container_width=True):
-    # 캐시 비우기
-    st.cache_data.clear()
-    st.cache_resource.clear()
+    # 트렌드 파이프라인 캐시만 비우기(데이터 → 브리지 → 키워드 → 그림)
+    invalidate_cache("data")
     # 리런 (버전 호환)
     try:
         st.rerun()                 # Streamlit >= 1.27+
@@ -2507,29 +2285,18 @@ STOP_SET = {w.strip().upper() for w in STOP_CUSTOM if w.strip()}
 import re
 from collections import Counter
 
-def _norm_token(x: str) -> str:
-    x = re.sub(r'[\"\'’“”()\[\]{}<>]', "", str(x).strip())
-    return x.upper()  # 대문자 기준으로 통일
-
 def _is_numericish(s: str) -> bool:
     return bool(re.fullmatch(r"\d+(\.\d+)?", s))
 
 # ==== 2) 해시태그 빈도 수집 ====
 HASHTAG_COL = "Hashtag" if "Hashtag" in df.columns else ("Hashtag_str" if "Hashtag_str" in df.columns else None)
 
-def collect_hashtag_freq(df_in) -> Counter:
-    freq = Counter()
-    if not HASHTAG_COL or HASHTAG_COL not in df_in.columns or df_in[HASHTAG_COL].isna().all():
-        return freq
-    for raw in df_in[HASHTAG_COL].dropna().astype(str):
-        for t in re.split(r"[,\;/]| {2,}", raw):
-            t = _norm_token(t)
-            if not t or len(t) < 2:
-                continue
-            if t in STOP_SET or _is_numericish(t):
-                continue
-            freq[t] += 1
-    return freq
+def collect_hashtag_freq(tokens: TokenStore, pred=None) -> Counter:
+    """해시태그 조각 빈도(문서별 토큰 id에서). pred = 어휘 필터(기본: 2자 이상, STOP_SET/숫자 제외)"""
+    if not HASHTAG_COL:
+        return Counter()
+    pred = pred or (lambda t: len(t) >= 2 and t not in STOP_SET and not _is_numericish(t))
+    return tokens.counter("hashtags", keep=tokens.keep("hashtags", pred))
 
 # ==== 3) 제외세트 (국가/AI 키워드) ====
 COUNTRY_WORDS = set()
@@ -2548,17 +2315,13 @@ def is_excluded(tok: str) -> bool:
     return (t in COUNTRY_WORDS) or (t in AI_SET) or (t in STOP_SET) or _is_numericish(t)
 
 # ==== 4) 여기서 freq_all을 '먼저' 만든 다음 후보 생성 ====
-freq_all = collect_hashtag_freq(df)          # ← 반드시 먼저!
+freq_all = collect_hashtag_freq(corpus.tokens)          # ← 반드시 먼저!
 candidates_all = [(k, c) for k, c in freq_all.items() if not is_excluded(k)]
 
 # 후보가 너무 적으면(예: 불용어가 많을 때) 완화
 if len(candidates_all) < 25 and HASHTAG_COL:
-    tmp = Counter()
-    for raw in df[HASHTAG_COL].dropna().astype(str):
-        for t in re.split(r"[,\;/]| {2,}", raw):
-            t = _norm_token(t)
-            if t and (t not in COUNTRY_WORDS) and (t not in AI_SET) and (t not in STOP_SET) and (not _is_numericish(t)):
-                tmp[t] += 1
+    tmp = collect_hashtag_freq(corpus.tokens, lambda t: (t not in COUNTRY_WORDS) and (t not in AI_SET)
+                               and (t not in STOP_SET) and (not _is_numericish(t)))
     for k, v in tmp.items():
         freq_all[k] = max(freq_all.get(k, 0), v)
     candidates_all = [(k, c) for k, c in freq_all.items()
@@ -2593,32 +2356,25 @@ if len(chosen) < 2:
     st.stop()
 
 # --- 4) 연도 집계(!!! 여기 핵심: '사업 기간' 직접 참조 금지) ---
-years_series = _year_text_series(df)                 # <-- 이걸로 연도 소스 자동/지정
-years_list   = years_series.apply(years_from_span)
-all_years    = sorted({y for ys in years_list for y in (ys or [])})
+y_val = ybr["연도"].to_numpy()   # (doc_id, 연도) 브리지의 연도 열 — 코퍼스 인덱스에서 파싱 완료
+all_years, n_per_year = np.unique(y_val, return_counts=True)
+all_years = all_years.tolist()
 if not all_years:
     st.warning("연도를 추출할 수 없어서 추세를 그릴 수 없어요.")
     st.stop()
 
-docs_per_year = pd.Series(0, index=all_years, dtype=int)
-for ys in years_list:
-    for y in (ys or []): docs_per_year[y] += 1
+docs_per_year = pd.Series(n_per_year, index=all_years, dtype=int)
 
-# 키워드 등장수(연도별, '선택된 것'만 계산)
+# 키워드 등장수(연도별 문서수, '선택된 것'만) — (문서, 조각) 고유 쌍 × (문서, 연도) 브리지
 kw_doc = {y: Counter() for y in all_years}
 if HASHTAG_COL:
-    for (_, row), ys in zip(df.iterrows(), years_list):
-        if not ys: 
-            continue
-        toks = []
-        for t in re.split(r"[,\;/]| {2,}", str(row.get(HASHTAG_COL, ""))):
-            t = _norm_token(t.strip())
-            if t and t in chosen:
-                toks.append(t)
-        if not toks:
-            continue
-        for y in ys:
-            kw_doc[y].update(set(toks))
+    tok = corpus.tokens
+    chosen_set = set(chosen)
+    d_ids, t_ids = tok.doc_pairs("hashtags", tok.keep("hashtags", lambda t: t in chosen_set))
+    hits = pd.DataFrame({"doc_id": d_ids, "tid": t_ids}).merge(ybr, on="doc_id")
+    voc = tok.vocab["hashtags"]
+    for (y, tid), n in hits.groupby(["연도", "tid"]).size().items():
+        kw_doc[y][voc[tid]] = int(n)
 
 # share & lift
 share = pd.DataFrame({
@@ -2657,6 +2413,8 @@ st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
 with st.expander("설치 / 실행"):
     st.code("pip install streamlit folium streamlit-folium pandas wordcloud plotly matplotlib", language="bash")
     st.code("streamlit run S_KSP_clickpro_v4_plotly_patch_FIXED.py", language="bash")
+    st.code("python ksp_build.py <데이터 파일>   # (선택) 전처리 번들 미리 빌드 → 앱 시작 시 mmap 로드", language="bash")
+    st.code("python ksp_build.py --geo world-countries.json   # (선택) 세계 경계 오프라인 번들(assets/geo/) — 네트워크 불필요", language="bash")
 
 
 
@@ -0,0 +1,82 @@
+# ===============================================
+# KSP 코퍼스 오프라인 빌드
+#   python ksp_build.py 20251014_KSP_82.csv            # 모든 코어 사용
+#   python ksp_build.py data.xlsx --jobs 4 --keep 2
+#   python ksp_build.py --geo world-countries.json      # 세계 경계 LOD 번들(assets/geo/)만
+# 실행 위치와 무관하게 ksp_core.py 옆 .ksp_cache/bundles/ 아래 번들을 남기고,
+# 앱은 시작 시 이 번들을 mmap으로 열어 전처리(명사 필터/해시태그/연도/국가 매핑)를 건너뛴다.
+# ===============================================
+import os, sys, time, shutil, argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+
+from ksp_core import (BUNDLE_DIR, CorpusIndex, corpus_digests, derive_rows, list_bundles,
+                      load_path_split, write_bundle)
+from ksp_geo import GEO_ASSET, GEO_LOD, write_world_lod
+
+def derive_rows_parallel(df_in: pd.DataFrame, jobs: int, chunk_rows: int = 2000) -> list:
+    """derive_rows를 행 청크로 나눠 프로세스 풀에서 실행(결과 순서 = 행 순서)"""
+    if jobs <= 1 or len(df_in) <= chunk_rows:
+        return derive_rows(df_in)
+    parts = [df_in.iloc[i:i + chunk_rows] for i in range(0, len(df_in), chunk_rows)]
+    out = []
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        for rows in ex.map(derive_rows, parts):
+            out.extend(rows)
+    return out
+
+def prune_bundles(root: Path, schema: tuple, keep: int) -> list[Path]:
+    """같은 스키마의 호환 번들 중 최신 keep개만 남김"""
+    removed = []
+    for b in list_bundles(root, schema)[keep:]:
+        shutil.rmtree(b.path, ignore_errors=True)
+        removed.append(b.path)
+    return removed
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="KSP 코퍼스 전처리 번들 빌드")
+    ap.add_argument("data", nargs="?", help="엑셀/CSV 경로(앱에서 여는 파일과 동일)")
+    ap.add_argument("--out", default=str(BUNDLE_DIR), help=f"번들 루트(기본: {BUNDLE_DIR})")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="워커 프로세스 수(기본: 전체 코어)")
+    ap.add_argument("--keep", type=int, default=3, help="같은 스키마 번들 보관 개수")
+    ap.add_argument("--geo", help="세계 경계 GeoJSON(예: folium world-countries.json) → 단순화 LOD 번들")
+    ap.add_argument("--geo-out", default=str(GEO_ASSET), help=f"경계 번들 경로(기본: {GEO_ASSET})")
+    args = ap.parse_args(argv)
+
+    if args.geo:
+        if not os.path.exists(args.geo):
+            print(f"파일을 찾을 수 없습니다: {args.geo}", file=sys.stderr)
+            return 1
+        t0 = time.time()
+        out = write_world_lod(args.geo, Path(args.geo_out))
+        print(f"경계 번들: {out} ({os.path.getsize(out) / 1e6:.2f} MB, 단계 {len(GEO_LOD)}) · {time.time() - t0:.2f}s")
+        if not args.data:
+            return 0
+    if not args.data:
+        ap.error("데이터 파일 또는 --geo 중 하나는 필요합니다")
+    if not os.path.exists(args.data):
+        print(f"파일을 찾을 수 없습니다: {args.data}", file=sys.stderr)
+        return 1
+
+    t0 = time.time()
+    # 앱과 같은 스냅샷 경유 + 같은 본문 분리(정규화/category 인코딩 동일 → 행 해시 일치)
+    df, texts = load_path_split(args.data)
+    digests = corpus_digests(df, texts)
+    t1 = time.time()
+    index = CorpusIndex()
+    view = index.sync(df, derive=lambda d: derive_rows_parallel(texts.attach(d), args.jobs), digests=digests)
+    t2 = time.time()
+    out = write_bundle(index, df, Path(args.out), source=Path(args.data).resolve(), digests=digests)
+    removed = prune_bundles(Path(args.out), tuple(map(str, df.columns)), max(args.keep, 1))
+    t3 = time.time()
+
+    print(f"행 {len(df):,} | 버전 {view.version} | 용어 {view.tokens.size('terms'):,} | 텍스트 문서 {view.n_text_docs:,}")
+    print(f"적재 {t1 - t0:.2f}s · 파생({args.jobs} jobs) {t2 - t1:.2f}s · 기록 {t3 - t2:.2f}s")
+    print(f"번들: {out}")
+    for p in removed:
+        print(f"정리: {p}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2078 @@
+# ===============================================
+# KSP 코퍼스 전처리 코어 (Streamlit 비의존)
+#  - 컬럼 정규화 / 스냅샷 적재 / 불용어 / 명사 필터
+#  - 국가 매핑 / 연도 파서 / 해시태그 파서 / 증분 코퍼스 인덱스
+#  - 오프라인 빌드 번들(ksp_build.py 산출물) 읽기/쓰기
+# S_KSP.py(앱)와 ksp_build.py(CLI)가 같은 규칙을 공유한다.
+# ===============================================
+import os, io, re, json, ast, hashlib, shutil, threading, time
+from typing import Optional, NamedTuple
+from collections import Counter, defaultdict, OrderedDict
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# --------------------- 불용어 ---------------------
+STOP = {
+    "및","등","관련","수립","방안","개선","전략","지원","정책","사업","프로젝트","제도", "한국과", "멕시코의", "향상을", "프로젝트는", "현대화를", "헬프데스크와", "기능", "상승", "탑재", "과제", "100위에서", "모니터링을", "공유", "지적", "높은", "28중", "미흡", "9대항목",
+    "구축","도입","개요","현황","위한","활용","분석","제공","개발","기반","디지털","data", "근거", "경험", "67소", "9대", "3그룹", "제도적", "변화", "기관", "조사", "부문", "확대", "기업", "혁신을", "활용한", "등이다", "효과는", "경험을", "방안을",
+    "데이터","system","정부","ksp","koica","kdi","idb","ebrd","wb","adb","국가","한국", "제도와", "시스템을", "검색", "전문가", "업체", "사업은", "제도개선을", "로드맵과", "설문을", "디지털정부의", "체계를", "순위", "순위가", "80위로", "필요성", "표준", "기관의", "28중항목",
+    "연구","보고","최종","중간","성과","향상","제고","도움","차세대","로드맵","운영","서비스", "바탕으로", "말레이시아의", "진단하고", "정부와", "KSP는", "지원했다", "한국의", "시스템", "회의", "논의", "참여", "시스템과", "KSP에서", "참고하여", "구축을", "방문", "풀텍스트",
+    "라오스","2030","ntca","to be","헝가리","be","사례","모델","산업", "비교", "강조", "최종보고", "위해", "연수", "비전", "개최", "협의", "제2", "구축", "권고", "문제", "온나라", "중앙", "도입과", "하부", "성장", "등을", '품질', "연구개발과", "거버넌스를", "설립",
+    "격차","해소","역량","강화","실행계획","연금","vision","실용신안", "평가", "제시", "통해", "설치", "제시했다", "권고하며", "분석하고", "시스템의", "개선안을", "했다", "통해", "목표로", "향상과", "제안", "관리", "통합", "협력", "제안하였다", "체계", "비교하여", "설명가능",
+    "가지", "장기", "투명성과", "기대했다", "진행되었으며", "전환과", "마련했다", "모델로", "협의와", "비교와", "개발을", "이후", "마련", "부족을", "수립을", "사례를", "정부와", "프레임워크", "통한", "기반으로", "카하", "발전", "제안했다", "제시하고", "정책을", "화상회의를",
+    "적용", "포털", "수립하였다", "것이다", "도입을", "정부의", "성숙도", "과정", "계획을", "희수", "따른", "계획과", "TV", "새로운", "중소기업의", "자료", "추정", "안정", "선정", "경쟁력", "전략을", "현황을", "개선을", "활성화를", "To", "검토", "실행계획과", "단계별",
+    "강화와", "현행", "생태계를", "현황과", "가치평가", "전환에", "활동", "국민", "포함", "기본계획", "접근성", "전환", "할당", "양국", "효과", "추진", "협력과", "이용계획", "담은", "로드맵을", "제시하였다", "WASH", "기술", "기대효과", "가나의", "솔루션을", "수행하였다", "분야",
+    "67소항목으로", "분야", "진단", "중복조사와", "사용", "항목", "포용적", "규제", "기업들의", "혁신", "라오스의", "메콩강", "베트남의", "통계", "처리", "제도의", "제안합니다", "유역의", "이를", "강화를", "있습니다", "폐기물", "필리핀의", "tuneps", "표준화", "재정감사감독청", "이집트의",
+    "개혁을", "체계적으로", "dur", "파라과이의", "과테말라의", "제안한다", "보고서는", "강화하고", "국가들의", "회원국", "도출했습니다", "분석하여", "팀은", "제안한다", "것을", "제시한다", "국가들의", "우즈베키스탄의", "검토하였습니다", "낮은", "그룹", "경쟁력을", "강조한다", "중요성을",
+    "핵심", "수동", "지연", "그리고", "또한", "보고서입니다", "겪고", "인해", "현재", "다니는", "다룬다", "중심으로", "가능한", "한다", "위치", "부문의", "가장", "온두라스의", "운영을", "센터", "특히", "참여를", "등록", "초점을", "지원을", "제시했습니다", "행정의",
+    "접근성을", "발생하는", "수립합니다", "제시합니다", "성공적인", "효율적인", "전환을", "대응", "자문을", "합니다", "기술을", "서비스에", "등의", "주요", "분절된", "시스템은", "기능이", "세르비아의", "방글라데시의", "강화하기", "체계적인", "문제를", "지원합니다", "높이는", "기본", "단지의", "산업의",
+    "미흡한", "시스템이", "비롯한", "다각화와", "타지키스탄은", "타지키스탄의", "정보", "이에", "따라", "실정입니다", "데이터의", "데이터를", "공유하고", "것입니다", "궁극적으로", "기여할", "정확성을", "자동화하여", "수립의", "공유를", "융합하여", "부문을", "지속", "달성하도록", "성장을", "돕는", "산업과",
+    "경제에서", "경제로", "전환하고자", "그러나" ,"부문은", "부족으로", "잠재력을", "충분히", "활용하지", "못하고", "호주는", "호주의", "분야에서", "인도네시아는", "문제점을", "효율성을", "것으로", "지역의", "벤치마킹하여", "기대됩니다"
+}
+STOP_LOW = {w.lower() for w in STOP}
+
+# ---- Trend config (safe defaults; can be overridden later) ----
+# 코드 어디서든 참조해도 NameError가 안 나도록 안전 기본값을 먼저 깔아둔다.
+YEAR_SOURCE = globals().get("YEAR_SOURCE", None)   # 예: "연도"로 바꾸면 해당 컬럼만 사용
+STOP_CUSTOM = globals().get("STOP_CUSTOM", set())  # 코드에서 직접 추가할 불용어
+BASE_STOP   = globals().get("BASE_STOP", set())
+
+STOP_LOW_ALL = (
+    {w.lower() for w in STOP} |
+    {w.lower() for w in STOP_CUSTOM} |
+    {w.lower() for w in BASE_STOP}
+)
+
+# ===== 강한 stop/필터 =====
+GENERIC_KO = {
+    "경제","사회","정책","데이터","디지털","서비스","시장","운영","현황","전략","방안","도입","개선","구축","체계",
+    "기반","중장기","보고","분석","지원","정부","공공","프로젝트","로드맵","비전","활용","강화","확대","평가","계획",
+    "사례","현지","과제","인프라","플랫폼","시스템","포털","조달","법제","제도","가이드라인","기획","추진","성과",
+    "과학기술","교육","보건","안전","보안","전자정부","스마트","혁신","연구","중소기업","산업","도시","센터","플렛폼",
+    "현안","자료","분야","지원기관","대상기관","주제분류","ict","ICT","AI","인공지능","빅데이터","클라우드", "기대됩니다",
+    "생산성", "IT", "대한", "자원", "투자", "디지털화", "무역", "법정", "재정", "정보화", "법적", "인력", "민간", "맞춤형", "행정", "비즈니스", "제조업", "건설", "광업", "BIM", "에너지", "불가리아", "지속가능한", "IP", "중남미", "공장", "양성", "우즈베키스탄", "높이고", "이러한", "유치", "전문",
+    "정책적", "촉진할", "성공", "루마니아", "특허", "상황입니다", "검토하여", "환경", "생태계", "온두라스", "구축하여", "거버넌스", "필리핀", "시범", "심사", "업무", "데이터베이스", "온라인", "있으며", "산학연", "전자", "사이버", "다룹니다", "감사", "교통", "담고", "조세", "예산", "강조합니다", "세수",
+    "투명성", "인센티브", "법률", "기술적", "함께", "인도네시아", "세무", "조직", "높여", "방글라데시", "수집", "확보하고", "멕시코", "효율성", "제공합니다", "적합한", "국제", "컨설팅", "분석한다", "공무원", "납세자", "납세", "가능하게", "크게", "선진", "향상", "공격", "이집트", "악성", "징수",
+    "코드", "인적자원", "강조함", "제시함", "재활용", "요약됨", "시스템적", "슬로바키아", "재설계", "중복", "순환", "포함됨", "물류", "이루어지고", "진행", "진료", "도입하기", "통신", "원격", "빠르게", "도출합니다", "토지", "비현금", "농업", "방송", "축산물", "경매", "경영", "진료비", "원산지", "공기업",
+    "관광", "교사", "주파수", "경보", "만성질환", "요르단", "재해복구", "Konza", "홍수", "가뭄", "식량", "JONEPS", "증명", "비기술적", "미디어", "전자회계감사", "수자원", "KLIS", "누락", "건설기술", "의료진", "공공의료", "설계하였습니다", "현금영수증", "공공재산", "처분", "이중화", "아날로그",
+    "국세청", "자문", "시민들", "문서", "세르비아", "가입", "창출", "기업들", "crm", "육성", "장애", "인재", "협업", "기초", "업그레이드", "백업", "기관별", "유역", "의료", "환자", "안보", "지속가능성", "콘텐츠", "넘어", "증진", "공정한", "불평등", "피해", "칠레", "극복하기", "회계", "일부", "향후", "제공한다", "재정관리",
+    "지원한다", "부가가치", "생산", "국가를", "분석합니다", "요인", "중점", "부족", "공공부문", "공공조달", "강화하", "오프라인", "탈세", "증대", "타지키스탄", "단지", "리투아니아", "말레이시아", "대응책", "탄자니아", "db", "이행계획", "벨라루스", "모로코", "브라질", "몰도바", "경영평", "우크라이나", "조지아", "카타르", "르완다",
+    "케냐", "호주", "태국", "건설산업", "아크라", "대역", "학생", "DMA", "지질", "소득세", "운영자", "자메이카", "하드웨어", "수수료", "윤리", "아프리카", "도입률", "위험기반", "금융결제원", "문해력", "D-IP", "법인세", "오프", "ID", "상암", "메콩강위원회", "산업혁명", "범위", "만이", "농촌", "공정", "스마트시티로",
+    "조직적", "SUPPORTERS", "지식관리", "MRC", "19", "세수입", "공무원연금", "코스타리카", "이력제", "전자폐기물", "문화산업", "상용화", "DNPI", "청정", "ALLBARO", "분류체계", "CCI", "축산업", "FDI", "INPI", "축산시설", "우루과", "수거", "대기업과"
+}
+GENERIC_EN = {
+    "data","digital","service","services","system","systems","platform","portal","project","program","policy","policies",
+    "plan","roadmap","model","models","evaluation","implementation","phase","final","interim","infrastructure","innovation"
+}
+STRONG_STOP = {s.lower() for s in (STOP | BASE_STOP | STOP_CUSTOM | GENERIC_KO | GENERIC_EN)}
+
+# 이미 정의된 STOP/BASE_STOP/STOP_CUSTOM/GENERIC_KO/GENERIC_EN을 한데 모아 통합
+def _collect_stop_all():
+    STOP_ALL = set()
+    for s in [globals().get("STOP"), globals().get("BASE_STOP"),
+              globals().get("STOP_CUSTOM"), globals().get("GENERIC_KO"),
+              globals().get("GENERIC_EN"), globals().get("STOP_LOW_ALL")]:
+        if s:
+            STOP_ALL |= {str(w).lower() for w in s}
+    return STOP_ALL
+
+STOP_ALL = _collect_stop_all()
+
+# --------------------- 컬럼 정규화 ---------------------
+def ensure_unique_columns(df: pd.DataFrame) -> pd.DataFrame:
+    cols = pd.Series(df.columns)
+    if cols.duplicated().any():
+        # 동일 이름 열이 여러 개면 첫 번째만 남기고 나머지는 버림
+        df = df.loc[:, ~cols.duplicated()].copy()
+    return df
+
+def normalize_column_names(columns) -> list[str]:
+    """
+    헤더만으로 표준 컬럼명 리스트를 계산(데이터 복사 없음).
+    - 공백/개행 제거, 대소문자 틀어짐 보정
+    - 자주 쓰이는 변형명을 표준 컬럼으로 통일
+    """
+    # 1) 트리밍
+    new_cols = []
+    for c in columns:
+        c2 = str(c).replace("\n", " ").strip()
+        c2 = re.sub(r"\s+", " ", c2)
+        new_cols.append(c2)
+
+    # 2) 유사명 매핑
+    #   표준: "사업 기간", "연도", "요약", "주요 내용", "Hashtag", "Hashtag_str", "ICT 유형", "주제분류(대)", "대상국", "대상기관", "지원기관", "파일명"
+    rename_map = {
+        "사업기간": "사업 기간",
+        "프로젝트 기간": "사업 기간",
+        "기간": "사업 기간",
+        "Project Period": "사업 기간",
+        "Years": "연도",
+        "Year": "연도",
+        "year": "연도",
+        "Hashtags": "Hashtag",
+        "해시태그": "Hashtag",
+        "해시태그_문자열": "Hashtag_str",
+        "ICT유형": "ICT 유형",
+        "주제(대)": "주제분류(대)",
+        "주제 대분류": "주제분류(대)",
+        "Country": "대상국",
+        "기관": "대상기관",
+        "기관명": "대상기관",
+        "지원 기관": "지원기관",
+        "Filename": "파일명",
+        "파일 이름": "파일명",
+        "요약문": "요약",
+        "내용 요약": "요약",
+        "본문": "주요 내용",
+    }
+    for k, v in list(rename_map.items()):
+        if k in new_cols and v not in new_cols:
+            new_cols = [v if c == k else c for c in new_cols]
+    return new_cols
+
+MUST_COLS = ["파일명", "대상국", "ICT 유형", "주제분류(대)"]
+
+# === NEW: 컬럼 정규화(유사명 → 표준명) ===
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    if df is None or df.empty:
+        return df
+
+    new_cols = normalize_column_names(df.columns)
+    # 라벨만 바꾸는 얕은 복사(대용량 프레임 전체를 다시 복사하지 않음)
+    df = df.copy(deep=False)
+    df.columns = new_cols
+
+    # 3) 최소 필요한 핵심 컬럼이 없을 때도 후속 로직이 죽지 않도록 보정
+    for must in MUST_COLS:
+        if must not in df.columns:
+            # 없는 경우라도 차트 전체가 죽지 않게 placeholder 생성
+            df[must] = df.get(must, pd.Series(["-"] * len(df)))
+
+    return df
+
+# --------------------- 스냅샷 캐시(정규화 완료 프레임) ---------------------
+# 원본 파일 내용 해시로 주소를 매긴 Parquet 스냅샷. 같은 내용이면 openpyxl/CSV 파싱과
+# normalize_columns/ensure_unique_columns를 다시 돌지 않는다.
+CACHE_DIR = Path(__file__).resolve().parent / ".ksp_cache"
+SNAPSHOT_DIR = CACHE_DIR / "snapshots"
+SNAPSHOT_VERSION = 1   # 정규화 규칙이 바뀌면 올릴 것(기존 스냅샷 무효화)
+CATEGORY_COLS = ["ICT 유형", "주제분류(대)", "지역", "대상국"]   # 저카디널리티 → category
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def encode_categoricals(df: pd.DataFrame, cols: list[str] = CATEGORY_COLS) -> pd.DataFrame:
+    """저카디널리티 컬럼을 category로 저장(메모리↓, Parquet dictionary 인코딩)"""
+    todo = [c for c in cols if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not todo:
+        return df
+    df = df.copy(deep=False)   # 해당 컬럼만 교체, 나머지(긴 텍스트)는 공유
+    for c in todo:
+        df[c] = df[c].astype("category")
+    return df
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """로더 공통 후처리: 컬럼 정규화 → 중복 컬럼 제거 → category 인코딩"""
+    df = normalize_columns(df)
+    if df is None or df.empty:
+        return df
+    return encode_categoricals(ensure_unique_columns(df))
+
+def _snapshot_path(digest: str, ext: str) -> Path:
+    # 버전은 파일명 본체에 — with_suffix로 확장자를 붙이면 ".v1"이 잘려 버전 무효화가 안 된다
+    return SNAPSHOT_DIR / f"{digest}.v{SNAPSHOT_VERSION}{ext}"
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    # Parquet → object 컬럼의 결측이 None으로 돌아옴. 하류 코드는 astype(str)=="nan"을 가정하므로 NaN으로 복원
+    obj = df.select_dtypes(include="object").columns
+    if len(obj):
+        df[obj] = df[obj].fillna(np.nan)
+    return df
+
+def _read_parquet_split(p: Path) -> tuple[pd.DataFrame, "TextStore"]:
+    """Parquet 스냅샷 → (메타 프레임, TextStore). 본문 컬럼은 pandas를 거치지 않고 Arrow 배열로 바로"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pq.read_schema(p)
+    is_text = lambda t: pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_null(t)
+    text_cols = [c for c in LONG_TEXT_COLS if c in schema.names and is_text(schema.field(c).type)]
+    meta = pq.read_table(p, columns=[c for c in schema.names if c not in text_cols]).to_pandas()
+    meta = _restore_missing(meta.reset_index(drop=True))
+    arrays, dtypes = {}, {}
+    for c in text_cols:   # 컬럼 하나씩(row group 청크 그대로, 합치는 복사 없음)
+        col = pq.read_table(p, columns=[c]).column(c)
+        dtypes[c] = pa.table({c: col.slice(0, 0)}).to_pandas()[c].dtype   # read_parquet이 줄 dtype(attach 복원용)
+        if c == "full_text" and all(x in arrays for x in FULL_TEXT_PARTS):
+            del col   # 세 컬럼의 결합이면 올리지 않는다 → 배치 단위로 비교만
+            derived = _joins_to([arrays[x] for x in FULL_TEXT_PARTS],
+                                pq.ParquetFile(p).iter_batches(TEXT_BATCH_ROWS, columns=[c]), len(meta))
+            if derived:
+                continue
+            col = pq.read_table(p, columns=[c]).column(c)
+        arrays[c] = col.cast(pa.large_string())
+    return meta, TextStore(schema.names, arrays, dtypes, len(meta), derived_full="full_text" in dtypes and "full_text" not in arrays)
+
+def _read_pickle_split(p: Path) -> tuple[pd.DataFrame, "TextStore"]:
+    return split_text_frame(_restore_missing(pd.read_pickle(p)))
+
+def read_snapshot(digest: str) -> Optional[tuple[pd.DataFrame, "TextStore"]]:
+    """스냅샷 → (본문 없는 메타 프레임, TextStore). 없거나 깨졌으면 None"""
+    for ext, reader in ((".parquet", _read_parquet_split), (".pkl", _read_pickle_split)):
+        p = _snapshot_path(digest, ext)
+        if p.exists():
+            try:
+                return reader(p)
+            except Exception:
+                pass   # 깨진 스냅샷은 무시하고 원본에서 다시 생성
+    return None
+
+def write_snapshot(digest: str, df: pd.DataFrame) -> bool:
+    """Parquet 우선(pyarrow 필요), 실패하면 pickle. 임시파일 → rename으로 원자적 기록. 기록 여부 반환"""
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    # row group을 청크 크기로 나눠 둔다(읽을 때 본문을 row group 단위로 비교/해시)
+    for ext, writer in ((".parquet", lambda d, p: d.to_parquet(p, index=False, row_group_size=INGEST_CHUNK_ROWS)),
+                        (".pkl", lambda d, p: d.to_pickle(p))):
+        tmp = _snapshot_path(digest, ext + ".tmp")
+        try:
+            writer(df, tmp)
+            os.replace(tmp, _snapshot_path(digest, ext))
+            return True
+        except Exception:
+            tmp.unlink(missing_ok=True)   # 혼합 타입 컬럼 등으로 Parquet 실패 → 다음 포맷
+    return False
+
+def _read_raw(src, ext: str) -> pd.DataFrame:
+    """src: 경로 또는 파일 객체(BytesIO 등), ext: 원본 확장자"""
+    if ext in [".xlsx", ".xls"]: return pd.read_excel(src)
+    if ext == ".csv": return pd.read_csv(src, encoding_errors="ignore")
+    return pd.read_excel(src)
+
+# --------------------- 청크 스트리밍 적재(대용량 CSV / xlsx) ---------------------
+# 수십만 행 + 긴 full_text 아카이브를 한 번에 read_csv/read_excel → normalize_columns 하면 피크 메모리가
+# 파일 크기의 몇 배가 된다. 청크 단위로 읽어 dtype을 맞춘 뒤 Parquet에 바로 이어 쓰고,
+# 읽을 때는 본문 컬럼을 Arrow 버퍼 그대로 TextStore에 넘겨 메타 컬럼만 pandas로 올린다.
+INGEST_CHUNK_ROWS = 20_000
+# 이보다 큰 파일만 스트리밍(작은 파일은 통째로 읽는 게 빠름). xlsx는 zip 압축이라 같은 행 수에서 훨씬 작다
+CHUNKED_INGEST_MIN_BYTES = {".csv": 64 << 20, ".xlsx": 8 << 20}
+
+class _SchemaDrift(Exception):
+    """뒤 청크 값이 첫 청크 기준 dtype으로 손실 없이 바뀌지 않음 → 그 컬럼을 넓혀 처음부터 다시 읽는다"""
+
+    def __init__(self, col: str, dtype: str):
+        super().__init__(f"{col} → {dtype}")
+        self.col, self.dtype = col, dtype
+
+def _chunk_plan(header: list, chunk0: pd.DataFrame, widen: Optional[dict] = None) -> dict:
+    """
+    헤더/첫 청크로 결정: 표준 컬럼명, 남길 위치, placeholder, 컬럼별 dtype.
+    widen = 앞선 시도에서 뒤 청크가 어긋난 컬럼의 dtype(Int64 → float64, 숫자/날짜 → text)
+    """
+    names = normalize_column_names(header)
+    keep = (~pd.Series(names).duplicated()).tolist()
+    kept = [n for n, k in zip(names, keep) if k]
+    fill = [m for m in MUST_COLS if m not in kept]
+    dtypes = {}
+    for pos, name in enumerate(names):
+        if not keep[pos]:
+            continue
+        s = chunk0.iloc[:, pos]
+        if name in CATEGORY_COLS:
+            dtypes[name] = "category"
+        elif pd.api.types.is_integer_dtype(s.dtype):
+            dtypes[name] = "Int64"     # 뒤 청크에 결측이 있어도 정수 유지
+        elif pd.api.types.is_float_dtype(s.dtype) or s.isna().all():
+            dtypes[name] = "float64"   # 전부 결측 = read_csv/read_excel과 같은 float64(뒤에서 텍스트가 나오면 넓힘)
+        elif pd.api.types.is_datetime64_any_dtype(s.dtype):
+            dtypes[name] = "datetime"  # xlsx 날짜 셀
+        else:
+            dtypes[name] = "text"
+    for m in fill:
+        dtypes[m] = "category" if m in CATEGORY_COLS else "text"
+    dtypes.update({c: dt for c, dt in (widen or {}).items() if c in dtypes})
+    return {"names": names, "keep": keep, "fill": fill, "dtypes": dtypes}
+
+def _cast_chunk(chunk: pd.DataFrame, plan: dict) -> pd.DataFrame:
+    chunk.columns = plan["names"]
+    if not all(plan["keep"]):
+        chunk = chunk.loc[:, plan["keep"]].copy()
+    for m in plan["fill"]:
+        chunk[m] = "-"
+    for c, dt in plan["dtypes"].items():
+        s = chunk[c]
+        if dt in ("Int64", "float64"):
+            num = pd.to_numeric(s, errors="coerce")
+            if int(num.isna().sum()) > int(s.isna().sum()):
+                raise _SchemaDrift(c, "text")          # 숫자 컬럼에 '2019-2020' 같은 텍스트
+            if dt == "Int64" and (num.dropna() % 1 != 0).any():
+                raise _SchemaDrift(c, "float64")       # 정수 컬럼에 소수
+            chunk[c] = num.astype(dt)
+        elif dt == "datetime":
+            ts = pd.to_datetime(s, errors="coerce")
+            if int(ts.isna().sum()) > int(s.isna().sum()):
+                raise _SchemaDrift(c, "text")          # 날짜 컬럼에 텍스트
+            chunk[c] = ts.astype("datetime64[ns]")
+        else:
+            if pd.api.types.infer_dtype(s, skipna=True) not in ("string", "empty"):
+                raise _SchemaDrift(c, dt)              # 숫자로 추론된 청크 → 원문 문자열로 다시 읽기
+            chunk[c] = s.astype("category") if dt == "category" else s
+    return chunk
+
+def _arrow_schema_for(plan: dict, sample: pd.DataFrame):
+    import pyarrow as pa
+    schema = pa.Schema.from_pandas(sample, preserve_index=False)   # pandas 메타데이터(Int64/category 복원용)
+    arrow_types = {"Int64": pa.int64(), "float64": pa.float64(), "datetime": pa.timestamp("ns"),
+                   "category": pa.dictionary(pa.int32(), pa.string()), "text": pa.large_string()}
+    for c, dt in plan["dtypes"].items():
+        i = schema.get_field_index(c)
+        schema = schema.set(i, pa.field(c, arrow_types[dt]))
+    return schema
+
+def _csv_chunks(open_src, chunk_rows: int, as_text: set):
+    # 텍스트 컬럼이 숫자로 추론된 적이 있으면 원문 그대로 읽는다(추론 후 str 변환이면 '2019' → '2019.0')
+    header = list(pd.read_csv(open_src(), encoding_errors="ignore", nrows=0).columns) if as_text else []
+    names = normalize_column_names(header) if header else []
+    return pd.read_csv(open_src(), encoding_errors="ignore", chunksize=chunk_rows,
+                       dtype={h: str for h, n in zip(header, names) if n in as_text} or None)
+
+def _excel_header(cells) -> list:
+    """read_excel과 같은 머리글: 빈 칸 → 'Unnamed: i', 중복 → 'x.1', 'x.2'"""
+    out, seen = [], {}
+    for i, v in enumerate(cells):
+        h = f"Unnamed: {i}" if v is None else v
+        k = seen.get(h, 0)
+        seen[h] = k + 1
+        out.append(h if k == 0 else f"{h}.{k}")
+    return out
+
+def _xlsx_chunks(open_src, chunk_rows: int, as_text: set):
+    """openpyxl read_only로 첫 시트를 행 단위로 읽어 chunk_rows행씩 DataFrame으로(시트 전체를 올리지 않음)"""
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+    wb = load_workbook(open_src(), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = _excel_header(next(rows, ()))
+        width = len(header)
+        text_pos = {i for i, n in enumerate(normalize_column_names(header)) if n in as_text}
+        # read_excel과 같은 셀 해석(숫자 모양 문자열 → 숫자, 'n/a' 등 → 결측). 넓힌 컬럼은 문자열 그대로
+        text_dtype = {header[i]: str for i in text_pos} or None
+        parse = lambda batch: TextParser([header] + batch, header=0, dtype=text_dtype).read()
+        batch = []
+        for r in rows:
+            if all(v is None for v in r):
+                continue   # read_excel처럼 빈 행은 건너뜀
+            r = (tuple(r) + (None,) * width)[:width]
+            if text_pos:   # 넓힌 컬럼은 셀 값을 원문 문자열로
+                r = tuple(str(v) if i in text_pos and v is not None and not isinstance(v, str) else v
+                          for i, v in enumerate(r))
+            batch.append(r)
+            if len(batch) == chunk_rows:
+                yield parse(batch)
+                batch = []
+        if batch:
+            yield parse(batch)
+    finally:
+        wb.close()
+
+_CHUNK_SOURCES = {".csv": _csv_chunks, ".xlsx": _xlsx_chunks}
+
+def ingest_chunked(src, ext: str, out_path: Path, chunk_rows: int = INGEST_CHUNK_ROWS) -> Path:
+    """
+    CSV/xlsx(경로 또는 파일 객체)를 청크 단위로 정규화 + dtype 캐스팅하여 Parquet 하나로 기록.
+    피크 메모리 ≈ 청크 1개 + Parquet row group 버퍼(파일 크기와 무관).
+    """
+    chunks = _CHUNK_SOURCES[ext]
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(src, (str, os.PathLike)):
+        open_src = lambda: src
+    else:
+        raw = src.read()                               # read_csv가 파일 객체를 닫으므로 재시도용으로 보관
+        open_src = lambda: io.BytesIO(raw)
+    widen: dict = {}
+    while True:
+        try:
+            return _ingest_pass(lambda as_text: chunks(open_src, chunk_rows, as_text), out_path, widen)
+        except _SchemaDrift as e:
+            # 첫 청크로 정한 스키마가 뒤에서 어긋남 → 그 컬럼만 넓혀 처음부터 다시(컬럼당 최대 두 번)
+            widen[e.col] = e.dtype
+
+def _ingest_pass(read_chunks, out_path: Path, widen: dict) -> Path:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    writer = None
+    plan = schema = None
+    try:
+        for chunk in read_chunks({c for c, dt in widen.items() if dt in ("text", "category")}):
+            if chunk.empty:   # 헤더만 있는 CSV도 read_csv는 빈 청크 하나를 준다
+                continue
+            if plan is None:
+                plan = _chunk_plan(list(chunk.columns), chunk, widen)
+            chunk = _cast_chunk(chunk, plan)
+            if writer is None:
+                schema = _arrow_schema_for(plan, chunk)
+                writer = pq.ParquetWriter(tmp, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if writer is None:   # 헤더만 있는 파일
+            raise ValueError("데이터 행이 없습니다.")
+        writer.close(); writer = None
+        os.replace(tmp, out_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+    return out_path
+
+def _can_stream(ext: str, size: int) -> bool:
+    import importlib.util
+    need = ("pyarrow", "openpyxl") if ext == ".xlsx" else ("pyarrow",)
+    return (ext in CHUNKED_INGEST_MIN_BYTES and size >= CHUNKED_INGEST_MIN_BYTES[ext]
+            and all(importlib.util.find_spec(m) is not None for m in need))
+
+def _load_snapshot(digest: str, src, ext: str, size: int) -> tuple[pd.DataFrame, "TextStore"]:
+    """
+    내용 해시 스냅샷이 있으면 그대로, 없으면 원본을 파싱·정규화해서 만들어 둔다.
+    어느 경우든 결과는 스냅샷에서 다시 읽은 (메타 프레임, TextStore) — 본문은 Arrow 버퍼 한 벌만 남는다.
+    """
+    snap = read_snapshot(digest)
+    if snap is not None:
+        return snap
+    if _can_stream(ext, size):
+        ingest_chunked(src, ext, _snapshot_path(digest, ".parquet"))
+        return read_snapshot(digest)
+    df = normalize_frame(_read_raw(src, ext))
+    if write_snapshot(digest, df):
+        del df   # 파싱한 object 문자열을 놓은 뒤 다시 읽는다(본문이 pandas/Arrow 두 벌로 겹치지 않게)
+        return read_snapshot(digest)
+    return split_text_frame(df)   # 캐시 디렉터리에 못 쓰는 환경
+
+def load_path_split(path: str, size: Optional[int] = None) -> tuple[pd.DataFrame, "TextStore"]:
+    """경로 → (정규화 완료 메타 프레임, TextStore)"""
+    if size is None:
+        size = os.path.getsize(path)
+    return _load_snapshot(file_digest(path), path, os.path.splitext(path)[1].lower(), size)
+
+def load_bytes_split(data: bytes, name: str, digest: Optional[str] = None) -> tuple[pd.DataFrame, "TextStore"]:
+    """업로드/붙여넣기 원문 → (메타 프레임, TextStore). 같은 내용이면 경로 적재와 스냅샷을 공유"""
+    digest = digest or hashlib.sha1(data).hexdigest()
+    return _load_snapshot(digest, io.BytesIO(data), os.path.splitext(name)[1].lower(), len(data))
+
+
+
+# --------------------- 텍스트 저장소(긴 본문 컬럼) ---------------------
+# 보고서 본문 컬럼을 프레임에서 떼어 Arrow large_string(연속 UTF-8 버퍼 + int64 offset)으로 한 벌만 보관.
+# full_text가 세 컬럼의 결합과 같으면 저장하지 않고 필요할 때 파생한다. 국가/연도 확장 프레임에는
+# 본문이 따라가지 않고, 상세 패널처럼 실제로 읽는 곳에서 문서 id(= 행 위치, 프레임 index)로 붙인다.
+LONG_TEXT_COLS = ["주요 내용", "기대 효과", "요약", "full_text"]
+FULL_TEXT_PARTS = ["주요 내용", "기대 효과", "요약"]   # full_text = 세 컬럼을 공백으로 이은 것
+TEXT_BATCH_ROWS = 4096   # 본문을 파이썬 문자열/결합 결과로 만들 때의 행 단위(피크 메모리 상한)
+
+def _join_parts(parts: list):
+    """결합 규칙(원본 full_text와 동일): 공백 구분, 하나라도 결측이면 결측"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    return pc.binary_join_element_wise(*parts, pa.scalar(" ", pa.large_string()))
+
+def _joins_to(parts: list, full_chunks, n_rows: int) -> bool:
+    """full_text(배열 조각 또는 RecordBatch 순서대로)가 parts 결합과 같은지. 결합 결과를 통째로 만들지 않는다"""
+    import pyarrow as pa
+    start = 0
+    for f in full_chunks:
+        if isinstance(f, pa.RecordBatch):
+            f = f.column(0)
+        j = _join_parts([a.slice(start, len(f)) for a in parts])
+        if isinstance(j, pa.ChunkedArray):
+            j = j.combine_chunks()
+        if not j.equals(f.cast(pa.large_string())):
+            return False
+        start += len(f)
+    return start == n_rows
+
+def _text_row_hashes(arrays: dict, n_rows: int, chunk_rows: int = TEXT_BATCH_ROWS) -> np.ndarray:
+    """행별 본문 해시. 파이썬 문자열은 청크 분량만 만든다(본문 전체를 pandas로 올리지 않음)"""
+    out = np.zeros(n_rows, dtype=np.uint64)
+    for start in range(0, n_rows if arrays else 0, chunk_rows):
+        part = pd.DataFrame({c: a.slice(start, chunk_rows).to_numpy(zero_copy_only=False) for c, a in arrays.items()})
+        out[start:start + len(part)] = pd.util.hash_pandas_object(part, index=False).to_numpy()
+    return out
+
+class TextStore:
+    """읽기 전용. 여러 세션이 공유(cache_resource)하므로 만든 뒤에는 바꾸지 않는다."""
+
+    def __init__(self, order: list, arrays: dict, dtypes: dict, n_rows: int, derived_full: bool = False):
+        """
+        order: 원래 컬럼 순서(attach 후 복원), arrays: 컬럼 → large_string 배열(청크 배열 가능),
+        dtypes: attach 시 복원할 dtype, derived_full: full_text를 이미 결합 규칙으로 확인해 빼 두었음
+        """
+        self.order = list(order)
+        self.arrays, self.dtypes = dict(arrays), dict(dtypes)
+        full = self.arrays.get("full_text")
+        self.derived_full = derived_full or (
+            full is not None and all(c in self.arrays for c in FULL_TEXT_PARTS)
+            and _joins_to([self.arrays[c] for c in FULL_TEXT_PARTS],
+                          (full.slice(s, TEXT_BATCH_ROWS) for s in range(0, len(full), TEXT_BATCH_ROWS)), len(full)))
+        stored = list(self.arrays) + (["full_text"] if derived_full else [])
+        if self.derived_full:
+            self.arrays.pop("full_text", None)
+        # 행 내용 해시에 본문을 반영하기 위한 행별 해시(메타 프레임 해시와 합쳐 corpus_digests)
+        self.row_hashes = _text_row_hashes(self.arrays, n_rows)
+        self.columns = [c for c in self.order if c in stored]
+
+    @classmethod
+    def from_frame(cls, df_in: pd.DataFrame) -> "TextStore":
+        """메모리 프레임에서(피클 스냅샷 / 스냅샷을 못 쓰는 환경). Parquet 스냅샷은 _read_parquet_split"""
+        import pyarrow as pa
+        arrays, dtypes = {}, {}
+        for c in LONG_TEXT_COLS:
+            if c not in df_in.columns:
+                continue
+            try:
+                arrays[c] = pa.array(df_in[c].to_numpy(dtype=object), type=pa.large_string(), from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                continue   # 숫자 등이 섞인 컬럼은 프레임에 그대로 둔다
+            dtypes[c] = df_in[c].dtype
+        return cls(df_in.columns, arrays, dtypes, len(df_in))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays.values())
+
+    def _arrow(self, col: str, idx=None):
+        if col == "full_text" and self.derived_full:
+            parts = [self.arrays[c] if idx is None else self.arrays[c].take(idx) for c in FULL_TEXT_PARTS]
+            return _join_parts(parts)
+        a = self.arrays[col]
+        return a if idx is None else a.take(idx)
+
+    def utf8(self, col: str, doc: int) -> Optional[memoryview]:
+        """문서 하나의 원문 UTF-8 바이트(버퍼 슬라이스, 복사 없음). 파생 full_text는 text() 사용"""
+        buf = self.arrays[col][doc].as_buffer()
+        return None if buf is None else memoryview(buf)
+
+    def text(self, col: str, doc: int) -> Optional[str]:
+        if col == "full_text" and self.derived_full:
+            parts = [self.arrays[c][doc].as_py() for c in FULL_TEXT_PARTS]
+            return None if any(p is None for p in parts) else " ".join(parts)
+        return self.arrays[col][doc].as_py()
+
+    def attach(self, frame: pd.DataFrame, cols: Optional[list] = None) -> pd.DataFrame:
+        """frame(index = 문서 id, 중복 허용)에 본문 컬럼을 붙여 원래 컬럼 순서로 반환. 해당 행만 꺼낸다."""
+        import pyarrow as pa
+        cols = [c for c in (cols or self.columns) if c in self.columns and c not in frame.columns]
+        if not cols:
+            return frame
+        idx = pa.array(np.asarray(frame.index, dtype=np.int64))
+        out = frame.copy(deep=False)
+        for c in cols:
+            vals = pd.Series(self._arrow(c, idx).to_numpy(zero_copy_only=False), index=frame.index, dtype=object)
+            out[c] = vals.where(vals.notna(), np.nan).astype(self.dtypes[c])   # 결측은 원본처럼 NaN
+        head = [c for c in self.order if c in out.columns]
+        return out[head + [c for c in out.columns if c not in self.order]]
+
+def split_text_frame(df_in: pd.DataFrame) -> tuple[pd.DataFrame, TextStore]:
+    """정규화 프레임 → (본문 없는 메타 프레임, TextStore). 문서 id = 행 위치(RangeIndex)"""
+    df_in = df_in.reset_index(drop=True)
+    texts = TextStore.from_frame(df_in)
+    return df_in.drop(columns=texts.columns), texts
+
+def corpus_digests(meta: pd.DataFrame, texts: TextStore) -> np.ndarray:
+    """행 내용 해시(메타 컬럼 + 본문). 앱과 빌드 CLI가 같은 값을 써야 번들이 맞물린다"""
+    return row_digests(meta.assign(__texts=texts.row_hashes))
+
+# --------------------- 카테고리 코드(정수 코드 + 공유 라벨 사전) ---------------------
+# 적재 시 한 번, category 컬럼마다 라벨을 정규화(str.strip, 결측/'nan'/'' → 미분류)해 정수 코드로 둔다.
+# 필터/집계는 코드 배열(==, bincount, unique)로 하고 라벨은 출력할 때만 붙인다.
+UNCLASSIFIED = "미분류"
+
+def _canon_label(v) -> str:
+    t = "" if v is None or (isinstance(v, float) and np.isnan(v)) else str(v).strip()
+    return UNCLASSIFIED if t in ("", "nan") else t
+
+class CategoryCodes:
+    """
+    codes[col] = 행별 int32 코드, labels[col] = 코드 → 라벨(행 첫 등장 순서).
+    원 category 값마다 한 번만 정규화하므로 행 수만큼 문자열을 다시 훑지 않는다.
+    """
+
+    def __init__(self, df_in: pd.DataFrame, cols: list[str] = CATEGORY_COLS):
+        self.codes: dict = {}
+        self.labels: dict = {}
+        self.n_rows = len(df_in)
+        for c in cols:
+            if c not in df_in.columns:
+                continue
+            s = df_in[c]
+            cat = s.cat if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category").cat
+            raw = [_canon_label(v) for v in cat.categories] + [UNCLASSIFIED]      # 마지막 칸 = 결측
+            canon, canon_labels = pd.factorize(pd.Series(raw, dtype=object))      # 같은 라벨로 합침
+            row = np.asarray(cat.codes, dtype=np.int64)
+            row_canon = canon[np.where(row < 0, len(raw) - 1, row)]
+            codes, order = pd.factorize(row_canon)                                # 행 첫 등장 순서
+            self.codes[c] = codes.astype(np.int32)
+            self.labels[c] = [canon_labels[i] for i in order]
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.codes
+
+    def code_of(self, col: str, label) -> int:
+        try:
+            return self.labels.get(col, []).index(label)
+        except ValueError:
+            return -1
+
+    def mask(self, col: str, label) -> np.ndarray:
+        """라벨 == label인 행 bool 마스크(없는 컬럼/라벨이면 전부 False)"""
+        k = self.code_of(col, label)
+        if k < 0:
+            return np.zeros(self.n_rows, dtype=bool)
+        return self.codes[col] == k
+
+    def counts(self, col: str) -> np.ndarray:
+        """라벨별 행 수(labels[col] 순서)"""
+        return np.bincount(self.codes[col], minlength=len(self.labels[col])) if col in self else np.zeros(0, dtype=np.int64)
+
+    def classes(self, col: str) -> list:
+        """미분류를 뺀 라벨(정렬) — 선택 목록용"""
+        return sorted(l for l in self.labels.get(col, []) if l != UNCLASSIFIED)
+
+    def label_array(self, col: str) -> np.ndarray:
+        return np.array(self.labels.get(col, []), dtype=object)
+
+
+# --------------------- 명사 필터 ---------------------
+USE_NOUN_FILTER: bool = True   # ← 명사 필터 사용 여부(사이드바 토글로 바꿔도 됨)
+
+# ==== 규칙 기반 명사 필터 (kiwi 불필요) ====
+
+_HANGUL_RE = re.compile(r"[가-힣]+")
+_TOKEN_RE  = re.compile(r"[A-Za-z]+(?:[-_][A-Za-z0-9]+)*|[0-9]+(?:\.[0-9]+)?|[가-힣]+")
+_KO_POSTFIX_DROP = (
+    "하다","적인","스러운","스러움","스럽다","되다","시키다","되며","하며","하다가",
+    "으로","부터","처럼","까지","대로","라서","면서","면서도","하면서",
+    "에서","에게","에게서","한테","이라서","이라도",
+)
+_KO_SINGLE_PARTICLE = set(list("은는이가을를의에와과도만"))
+_EN_SHORT_MIN = 2
+
+def _strip_ko_suffix(tok: str) -> str:
+    for suf in _KO_POSTFIX_DROP:
+        if tok.endswith(suf) and len(tok) > len(suf) + 1:
+            tok = tok[:-len(suf)]
+            break
+    if len(tok) >= 3 and tok[-1] in _KO_SINGLE_PARTICLE:
+        tok = tok[:-1]
+    return tok
+
+def _valid_token(tok: str) -> bool:
+    if not tok: return False
+    if re.fullmatch(r"[0-9]+(?:\.[0-9]+)?", tok): return False
+    if len(tok) == 1: return False
+    return True
+
+def _noun_token(t: str) -> str:
+    """_TOKEN_RE 토큰 하나 → 명사 필터 결과(탈락이면 "")"""
+    if _HANGUL_RE.fullmatch(t):
+        t = _strip_ko_suffix(t).strip()
+        if not t or t.lower() in STOP_ALL or not _valid_token(t): return ""
+        return t
+    tl = t.lower()
+    if len(tl) < _EN_SHORT_MIN or tl in STOP_ALL: return ""
+    return tl
+
+def extract_nouns_korean(text: str) -> str:
+    if not isinstance(text, str) or not text.strip(): return ""
+    return " ".join(n for n in map(_noun_token, _TOKEN_RE.findall(text)) if n)
+
+def _vocab_tokens(doc: str) -> list[str]:
+    """대비 키워드용 어휘 토큰(공백 분할 + 소문자 + STOP_ALL 제거)"""
+    if not isinstance(doc, str) or not doc.strip():
+        return []
+    toks = re.split(r"\s+", doc.strip())
+    return [t.lower() for t in toks if t and t.lower() not in STOP_ALL]
+
+# 구(phrase) 후보가 넘지 않는 경계: 토큰 사이 틈의 문장부호/괄호/따옴표/줄바꿈 + 텍스트 컬럼 경계
+# + 조사/어미를 떼어 낸 한글 용어 뒤('보고서는 가나의' → 보고서 | 가나 — 조사가 붙으면 명사구가 끝난다)
+_TERM_BREAK_RE = re.compile(r"[.!?。！？,;:·…•()\[\]{}<>\"'“”‘’「」『』/|\n\r]")
+
+def term_tokens(vals) -> tuple[tuple, tuple]:
+    """
+    텍스트 컬럼 값들 → (terms, breaks). terms = _vocab_tokens(명사 필터(값들을 공백으로 이은 본문))와 같은 토큰열,
+    breaks = 바로 앞 용어와의 사이에 경계가 있는 용어 위치(0 제외, 오름차순).
+    """
+    terms, breaks = [], []
+    for v in vals:
+        s = str(v or "")
+        cut = True                                   # 컬럼 경계
+        if USE_NOUN_FILTER:
+            last = 0
+            for m in _TOKEN_RE.finditer(s):
+                if _TERM_BREAK_RE.search(s, last, m.start()):
+                    cut = True
+                last = m.end()
+                raw = m.group()
+                t = _noun_token(raw)
+                if not t:
+                    continue
+                if cut and terms:
+                    breaks.append(len(terms))
+                terms.append(t)
+                cut = len(t) < len(raw) and bool(_HANGUL_RE.fullmatch(raw))
+        else:
+            for w in s.split():
+                if _TERM_BREAK_RE.match(w):
+                    cut = True
+                t = w.lower()
+                if t not in STOP_ALL:
+                    if cut and terms:
+                        breaks.append(len(terms))
+                    terms.append(t); cut = False
+                if _TERM_BREAK_RE.match(w[-1]):
+                    cut = True
+    return tuple(terms), tuple(breaks)
+
+# --------------------- 국가 매핑 ---------------------
+COUNTRY_MAP = {
+    # 🌏 아시아
+    "대한민국": ("KOR","Korea, Republic of","대한민국"), "한국": ("KOR","Korea, Republic of","대한민국"),
+    "북한": ("PRK","Korea, Democratic People's Republic of","북한"),
+    "일본": ("JPN","Japan","일본"), "중국": ("CHN","China","중국"), "몽골": ("MNG","Mongolia","몽골"),
+    "베트남": ("VNM","Vietnam","베트남"), "라오스": ("LAO","Laos","라오스"), "캄보디아": ("KHM","Cambodia","캄보디아"),
+    "태국": ("THA","Thailand","태국"), "미얀마": ("MMR","Myanmar","미얀마"),
+    "말레이시아": ("MYS","Malaysia","말레이시아"), "싱가포르": ("SGP","Singapore","싱가포르"),
+    "인도네시아": ("IDN","Indonesia","인도네시아"), "필리핀": ("PHL","Philippines","필리핀"),
+    "브루나이": ("BRN","Brunei Darussalam","브루나이"), "동티모르": ("TLS","Timor-Leste","동티모르"),
+    "인도": ("IND","India","인도"), "파키스탄": ("PAK","Pakistan","파키스탄"), "네팔": ("NPL","Nepal","네팔"),
+    "부탄": ("BTN","Bhutan","부탄"), "스리랑카": ("LKA","Sri Lanka","스리랑카"), "몰디브": ("MDV","Maldives","몰디브"),
+    "카자흐스탄": ("KAZ","Kazakhstan","카자흐스탄"), "우즈베키스탄": ("UZB","Uzbekistan","우즈베키스탄"),
+    "키르기스스탄": ("KGZ","Kyrgyzstan","키르기스스탄"), "타지키스탄": ("TJK","Tajikistan","타지키스탄"),
+    "투르크메니스탄": ("TKM","Turkmenistan","투르크메니스탄"), "아프가니스탄": ("AFG","Afghanistan","아프가니스탄"),
+    "이란": ("IRN","Iran","이란"), "이라크": ("IRQ","Iraq","이라크"), "시리아": ("SYR","Syrian Arab Republic","시리아"),
+    "레바논": ("LBN","Lebanon","레바논"), "이스라엘": ("ISR","Israel","이스라엘"), "팔레스타인": ("PSE","Palestine","팔레스타인"),
+    "요르단": ("JOR","Jordan","요르단"), "사우디아라비아": ("SAU","Saudi Arabia","사우디아라비아"),
+    "예멘": ("YEM","Yemen","예멘"), "오만": ("OMN","Oman","오만"), "아랍에미리트": ("ARE","United Arab Emirates","아랍에미리트"),
+    "카타르": ("QAT","Qatar","카타르"), "바레인": ("BHR","Bahrain","바레인"), "쿠웨이트": ("KWT","Kuwait","쿠웨이트"),
+
+    # 🌍 유럽
+    "영국": ("GBR","United Kingdom","영국"), "아일랜드": ("IRL","Ireland","아일랜드"), "프랑스": ("FRA","France","프랑스"),
+    "독일": ("DEU","Germany","독일"), "이탈리아": ("ITA","Italy","이탈리아"), "스페인": ("ESP","Spain","스페인"),
+    "포르투갈": ("PRT","Portugal","포르투갈"), "네덜란드": ("NLD","Netherlands","네덜란드"),
+    "벨기에": ("BEL","Belgium","벨기에"), "룩셈부르크": ("LUX","Luxembourg","룩셈부르크"),
+    "스위스": ("CHE","Switzerland","스위스"), "오스트리아": ("AUT","Austria","오스트리아"),
+    "덴마크": ("DNK","Denmark","덴마크"), "노르웨이": ("NOR","Norway","노르웨이"), "스웨덴": ("SWE","Sweden","스웨덴"),
+    "핀란드": ("FIN","Finland","핀란드"), "아이슬란드": ("ISL","Iceland","아이슬란드"),
+    "체코": ("CZE","Czechia","체코"), "폴란드": ("POL","Poland","폴란드"), "헝가리": ("HUN","Hungary","헝가리"),
+    "슬로바키아": ("SVK","Slovakia","슬로바키아"), "슬로베니아": ("SVN","Slovenia","슬로베니아"),
+    "크로아티아": ("HRV","Croatia","크로아티아"), "세르비아": ("SRB","Serbia","세르비아"),
+    "몬테네그로": ("MNE","Montenegro","몬테네그로"), "보스니아헤르체고비나": ("BIH","Bosnia and Herzegovina","보스니아헤르체고비나"),
+    "북마케도니아": ("MKD","North Macedonia","북마케도니아"), "알바니아": ("ALB","Albania","알바니아"),
+    "그리스": ("GRC","Greece","그리스"), "터키": ("TUR","Türkiye","터키"),
+    "루마니아": ("ROU","Romania","루마니아"), "불가리아": ("BGR","Bulgaria","불가리아"),
+    "몰도바": ("MDA","Moldova","몰도바"), "우크라이나": ("UKR","Ukraine","우크라이나"), "벨라루스": ("BLR","Belarus","벨라루스"),
+    "리투아니아": ("LTU","Lithuania","리투아니아"), "라트비아": ("LVA","Latvia","라트비아"), "에스토니아": ("EST","Estonia","에스토니아"),
+    "조지아": ("GEO","Georgia","조지아"), "아르메니아": ("ARM","Armenia","아르메니아"), "아제르바이잔": ("AZE","Azerbaijan","아제르바이잔"),
+    "러시아": ("RUS","Russian Federation","러시아"),
+
+    # 🌍 아프리카
+    "이집트": ("EGY","Egypt","이집트"), "리비아": ("LBY","Libya","리비아"), "알제리": ("DZA","Algeria","알제리"),
+    "모로코": ("MAR","Morocco","모로코"), "튀니지": ("TUN","Tunisia","튀니지"), "수단": ("SDN","Sudan","수단"),
+    "남수단": ("SSD","South Sudan","남수단"), "에티오피아": ("ETH","Ethiopia","에티오피아"),
+    "에리트레아": ("ERI","Eritrea","에리트레아"), "지부티": ("DJI","Djibouti","지부티"),
+    "소말리아": ("SOM","Somalia","소말리아"), "케냐": ("KEN","Kenya","케냐"), "탄자니아": ("TZA","Tanzania","탄자니아"),
+    "우간다": ("UGA","Uganda","우간다"), "르완다": ("RWA","Rwanda","르완다"), "부룬디": ("BDI","Burundi","부룬디"),
+    "콩고민주공화국": ("COD","Democratic Republic of the Congo","콩고민주공화국"),
+    "콩고공화국": ("COG","Republic of the Congo","콩고공화국"),
+    "앙골라": ("AGO","Angola","앙골라"), "잠비아": ("ZMB","Zambia","잠비아"), "짐바브웨": ("ZWE","Zimbabwe","짐바브웨"),
+    "말라위": ("MWI","Malawi","말라위"), "모잠비크": ("MOZ","Mozambique","모잠비크"), "마다가스카르": ("MDG","Madagascar","마다가스카르"),
+    "남아프리카공화국": ("ZAF","South Africa","남아프리카공화국"), "보츠와나": ("BWA","Botswana","보츠와나"),
+    "나미비아": ("NAM","Namibia","나미비아"), "레소토": ("LSO","Lesotho","레소토"), "에스와티니": ("SWZ","Eswatini","에스와티니"),
+    "가나": ("GHA","Ghana","가나"), "코트디부아르": ("CIV","Côte d'Ivoire","코트디부아르"), "나이지리아": ("NGA","Nigeria","나이지리아"),
+    "세네갈": ("SEN","Senegal","세네갈"), "말리": ("MLI","Mali","말리"), "니제르": ("NER","Niger","니제르"),
+    "차드": ("TCD","Chad","차드"), "카메룬": ("CMR","Cameroon","카메룬"), "가봉": ("GAB","Gabon","가봉"),
+    "적도기니": ("GNQ","Equatorial Guinea","적도기니"), "기니": ("GIN","Guinea","기니"),
+    "기니비사우": ("GNB","Guinea-Bissau","기니비사우"),
+
+    # 🌎 아메리카
+    "미국": ("USA","United States of America","미국"), "캐나다": ("CAN","Canada","캐나다"),
+    "멕시코": ("MEX","Mexico","멕시코"), "브라질": ("BRA","Brazil","브라질"), "아르헨티나": ("ARG","Argentina","아르헨티나"),
+    "칠레": ("CHL","Chile","칠레"), "페루": ("PER","Peru","페루"), "콜롬비아": ("COL","Colombia","콜롬비아"),
+    "에콰도르": ("ECU","Ecuador","에콰도르"), "우루과이": ("URY","Uruguay","우루과이"), "파라과이": ("PRY","Paraguay","파라과이"),
+    "볼리비아": ("BOL","Bolivia","볼리비아"), "베네수엘라": ("VEN","Venezuela","베네수엘라"),
+    "쿠바": ("CUB","Cuba","쿠바"), "도미니카공화국": ("DOM","Dominican Republic","도미니카공화국"),
+    "자메이카": ("JAM","Jamaica","자메이카"), "아이티": ("HTI","Haiti","아이티"),
+    "코스타리카": ("CRI","Costa Rica","코스타리카"), "파나마": ("PAN","Panama","파나마"),
+    "온두라스": ("HND","Honduras","온두라스"), "엘살바도르": ("SLV","El Salvador","엘살바도르"),
+    "니카라과": ("NIC","Nicaragua","니카라과"), "과테말라": ("GTM","Guatemala","과테말라"),
+
+    # 🌊 오세아니아
+    "호주": ("AUS","Australia","호주"), "뉴질랜드": ("NZL","New Zealand","뉴질랜드"),
+    "파푸아뉴기니": ("PNG","Papua New Guinea","파푸아뉴기니"), "피지": ("FJI","Fiji","피지"),
+    "사모아": ("WSM","Samoa","사모아"), "통가": ("TON","Tonga","통가"), "바누아투": ("VUT","Vanuatu","바누아투"),
+}
+
+REGION_RULES = {
+    "메콩강위원회": [
+        ("KHM","Cambodia","캄보디아"),
+        ("LAO","Laos","라오스"),
+        ("THA","Thailand","태국"),
+        ("VNM","Vietnam","베트남"),
+    ],
+    "호주·한국": [
+        ("AUS","Australia","호주"),
+        ("KOR","Korea, Republic of","대한민국"),
+    ],
+    "중남미 지역": [
+        ("ARG","Argentina","아르헨티나"),("BRA","Brazil","브라질"),("CHL","Chile","칠레"),
+        ("URY","Uruguay","우루과이"),("PRY","Paraguay","파라과이"),("BOL","Bolivia","볼리비아"),
+        ("PER","Peru","페루"),("ECU","Ecuador","에콰도르"),("COL","Colombia","콜롬비아"),
+        ("VEN","Venezuela","베네수엘라"),("GUY","Guyana","가이아나"),("SUR","Suriname","수리남"),
+        ("MEX","Mexico","멕시코"),("GTM","Guatemala","과테말라"),("BLZ","Belize","벨리즈"),
+        ("HND","Honduras","온두라스"),("SLV","El Salvador","엘살바도르"),("NIC","Nicaragua","니카라과"),
+        ("CRI","Costa Rica","코스타리카"),("PAN","Panama","파나마"),
+        ("CUB","Cuba","쿠바"),("DOM","Dominican Republic","도미니카공화국"),("HTI","Haiti","아이티"),
+        ("JAM","Jamaica","자메이카"),("BRB","Barbados","바베이도스"),("BHS","Bahamas","바하마"),
+        ("TTO","Trinidad and Tobago","트리니다드토바고"),("LCA","Saint Lucia","세인트루시아"),
+        ("VCT","Saint Vincent and the Grenadines","세인트빈센트그레나딘"),
+        ("KNA","Saint Kitts and Nevis","세인트키츠네비스"),
+        ("GRD","Grenada","그레나다"),("DMA","Dominica","도미니카연방"),
+        ("ATG","Antigua and Barbuda","앤티가바부다"),("PRI","Puerto Rico","푸에르토리코"),
+        ("VIR","Virgin Islands (U.S.)","미국령 버진 아일랜드"),
+        ("CYM","Cayman Islands","케이맨 제도"),("TCA","Turks and Caicos Islands","터크스 케이커스 제도"),
+        ("ABW","Aruba","아루바"),("CUW","Curaçao","퀴라소"),("SXM","Sint Maarten","신트마르턴"),
+        ("MAF","Saint Martin (French part)","생마르탱"),
+    ],
+}
+
+def split_countries(x: str):
+    if pd.isna(x): return []
+    return [tok for tok in re.split(r"[·/,;|&]+|\s*,\s*|\s*&\s*", str(x).strip()) if tok]
+
+# 표기 변형(영문 약칭/구명칭/한글 이표기) → ISO3. 정식 한글명·영문명·ISO3 코드는 표에서 자동 등록
+COUNTRY_ALIASES = {
+    "Viet Nam": "VNM", "Lao PDR": "LAO", "Lao People's Democratic Republic": "LAO",
+    "Korea": "KOR", "South Korea": "KOR", "Republic of Korea": "KOR", "North Korea": "PRK",
+    "United States": "USA", "US": "USA", "UK": "GBR", "UAE": "ARE", "Russia": "RUS", "Syria": "SYR",
+    "Turkey": "TUR", "Czech Republic": "CZE", "Brunei": "BRN", "East Timor": "TLS",
+    "Kyrgyz Republic": "KGZ", "Cote d'Ivoire": "CIV", "Ivory Coast": "CIV", "DR Congo": "COD", "DRC": "COD",
+    "Swaziland": "SWZ", "Macedonia": "MKD", "Bosnia": "BIH", "Burma": "MMR",
+    # 하이픈 이름은 변형까지 등록: 라틴 경계 규칙상 'Guinea-Bissau'의 'Guinea'도 단어로 맞기 때문에
+    # 최장 일치가 전체 이름을 먼저 잡아야 한다
+    "Guinea Bissau": "GNB", "Timor Leste": "TLS", "기니-비사우": "GNB",
+    "튀르키예": "TUR", "체코공화국": "CZE", "남아공": "ZAF", "사우디": "SAU", "아랍에미레이트": "ARE",
+    "키르기즈스탄": "KGZ", "키르기스": "KGZ", "보스니아 헤르체고비나": "BIH", "버마": "MMR",
+}
+# 한글 국가명 뒤에 붙어도 같은 국가로 보는 꼬리(조사/접미). 그 외 한글이 이어지면 다른 단어로 본다
+_KO_TAIL = {"의", "등", "과", "와", "및", "은", "는", "이", "가", "을", "를", "에", "에서", "지역", "정부", "측"}
+
+def _is_hangul(ch: str) -> bool:
+    return "가" <= ch <= "힣"
+
+def _is_ascii_word(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+def _build_country_tries() -> tuple[dict, dict]:
+    """(대소문자 구분 트라이: ISO3/대문자 약칭, 소문자 트라이: 한글명/영문명/권역명). 노드 = dict, 종료값 = 키 ''"""
+    table: dict = {}
+    for tup in list(COUNTRY_MAP.values()) + [t for ts in REGION_RULES.values() for t in ts]:
+        table.setdefault(tup[0], tup)
+    aliases: list = []
+    for iso, tup in table.items():
+        aliases += [(iso, (tup,)), (tup[1], (tup,)), (tup[2], (tup,))]
+    aliases += [(k, (v,)) for k, v in COUNTRY_MAP.items()]
+    aliases += [(k, tuple(v)) for k, v in REGION_RULES.items()]
+    aliases += [(k, (table[iso],)) for k, iso in COUNTRY_ALIASES.items() if iso in table]
+    exact, fold = {}, {}
+    for name, payload in aliases:
+        name = name.strip()
+        root, key = ((exact, name) if name.isascii() and name.isupper() else (fold, name.lower()))
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault("", payload)   # 같은 키는 먼저 등록된 것(정식 표) 우선
+    return exact, fold
+
+_COUNTRY_TRIES = _build_country_tries()
+
+def _match_ok(text: str, i: int, j: int) -> bool:
+    """text[i:j]가 단어 경계에 맞는 국가명인지(한글은 조사 꼬리 허용, 라틴은 영숫자 경계)"""
+    if _is_hangul(text[i]):
+        if i > 0 and _is_hangul(text[i - 1]):
+            return False
+        k = j
+        while k < len(text) and _is_hangul(text[k]):
+            k += 1
+        return k == j or text[j:k] in _KO_TAIL
+    return (i == 0 or not _is_ascii_word(text[i - 1])) and (j == len(text) or not _is_ascii_word(text[j]))
+
+@lru_cache(maxsize=1 << 16)
+def _resolve_countries(text: str) -> tuple:
+    """문자열 한 번 훑기(각 위치에서 트라이 최장 일치, 매칭되면 그 끝으로 점프). 결과는 문자열별 캐시"""
+    low = text.lower()
+    if len(low) != len(text):   # 소문자화로 길이가 바뀌는 문자(드묾) → 위치 정렬 유지 위해 원문 사용
+        low = text
+    out, i, n = [], 0, len(text)
+    while i < n:
+        best = None
+        for root, src in zip(_COUNTRY_TRIES, (text, low)):
+            node, j = root, i
+            while j < n and src[j] in node:
+                node = node[src[j]]; j += 1
+                if "" in node and (best is None or j > best[0]) and _match_ok(text, i, j):
+                    best = (j, node[""])
+        if best is None:
+            i += 1
+        else:
+            out.extend(best[1]); i = best[0]
+    return tuple(out)
+
+def map_country_token(token: str):
+    return list(_resolve_countries(str(token).strip()))
+
+def countries_of(raw) -> tuple:
+    """대상국 셀 하나 → ((iso3, en, ko), ...). '베트남의', 'Viet Nam', 'VNM', '라오스·캄보디아 등'도 인식"""
+    if pd.isna(raw): return ()
+    return _resolve_countries(str(raw).strip())
+
+def countries_by_row(values) -> list:
+    """대상국 컬럼 → 행별 countries_of 결과. 같은 문자열(권역명 등 반복 값)은 한 번만 해석"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))   # 결측 = -1
+    mapped = [countries_of(u) for u in uniques]
+    return [mapped[c] if c >= 0 else () for c in codes]
+
+BRIDGE_COLS = ["doc_id", "iso3", "country_en", "country_ko"]
+
+def country_bridge(countries: list) -> pd.DataFrame:
+    """행별 매핑 결과 → 좁은 문서×국가 브리지(doc_id = 행 위치). 본문 등 원본 컬럼은 필요할 때 조인"""
+    lens = np.fromiter((len(cs) for cs in countries), dtype=np.int64, count=len(countries))
+    flat = [c for cs in countries for c in cs]
+    iso, en, ko = (list(t) for t in zip(*flat)) if flat else ([], [], [])
+    return pd.DataFrame({"doc_id": np.repeat(np.arange(len(countries), dtype=np.int64), lens),
+                         "iso3": iso, "country_en": en, "country_ko": ko}, columns=BRIDGE_COLS)
+
+class CountryIncidence:
+    """
+    문서×국가 0/1 희소 행렬(CSR, 데이터 버전당 1회). 필터는 문서 bool 마스크, 국가별 건수는 희소 행렬-벡터 곱.
+    건수 단위는 기존 groupby(...).agg(nunique("파일명"))와 같다(파일명 결측 제외, 중복 파일명은 한 번).
+    """
+
+    def __init__(self, bridge: pd.DataFrame, n_docs: int, doc_keys=None):
+        from scipy import sparse
+        pairs = pd.MultiIndex.from_arrays([bridge["iso3"].astype(object), bridge["country_ko"].astype(object)])
+        # (iso3, country_ko) 정렬 = groupby 출력 순서. 빈 MultiIndex는 pandas 2.x factorize가 거부 → 직접
+        codes, uniq = pd.factorize(pairs, sort=True) if len(pairs) else (np.zeros(0, dtype=np.int64), [])
+        self.iso3 = np.array([u[0] for u in uniq], dtype=object)
+        self.country_ko = np.array([u[1] for u in uniq], dtype=object)
+        m = sparse.csr_matrix((np.ones(len(codes), dtype=np.int32), (bridge["doc_id"].to_numpy(), codes)),
+                              shape=(n_docs, len(uniq)))
+        m.sum_duplicates(); m.data[:] = 1           # 같은 문서에 같은 국가가 두 번 → 1
+        self.matrix = m
+        self._t = m.T.tocsr()                        # 국가×문서(mat-vec용)
+        keys = pd.factorize(pd.Series(doc_keys, dtype=object))[0] if doc_keys is not None else np.arange(n_docs)
+        self._weight = (keys >= 0).astype(np.int32)  # 파일명 결측 문서는 세지 않음
+        self._keys = None if len(np.unique(keys[keys >= 0])) == int(self._weight.sum()) else keys
+
+    def counts(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """국가별 문서 수(mask = 문서 bool 배열, None이면 전체)"""
+        w = self._weight if mask is None else self._weight * np.asarray(mask, dtype=np.int32)
+        if self._keys is None:
+            return self._t @ w
+        # 파일명 중복 데이터: (파일명, 국가) 쌍을 유일화해 센다
+        rows = np.flatnonzero(w)
+        sub = self.matrix[rows].tocoo()
+        pair = np.unique(self._keys[rows][sub.row].astype(np.int64) * self.matrix.shape[1] + sub.col)
+        return np.bincount(pair % self.matrix.shape[1], minlength=self.matrix.shape[1])
+
+    def n_countries(self, mask: Optional[np.ndarray] = None) -> int:
+        """mask 문서들이 걸친 국가 수(파일명 결측 문서 포함)"""
+        w = np.ones(self.matrix.shape[0], dtype=np.int32) if mask is None else np.asarray(mask, dtype=np.int32)
+        return int(np.count_nonzero(self._t @ w))
+
+    def counts_by_year(self, year_ptr: np.ndarray, year_vals: np.ndarray,
+                       mask: Optional[np.ndarray] = None) -> tuple[list, np.ndarray]:
+        """
+        연도×국가 건수 행렬(행 = 정렬된 연도). 입력 = 문서→연도 CSR. 문서는 자기 연도마다 한 번씩.
+        연도×문서 0/1 희소 행렬 한 개와 문서×국가 행렬의 곱(연도 수만큼 문서 마스크를 만들지 않음).
+        """
+        from scipy import sparse
+        ys_arr, yrow = np.unique(year_vals, return_inverse=True)
+        ys = ys_arr.tolist()
+        n_docs, n_c = self.matrix.shape
+        if not ys:
+            return ys, np.zeros((0, n_c), dtype=np.int64)
+        docs = np.repeat(np.arange(len(year_ptr) - 1), np.diff(year_ptr))
+        w = self._weight if mask is None else self._weight * np.asarray(mask, dtype=np.int32)
+        keep = w[docs] > 0
+        docs, yrow = docs[keep], yrow.ravel()[keep]
+        if self._keys is None:
+            yd = sparse.csr_matrix((np.ones(len(docs), dtype=np.int64), (yrow, docs)), shape=(len(ys), n_docs))
+            yd.sum_duplicates(); yd.data[:] = 1     # 같은 문서에 같은 연도가 두 번 → 1
+            return ys, (yd @ self.matrix).toarray().astype(np.int64)
+        # 파일명 중복 데이터: (연도, 파일명, 국가) 세 쌍을 유일화해 센다
+        cptr, cols = _ragged_take(self.matrix.indptr.astype(np.int64), self.matrix.indices, docs)
+        n = np.diff(cptr)
+        n_keys = int(self._keys.max()) + 1
+        trip = np.unique((np.repeat(yrow, n).astype(np.int64) * n_keys + np.repeat(self._keys[docs], n)) * n_c + cols)
+        cell = (trip // (n_keys * n_c)) * n_c + trip % n_c
+        return ys, np.bincount(cell, minlength=len(ys) * n_c).reshape(len(ys), n_c).astype(np.int64)
+
+    def frame(self, mask: Optional[np.ndarray] = None, name: str = "n") -> pd.DataFrame:
+        """건수 > 0인 국가만 (iso3, country_ko, name) 프레임으로"""
+        c = self.counts(mask)
+        nz = np.flatnonzero(c)
+        return pd.DataFrame({"iso3": self.iso3[nz], "country_ko": self.country_ko[nz], name: c[nz].astype(np.int64)})
+
+# --------------------- 연도 파서 ---------------------
+# === KEEP ONLY THIS ===
+YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+
+def years_from_span(text):
+    """
+    '2025-2026' → [2025,2026], '2025' → [2025]
+    숫자(정수/실수)도 허용. 범위가 뒤집혀도 정상화.
+    """
+    if pd.isna(text):
+        return []
+
+    if isinstance(text, (int, np.integer, float, np.floating)):
+        y = int(text)
+        return [y] if 1990 <= y <= 2035 else []
+
+    t = str(text)
+    t = t.replace("~", "-").replace("–", "-").replace("—", "-")
+    t = re.sub(r"[()]", " ", t)
+
+    years = [int(y) for y in YEAR_RE.findall(t)]
+    years = [y for y in years if 1990 <= y <= 2035]
+
+    # 범위 확장
+    for a, b in re.findall(r"((?:19|20)\d{2})\s*-\s*((?:19|20)\d{2})", t):
+        a, b = int(a), int(b)
+        lo, hi = min(a, b), max(a, b)
+        years.extend(range(lo, hi + 1))
+
+    years = sorted(set(years))
+    return years
+
+_YEAR_PAT = f"({YEAR_RE.pattern})"
+_SPAN_PAT = r"((?:19|20)\d{2})\s*-\s*((?:19|20)\d{2})"
+
+def _ragged_take(ptr: np.ndarray, vals: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """CSR(ptr, vals)에서 rows 순서대로 행을 골라 새 CSR"""
+    lens = ptr[rows + 1] - ptr[rows]
+    out_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lens, out=out_ptr[1:])
+    idx = np.repeat(ptr[rows] - out_ptr[:-1], lens) + np.arange(out_ptr[-1])
+    return out_ptr, vals[idx]
+
+def year_spans(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    years_from_span의 벡터화판. 값 시리즈 → 행별 연도 CSR(ptr, years; 행 안에서 정렬·중복 제거).
+    고유 문자열마다 한 번만 str.extractall로 파싱하고, 범위는 NumPy로 펼친다.
+    """
+    ser = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values.astype(object)
+    codes, uniq = pd.factorize(ser)                       # 결측 = -1
+    uniq = pd.Series(uniq, dtype=object)
+    num = uniq.map(lambda v: isinstance(v, (int, np.integer, float, np.floating)) and not isinstance(v, bool))
+    txt = (uniq[~num].astype(str)
+           .str.replace(r"[~–—]", "-", regex=True).str.replace(r"[()]", " ", regex=True))
+
+    rows, years = [], []
+    if len(txt):
+        one = txt.str.extractall(_YEAR_PAT)
+        if len(one):
+            r = one.index.get_level_values(0).to_numpy()
+            y = one[0].astype(np.int64).to_numpy()
+            ok = (y >= 1990) & (y <= 2035)
+            rows.append(r[ok]); years.append(y[ok])
+        span = txt.str.extractall(_SPAN_PAT)
+        if len(span):
+            a, b = span[0].astype(np.int64).to_numpy(), span[1].astype(np.int64).to_numpy()
+            lo, hi = np.minimum(a, b), np.maximum(a, b)
+            n = hi - lo + 1
+            start = np.repeat(np.cumsum(n) - n, n)
+            rows.append(np.repeat(span.index.get_level_values(0).to_numpy(), n))
+            years.append(np.repeat(lo, n) + np.arange(n.sum()) - start)
+    for i in np.flatnonzero(num.to_numpy()):           # 숫자 셀(드묾)은 스칼라 규칙 그대로
+        ys = years_from_span(uniq[i])
+        rows.append(np.full(len(ys), i, dtype=np.int64)); years.append(np.asarray(ys, dtype=np.int64))
+
+    if rows:
+        key = np.unique(np.concatenate(rows).astype(np.int64) * 10000 + np.concatenate(years))
+        u_rows, u_years = key // 10000, key % 10000
+    else:
+        u_rows = u_years = np.zeros(0, dtype=np.int64)
+    u_ptr = np.zeros(len(uniq) + 2, dtype=np.int64)      # 마지막 칸 = 결측용 빈 행
+    np.cumsum(np.bincount(u_rows, minlength=len(uniq) + 1), out=u_ptr[1:])
+    return _ragged_take(u_ptr, u_years, np.where(codes < 0, len(uniq), codes).astype(np.int64))
+
+def years_csr(years_per_doc: list) -> tuple[np.ndarray, np.ndarray]:
+    """행별 연도 튜플 리스트 → CSR(ptr, years)"""
+    ptr = np.zeros(len(years_per_doc) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in years_per_doc], out=ptr[1:])
+    vals = np.fromiter((y for t in years_per_doc for y in t), dtype=np.int64, count=int(ptr[-1]))
+    return ptr, vals
+
+def csr_rows(ptr: np.ndarray, vals: np.ndarray) -> list:
+    """CSR → 행별 튜플(파이썬 int)"""
+    flat = vals.tolist()
+    return [tuple(flat[a:b]) for a, b in zip(ptr[:-1].tolist(), ptr[1:].tolist())]
+
+YEAR_BRIDGE_COLS = ["doc_id", "연도"]
+
+def year_bridge(year_ptr: np.ndarray, year_vals: np.ndarray) -> pd.DataFrame:
+    """문서→연도 CSR → 좁은 (doc_id, 연도) 브리지(정수 2열). 원본 컬럼은 필요할 때 doc_id로 조인"""
+    doc = np.repeat(np.arange(len(year_ptr) - 1, dtype=np.int64), np.diff(year_ptr))
+    return pd.DataFrame({"doc_id": doc, "연도": np.asarray(year_vals, dtype=np.int64)}, columns=YEAR_BRIDGE_COLS)
+
+
+# === 연도 텍스트 시리즈 선택 ===
+def _year_text_series(df_in: pd.DataFrame) -> pd.Series:
+    """연도 원천: 지정 컬럼 > 관용 컬럼들 > 요약/본문 등 텍스트 결합 → 문자열 시리즈 반환"""
+    ys_col = globals().get("YEAR_SOURCE", None)
+    if ys_col and ys_col in df_in.columns:
+        return df_in[ys_col].astype(str)
+
+    for c in ["사업 기간","연도","기간","Project Period","Years","Year","year"]:
+        if c in df_in.columns:
+            return df_in[c].astype(str)
+
+    pool = [c for c in ["요약","주요 내용","파일명"] if c in df_in.columns]
+    if pool:
+        return df_in[pool].fillna("").astype(str).agg(" ".join, axis=1)
+
+    # 최후: 빈 문자열 시리즈 (길이 맞춰서 반환)
+    return pd.Series([""] * len(df_in), index=df_in.index, dtype=str)
+
+# --------------------- 국가 · ICT 유형 요약표 ---------------------
+# 상세 패널/지도 툴팁용 그룹별 지표를 데이터 버전당 한 번 계산(클릭 → dict 조회).
+# 건수 단위: 보고서 = 파일명 고유 수, ICT 유형 = 정규화 라벨(CategoryCodes) 고유 수(미분류 제외).
+SUMMARY_TOP = 10
+
+def _summary_records(pairs: pd.DataFrame, meta: pd.DataFrame, ybr: pd.DataFrame, top: pd.DataFrame,
+                     cats: CategoryCodes) -> dict:
+    """pairs(doc_id, key) → {key: 지표 dict}. top = (key, country_ko, n) 정렬 완료"""
+    cols = {"파일명": "n_docs", "대상기관": "n_inst", "__ict": "n_ict"}
+    doc = pairs["doc_id"].to_numpy()
+    docs = meta.iloc[doc].reindex(columns=["파일명", "대상기관"])
+    ict = cats.codes["ICT 유형"][doc].astype(np.float64) if "ICT 유형" in cats else np.full(len(doc), np.nan)
+    ict[ict == cats.code_of("ICT 유형", UNCLASSIFIED)] = np.nan          # 미분류는 유형 수에서 제외
+    long = pd.DataFrame({"key": pairs["key"].to_numpy(),
+                         "파일명": docs["파일명"].to_numpy(), "대상기관": docs["대상기관"].to_numpy(),
+                         "__ict": ict})
+    stats = long.groupby("key", sort=False).nunique().rename(columns=cols)
+    yrs = pairs.merge(ybr, on="doc_id").groupby("key", sort=False)["연도"].agg(["min", "max"])
+    tops = {k: list(zip(g["country_ko"].tolist(), g["n"].tolist())) for k, g in top.groupby("key", sort=False)}
+    out = {}
+    for k, r in stats.iterrows():
+        y = yrs.loc[k] if k in yrs.index else None
+        out[k] = {"n_docs": int(r["n_docs"]), "n_inst": int(r["n_inst"]), "n_ict": int(r["n_ict"]),
+                  "year_min": int(y["min"]) if y is not None else None,
+                  "year_max": int(y["max"]) if y is not None else None,
+                  "top": tops.get(k, [])}
+    return out
+
+def _top_countries(pairs: pd.DataFrame, bridge: pd.DataFrame, meta: pd.DataFrame, exclude_self: bool) -> pd.DataFrame:
+    """그룹별 함께 등장한 국가 상위 SUMMARY_TOP(파일명 고유 수 내림차순, 동률은 국가명 순)"""
+    co = pairs.merge(bridge[["doc_id", "iso3", "country_ko"]], on="doc_id")
+    if exclude_self:
+        co = co[co["iso3"] != co["key"]]
+    co = co.assign(파일명=meta["파일명"].to_numpy()[co["doc_id"].to_numpy()] if "파일명" in meta.columns else co["doc_id"])
+    n = co.groupby(["key", "country_ko"], sort=False, observed=True)["파일명"].nunique().rename("n").reset_index()
+    n = n[n["n"] > 0].sort_values(["key", "n", "country_ko"], ascending=[True, False, True])
+    return n.groupby("key", sort=False).head(SUMMARY_TOP)
+
+def group_summary(meta: pd.DataFrame, bridge: pd.DataFrame, ybr: pd.DataFrame,
+                  cats: Optional[CategoryCodes] = None) -> dict:
+    """
+    {"country": {iso3: 지표}, "class": {ICT 유형: 지표}}.
+    지표 = n_docs, year_min/year_max, n_inst(대상기관), n_ict(ICT 유형), top[(국가, 건수)…],
+    국가는 name(첫 매핑 한국어명)도. top은 국가 = 같은 보고서의 다른 대상국, ICT 유형 = 참여국가.
+    """
+    b = bridge.drop_duplicates(["doc_id", "iso3"])
+    c_pairs = pd.DataFrame({"doc_id": b["doc_id"].to_numpy(), "key": b["iso3"].astype(object).to_numpy()})
+    cats = cats if cats is not None else CategoryCodes(meta, ["ICT 유형"])
+    country = _summary_records(c_pairs, meta, ybr, _top_countries(c_pairs, b, meta, exclude_self=True), cats)
+    names = b.groupby("iso3", sort=False)["country_ko"].first()
+    for k, rec in country.items():
+        rec["name"] = names.get(k)
+
+    if "ICT 유형" in cats:
+        codes, labels = cats.codes["ICT 유형"], cats.label_array("ICT 유형")
+        doc = np.flatnonzero(codes != cats.code_of("ICT 유형", UNCLASSIFIED)).astype(np.int64)
+        k_pairs = pd.DataFrame({"doc_id": doc, "key": labels[codes[doc]]})
+    else:
+        k_pairs = pd.DataFrame({"doc_id": np.zeros(0, dtype=np.int64), "key": np.zeros(0, dtype=object)})
+    klass = _summary_records(k_pairs, meta, ybr, _top_countries(k_pairs, b, meta, exclude_self=False), cats)
+    return {"country": country, "class": klass}
+
+
+# --------------------- 해시태그 파서 ---------------------
+SYN = {"sme":"SME","pki":"PKI","ai":"AI","ict":"ICT","bigdata":"빅데이터","big data":"빅데이터",
+       "e-gp":"전자조달","egp":"전자조달","e-procurement":"전자조달","data center":"데이터센터","cloud":"클라우드",
+       "platform":"플랫폼","platfrom":"플랫폼","플렛폼":"플랫폼", "ifmis":"IFMIS", "bim":"BIM"}
+
+def norm_token(x: str) -> str:
+    x = re.sub(r"[\"'’“”()\[\]{}<>]", "", x.strip()); xl = x.lower()
+    return SYN.get(xl, x)
+
+def _clean_token(x: str) -> str:
+    # 따옴표/대괄호/괄호류 제거 + 공백 정리 + 동의어 매핑
+    x = re.sub(r"[\"'’“”()\[\]{}<>]", "", str(x).strip())
+    x = re.sub(r"\s{2,}", " ", x)
+    xl = x.lower()
+    return SYN.get(xl, x)
+
+def split_hashtags(s, stopset):
+    """
+    해시태그 셀 하나를 -> 토큰 리스트로.
+    - "['조달','전자조달']" 같은 리스트 문자열은 literal_eval로 파싱
+    - 실패하면 일반 구분기호(,;/ 공백2+)로 분할
+    - 국가/숫자/불용어/잡문자 제거
+    """
+    if not isinstance(s, str) or not s.strip():
+        return []
+
+    items = []
+    txt = s.strip()
+
+    # 1) 리스트 문자열이면 안전 파싱
+    if txt.startswith("[") and txt.endswith("]"):
+        try:
+            arr = ast.literal_eval(txt)
+            if isinstance(arr, (list, tuple)):
+                items = [str(z) for z in arr]
+        except Exception:
+            items = []  # 파싱 실패하면 아래 fallback로 이어감
+
+    # 2) fallback: 일반 분할
+    if not items:
+        items = re.split(r"[,\;/]| {2,}", txt)
+
+    out = []
+    for t in items:
+        t = _clean_token(t)
+        core = re.sub(r"\s+", "", t.lower())
+        if not core or len(core) < 2:
+            continue
+        if re.fullmatch(r"[\W_]+", core) or re.fullmatch(r"\d+(\.\d+)?", core):
+            continue
+        if core in stopset:
+            continue
+        out.append(t)
+
+    # 중복 제거(대소문자 무시)
+    seen = set()
+    dedup = []
+    for w in out:
+        k = w.lower()
+        if k not in seen:
+            seen.add(k)
+            dedup.append(w)
+    return dedup
+
+def norm_tag_upper(x: str) -> str:
+    """트렌드 후보용 해시태그 정규화(따옴표/괄호류 제거 + 대문자)"""
+    x = re.sub(r"[\"\'’“”()\[\]{}<>]", "", str(x).strip())
+    return x.upper()
+
+def hashtag_pieces(s) -> tuple:
+    """해시태그 셀 → 트렌드 후보 조각(,;/ 또는 공백 2개 이상으로 분할, norm_tag_upper, 빈 조각 제외)"""
+    if not isinstance(s, str):
+        return ()
+    return tuple(t for t in (norm_tag_upper(x) for x in re.split(r"[,\;/]| {2,}", s)) if t)
+
+CLOUD_TEXT_COLS = ["요약", "주요 내용"]   # 워드클라우드 낱말 원천(해시태그 조각과 함께)
+
+def cloud_tokens(tag_cell, text: str) -> tuple[tuple, tuple]:
+    """워드클라우드 토큰: (해시태그 조각(;, 분할), 본문 낱말(영숫자/한글 2자 이상)). 불용어는 읽을 때 적용"""
+    tags = tuple(z.strip() for z in re.split(r"[;,]", tag_cell) if z.strip()) if isinstance(tag_cell, str) else ()
+    words = tuple(w for w in (x.strip() for x in re.split(r"[^0-9A-Za-z가-힣]+", text)) if len(w) >= 2)
+    return tags, words
+
+# --------------------- 증분 코퍼스 인덱스 ---------------------
+# 행 내용 해시 → 행 단위 파생값(대상국 매핑, 연도, 해시태그, 대비용 어휘·워드클라우드·트렌드 토큰)을 기억해 두고,
+# 새 export가 들어오면 추가/변경/삭제된 행만 파싱해서 집계(연도별 문서수·키워드수, 클래스별 용어수)를
+# ±로 갱신한다. 월간 갱신 비용이 전체 아카이브가 아니라 변경분에 비례.
+
+TERM_TEXT_COLS = ["full_text", "주요 내용", "요약"]   # ICT 상세 '대표 키워드'와 같은 텍스트 소스
+
+class RowDerived(NamedTuple):
+    countries: tuple      # ((iso3, en, ko), ...)
+    years: tuple          # (2014, 2015, ...)
+    tags: tuple           # split_hashtags(…, 불용어 없음) — 불용어는 읽을 때 적용
+    cls: str              # ICT 유형(strip, 결측은 "nan")
+    has_text: bool        # 대비 키워드 문서 집합에 들어가는지(원문이 비어있지 않음)
+    terms: tuple          # 명사 필터 + _vocab_tokens
+    term_breaks: tuple    # terms 안 문장부호/컬럼 경계 위치(term_tokens) — 구 후보가 넘지 않음
+    hashtags: tuple       # hashtag_pieces(트렌드 후보, 대문자)
+    cloud_tags: tuple     # cloud_tokens — 워드클라우드 해시태그 조각
+    cloud_words: tuple    # cloud_tokens — 워드클라우드 본문 낱말
+
+# 토큰 보기 → 어휘 이름(워드클라우드 두 보기는 한 어휘를 공유해 함께 센다)
+TOKEN_VOCAB = {"terms": "terms", "tags": "tags", "hashtags": "hashtags",
+               "cloud_tags": "cloud", "cloud_words": "cloud"}
+
+class TokenStore:
+    """
+    문서별 토큰 id 배열(보기별 CSR: ptr[kind], ids[kind] → vocab[TOKEN_VOCAB[kind]]). 데이터 버전당 한 번 만들고,
+    패널은 문서 id로 잘라 bincount로 센다(리런마다 본문을 다시 토큰화하지 않음).
+      terms = 명사 필터 어휘(대비 키워드) · tags = split_hashtags(연도별 해시태그)
+      hashtags = 트렌드 후보 조각 · cloud_tags / cloud_words = 워드클라우드
+      term_breaks = terms 안 경계 위치(어휘 없음 — ids가 곧 문서 내 위치)
+    """
+
+    def __init__(self, vocab: dict, ptr: dict, ids: dict):
+        self.vocab, self.ptr, self.ids = vocab, ptr, ids
+        self.n_docs = len(ptr["terms"]) - 1 if "terms" in ptr else 0
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "TokenStore":
+        index = {v: {} for v in set(TOKEN_VOCAB.values())}
+        ptr, ids = {}, {}
+        for kind, v in TOKEN_VOCAB.items():
+            seqs = [getattr(r, kind) for r in rows]
+            ix = index[v]
+            for seq in seqs:
+                for t in seq:
+                    if t not in ix:
+                        ix[t] = len(ix)
+            ptr[kind], ids[kind] = _ragged(seqs, ix, np.int32)
+        ptr["term_breaks"], ids["term_breaks"] = _ragged([r.term_breaks for r in rows], None, np.int32)
+        return cls({v: list(ix) for v, ix in index.items()}, ptr, ids)
+
+    def size(self, kind: str) -> int:
+        return len(self.vocab[TOKEN_VOCAB[kind]])
+
+    def take(self, kind: str, docs=None) -> np.ndarray:
+        """docs(문서 id, 중복 허용 · None = 전체)의 토큰 id를 문서 순서대로 평탄화"""
+        if docs is None:
+            return np.asarray(self.ids[kind])
+        return _ragged_take(self.ptr[kind], self.ids[kind], np.asarray(docs, dtype=np.int64))[1]
+
+    def keep(self, kind: str, pred) -> np.ndarray:
+        """어휘 bool 마스크(pred(토큰) 참인 것) — 불용어/숫자 필터를 어휘 크기만큼만 평가"""
+        voc = self.vocab[TOKEN_VOCAB[kind]]
+        return np.fromiter((bool(pred(t)) for t in voc), dtype=bool, count=len(voc))
+
+    def counter(self, kinds, docs=None, keep: Optional[np.ndarray] = None) -> Counter:
+        """
+        토큰 빈도 Counter. kinds = 보기 하나 또는 같은 어휘의 보기 튜플(앞 보기 전체 → 다음 보기 순으로 이어 셈).
+        항목 순서 = 첫 등장 순서 → most_common 동률 순서가 토큰 리스트를 직접 센 것과 같다.
+        """
+        kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds)
+        flat = np.concatenate([self.take(k, docs) for k in kinds]) if kinds else np.zeros(0, dtype=np.int32)
+        if keep is not None:
+            flat = flat[keep[flat]]
+        if not len(flat):
+            return Counter()
+        voc = self.vocab[TOKEN_VOCAB[kinds[0]]]
+        n = np.bincount(flat, minlength=len(voc))
+        return Counter({voc[i]: int(n[i]) for i in pd.unique(flat).tolist()})
+
+    def doc_pairs(self, kind: str, keep: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """(문서 id, 토큰 id) 고유 쌍 — 문서 단위 등장(문서빈도) 집계용"""
+        ptr, flat = self.ptr[kind], np.asarray(self.ids[kind], dtype=np.int64)
+        doc = np.repeat(np.arange(len(ptr) - 1, dtype=np.int64), np.diff(ptr))
+        if keep is not None:
+            m = keep[flat]
+            doc, flat = doc[m], flat[m]
+        v = max(self.size(kind), 1)
+        key = np.unique(doc * v + flat)
+        return key // v, key % v
+
+# --------------------- 대비 키워드(문서×용어 희소 행렬) ---------------------
+class ContainmentFilter:
+    """
+    채택한 용어 집합과 포함 관계(부분 문자열이거나 포함하거나)인지 판정 — 후보 목록 중복 제거용.
+    any(x in s or s in x for s in 채택) 와 같은 답을 채택 수와 무관한 시간에:
+      x ⊂ 채택어: 채택어 전체의 일반화 접미사 오토마톤을 x로 따라간다(O(|x|))
+      채택어 ⊂ x: 채택어 트라이를 x의 각 시작 위치에서 따라간다(O(|x| · 최장 채택어))
+    """
+
+    def __init__(self):
+        self.terms: list = []
+        self._next, self._link, self._len = [{}], [-1], [0]   # 접미사 오토마톤(상태 0 = 루트)
+        self._trie, self._end = [{}], [False]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _state(self, length: int, nxt: dict, link: int) -> int:
+        self._next.append(nxt); self._link.append(link); self._len.append(length)
+        return len(self._len) - 1
+
+    def _clone(self, p: int, q: int, c: str) -> int:
+        nxt, link = self._next, self._link
+        clone = self._state(self._len[p] + 1, dict(nxt[q]), link[q])
+        while p != -1 and nxt[p].get(c) == q:
+            nxt[p][c] = clone
+            p = link[p]
+        link[q] = clone
+        return clone
+
+    def _extend(self, last: int, c: str) -> int:
+        nxt, link, length = self._next, self._link, self._len
+        q = nxt[last].get(c)
+        if q is not None:                                  # 다른 채택어로 이미 있는 전이(일반화 SAM)
+            return q if length[q] == length[last] + 1 else self._clone(last, q, c)
+        cur = self._state(length[last] + 1, {}, 0)
+        p = last
+        while p != -1 and c not in nxt[p]:
+            nxt[p][c] = cur
+            p = link[p]
+        if p != -1:
+            q = nxt[p][c]
+            link[cur] = q if length[p] + 1 == length[q] else self._clone(p, q, c)
+        return cur
+
+    def add(self, term: str):
+        self.terms.append(term)
+        last = 0
+        for c in term:
+            last = self._extend(last, c)
+        node = 0
+        for c in term:
+            node = self._trie[node].setdefault(c, len(self._trie))
+            if node == len(self._trie):
+                self._trie.append({}); self._end.append(False)
+        self._end[node] = True
+
+    def within(self, term: str) -> bool:
+        """term이 어떤 채택어의 부분 문자열인가"""
+        if not self.terms:
+            return False
+        st, nxt = 0, self._next
+        for c in term:
+            st = nxt[st].get(c)
+            if st is None:
+                return False
+        return True
+
+    def covers(self, term: str) -> bool:
+        """어떤 채택어가 term의 부분 문자열인가"""
+        trie, end = self._trie, self._end
+        if end[0]:
+            return True
+        for i in range(len(term)):
+            node = 0
+            for c in term[i:]:
+                node = trie[node].get(c)
+                if node is None:
+                    break
+                if end[node]:
+                    return True
+        return False
+
+    def offer(self, term: str) -> bool:
+        """포함 관계인 채택어가 없으면 채택(True), 있으면 버림(False)"""
+        if self.within(term) or self.covers(term):
+            return False
+        self.add(term)
+        return True
+
+_ENGLISH_TERM = re.compile(r"[a-zA-Z0-9\-\_]+(?: [a-zA-Z0-9\-\_]+)*")   # 영문 구도 대문자
+
+def contrastive_rank(vocab: list, cnt_c: np.ndarray, cnt_n: np.ndarray, len_c: int, len_n: int,
+                     df_term: np.ndarray, n_docs: int, top_n: int = 60, ngram_bonus=(0.10, 0.20),
+                     eps: float = 1e-6, skip: Optional[np.ndarray] = None,
+                     grams: Optional[np.ndarray] = None) -> list[tuple[str, float]]:
+    """
+    score = log((tf_c/len_c + eps) / (tf_n/len_n + eps)) * log(1 + N / df) + n-그램 보너스 — 어휘 벡터로 한 번에 계산.
+    후보 = 어느 쪽이든 빈도 > 0인 용어(skip = STOP_ALL 마스크 제외). 정렬 (-점수, 용어) 뒤 부분 문자열 중복은
+    앞선 용어만 남기고(ContainmentFilter), 영문/숫자 용어는 대문자로 출력. skip/grams를 안 주면 vocab에서 계산.
+    """
+    cnt_c = np.asarray(cnt_c, dtype=np.float64)
+    cnt_n = np.asarray(cnt_n, dtype=np.float64)
+    if skip is None:
+        skip = np.fromiter((t in STOP_ALL for t in vocab), dtype=bool, count=len(vocab))
+    if grams is None:
+        grams = np.fromiter((len(t.split()) for t in vocab), dtype=np.int32, count=len(vocab))
+    cand = np.flatnonzero(((cnt_c > 0) | (cnt_n > 0)) & ~skip)
+    if not len(cand):
+        return []
+    len_c, len_n = max(len_c, 1), max(len_n, 1)
+    lift = np.log((cnt_c[cand] / len_c + eps) / (cnt_n[cand] / len_n + eps))
+    idf = np.log(1.0 + n_docs / np.maximum(np.asarray(df_term)[cand], 1))
+    score = lift * idf
+    g = grams[cand]
+    score[g == 2] += ngram_bonus[0]
+    score[g >= 3] += ngram_bonus[1]
+
+    terms = np.array([vocab[i] for i in cand.tolist()], dtype=object)
+    order = np.lexsort((terms, -score))          # 동점은 용어순(집계 순서와 무관하게 결정적)
+    uniq, seen = [], ContainmentFilter()
+    for i in order.tolist():
+        term = terms[i]
+        if not seen.offer(term):
+            continue
+        uniq.append((term.upper() if _ENGLISH_TERM.fullmatch(term) else term, float(score[i])))
+        if len(uniq) >= top_n:
+            break
+    return uniq
+
+# 구(phrase) 후보 = 명사 필터 토큰열에서 이웃한 2~3개 용어(문장부호/컬럼 경계 term_breaks는 넘지 않음).
+# 고정 크기 해시 표로 먼저 센 뒤(버킷 합이 최소 빈도에 못 미치면 그 버킷의 n-그램은 모두 탈락 — 거짓 음성 없음)
+# 살아남은 것만 정확히 센다. 3-그램은 앞/뒤 2-그램이 모두 살아남은 위치에서만 만든다(빈도 ≤ 2-그램 빈도).
+PHRASE_MIN_COUNT = 3          # 코퍼스 전체 등장 횟수
+PHRASE_MIN_DOCS = 3           # 등장 문서 수(한두 문서의 상투 문구 제외)
+PHRASE_MIN_NPMI = 0.3         # 정규화 PMI(구성 용어가 우연히 이웃한 경우 제외)
+# 구에 넣지 않는 서술어/어미 토큰(명사 필터가 남긴 '모색한다', '포함되어', '있게', '하였습니다', '복잡한' 등)
+_PREDICATE_RE = re.compile(r"(?:니다|니까|[한된했됐었였있없이진킨]다|[하되해돼](?:여|어|야|고|며|면|서|기|게|지|였|었)"
+                           r"|[있없](?:어|게|고|이|으며|으나|음)|는)$|^[가-힣]{2,}[하되한된할될]$")
+PHRASE_BUCKETS = 1 << 20      # 해시 표 칸 수(int64 → 8MB, 어휘/코퍼스 크기와 무관)
+
+def _pruned_count(keys: np.ndarray, min_count: int, buckets: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(고유 key 빈도, 첫 위치, 위치 → 고유 인덱스(-1 = 탈락)). 해시 표 1차 거름 → 생존 key만 np.unique"""
+    bits = max(int(buckets).bit_length() - 1, 1)
+    with np.errstate(over="ignore"):
+        b = ((keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(64 - bits)).astype(np.int64)
+    alive = np.flatnonzero(np.bincount(b, minlength=1 << bits)[b] >= min_count)
+    _, first, inv, cnt = np.unique(keys[alive], return_index=True, return_inverse=True, return_counts=True)
+    ok = cnt >= min_count
+    pos = np.full(len(keys), -1, dtype=np.int64)
+    pos[alive] = np.where(ok, np.cumsum(ok) - 1, -1)[inv]
+    return cnt[ok], alive[first[ok]], pos
+
+def _npmi(c_xy: np.ndarray, c_x: np.ndarray, c_y: np.ndarray, total: int) -> np.ndarray:
+    p_xy = c_xy / total
+    return np.log(p_xy / ((c_x / total) * (c_y / total))) / -np.log(p_xy)
+
+def phrase_candidates(ptr: np.ndarray, ids: np.ndarray, vocab: list, min_count: int = PHRASE_MIN_COUNT,
+                      min_docs: int = PHRASE_MIN_DOCS, min_npmi: float = PHRASE_MIN_NPMI,
+                      buckets: int = PHRASE_BUCKETS, breaks: Optional[tuple] = None) -> tuple[list, np.ndarray, np.ndarray]:
+    """
+    문서별 용어 id CSR → (구 목록 "용어 용어[ 용어]", 등장 문서 id, 구 id). 등장은 위치마다 한 번(문서×구 빈도용).
+    breaks = (ptr, 문서 내 위치) CSR(TokenStore 'term_breaks') — 그 위치 앞에서 구가 끊긴다.
+    서술어/어미 토큰(_PREDICATE_RE)이 낀 n-그램은 만들지 않는다.
+    3-그램 NPMI는 (앞 2-그램, 끝 용어) / (첫 용어, 뒤 2-그램) 두 분할 중 작은 값.
+    """
+    flat = np.asarray(ids, dtype=np.int64)
+    ptr = np.asarray(ptr, dtype=np.int64)
+    total, v = len(flat), max(len(vocab), 1)
+    if total < 2:
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    doc = np.repeat(np.arange(len(ptr) - 1, dtype=np.int64), np.diff(ptr))
+    uni = np.bincount(flat, minlength=v)
+
+    link = doc[:-1] == doc[1:]                              # 위치 i와 i+1이 이어지는가(문서/경계 안 넘음)
+    if breaks is not None:
+        bptr, bpos = np.asarray(breaks[0], dtype=np.int64), np.asarray(breaks[1], dtype=np.int64)
+        link[ptr[np.repeat(np.arange(len(bptr) - 1), np.diff(bptr))] + bpos - 1] = False
+    pred = np.fromiter((bool(_PREDICATE_RE.search(t)) for t in vocab), dtype=bool, count=len(vocab))
+    ok = ~pred[flat]
+    i2 = np.flatnonzero(link & ok[:-1] & ok[1:])           # 2-그램 시작 위치
+    c2, f2, p2 = _pruned_count(flat[i2] * v + flat[i2 + 1], min_count, buckets)
+    at2 = np.full(total, -1, dtype=np.int64)
+    at2[i2] = p2
+    i3 = np.flatnonzero((at2[:-2] >= 0) & (at2[1:-1] >= 0) & (doc[:-2] == doc[2:]))
+    c3, f3, p3 = _pruned_count(at2[i3] * v + flat[i3 + 2], min_count, buckets)
+
+    s2, s3 = i2[f2], i3[f3]                                 # 각 구의 첫 등장 위치 → 구성 용어
+    score = np.concatenate([
+        _npmi(c2, uni[flat[s2]], uni[flat[s2 + 1]], total),
+        np.minimum(_npmi(c3, c2[at2[s3]], uni[flat[s3 + 2]], total),
+                   _npmi(c3, uni[flat[s3]], c2[at2[s3 + 1]], total))])
+    first = np.concatenate([s2, s3])
+    width = np.r_[np.full(len(c2), 2), np.full(len(c3), 3)]
+    pos = np.concatenate([i2[p2 >= 0], i3[p3 >= 0]])
+    pid = np.concatenate([p2[p2 >= 0], p3[p3 >= 0] + len(c2)])
+    keep = score >= min_npmi
+    m = keep[pid]
+    pos, pid = pos[m], pid[m]
+    # 등장 문서 수 = 고유 (구, 문서) 쌍 — 정렬 후 경계만 센다
+    key = np.sort(pid * (len(ptr) - 1) + doc[pos])
+    head = key[np.r_[True, key[1:] != key[:-1]]] if len(key) else key
+    keep &= np.bincount(head // max(len(ptr) - 1, 1), minlength=len(keep)) >= min_docs
+
+    new_id = np.where(keep, np.cumsum(keep) - 1, -1)
+    phrases = [" ".join(vocab[t] for t in flat[a:a + n].tolist())
+               for a, n in zip(first[keep].tolist(), width[keep].tolist())]
+    m = keep[pid]
+    return phrases, doc[pos[m]], new_id[pid[m]]
+
+class TermMatrix:
+    """
+    문서×용어 빈도 CSR(TokenStore 'terms' 보기, 데이터 버전당 1회). 문서 마스크(ICT 유형/국가/연도/주제)의
+    대비 키워드 = 마스크 열합 vs (전체 − 마스크) 열합을 희소 행렬-벡터 곱 + 어휘 벡터 연산으로(용어 루프 없음).
+    키워드 포함 문서도 용어 역색인으로 키워드당 한 번만 구해 두고, 나머지 쪽은 전체 − 마스크로 센다.
+    phrases=True면 phrase_candidates의 2~3-그램을 열로 덧붙인다(열 [0, n_terms) = 용어, 그 뒤 = 구).
+    빈도 분모(len)는 용어 열만 — 구를 켜도 용어 점수는 그대로.
+    """
+
+    def __init__(self, vocab: list, ptr: np.ndarray, ids: np.ndarray, has_text: Optional[np.ndarray] = None,
+                 phrases: bool = False, breaks: Optional[tuple] = None):
+        from scipy import sparse
+        self._seq = (ptr, ids)                       # 문서별 용어 순서(행렬 행은 열 순 정렬·중복 합산)
+        ptr = np.asarray(ptr, dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        self.vocab = list(vocab)
+        self.n_terms = len(self.vocab)
+        m = sparse.csr_matrix((np.ones(len(ids), dtype=np.int64), ids, ptr),
+                              shape=(len(ptr) - 1, len(self.vocab)))
+        if phrases:
+            plist, rows, cols = phrase_candidates(ptr, ids, self.vocab, breaks=breaks)
+            if plist:
+                pm = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)),
+                                       shape=(m.shape[0], len(plist)))
+                m = sparse.hstack([m, pm], format="csr")
+                self.vocab += plist
+        m.sum_duplicates()
+        self.matrix = m
+        self._t = m.T.tocsr()                        # 용어×문서(mat-vec용)
+        self.total = np.asarray(m.sum(axis=0)).ravel()
+        self.df = np.diff(self._t.indptr)            # 용어별 등장 문서 수
+        self.skip = np.fromiter((t in STOP_ALL for t in self.vocab), dtype=bool, count=len(self.vocab))
+        self.grams = np.fromiter((len(t.split()) for t in self.vocab), dtype=np.int32, count=len(self.vocab))
+        # 문서 집합(분모) — 원문이 있는 문서. 용어가 하나도 안 남은 문서도 포함
+        self.has_text = (np.ones(m.shape[0], dtype=bool) if has_text is None
+                         else np.asarray(has_text, dtype=bool))
+        self._blob = None                            # ("\n".join(vocab), 용어 시작 위치) — 키워드 → 포함 용어 검색용
+        self._hits: dict = {}                        # 키워드 → 포함 문서 id(정렬)
+
+    @classmethod
+    def from_tokens(cls, tokens: TokenStore, kind: str = "terms", has_text: Optional[np.ndarray] = None,
+                    phrases: bool = False) -> "TermMatrix":
+        breaks = (tokens.ptr["term_breaks"], tokens.ids["term_breaks"]) if kind == "terms" else None
+        return cls(tokens.vocab[TOKEN_VOCAB[kind]], tokens.ptr[kind], tokens.ids[kind], has_text, phrases, breaks)
+
+    def counts(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """용어별 빈도(mask = 문서 bool 배열, None이면 전체)"""
+        if mask is None:
+            return self.total
+        return self._t @ np.asarray(mask, dtype=np.int64)
+
+    def contrastive(self, mask: np.ndarray, n_docs: int, top_n: int = 60, ngram_bonus=(0.10, 0.20),
+                    eps: float = 1e-6) -> list[tuple[str, float]]:
+        """mask 문서 vs 나머지 문서 대비 키워드(n_docs = IDF 문서 수)"""
+        c = self.counts(mask)
+        n = self.total - c
+        len_c = int(c[:self.n_terms].sum())
+        len_all = int(self.total[:self.n_terms].sum())
+        return contrastive_rank(self.vocab, c, n, len_c, len_all - len_c, self.df, n_docs,
+                                top_n=top_n, ngram_bonus=ngram_bonus, eps=eps, skip=self.skip, grams=self.grams)
+
+    def _doc_text(self, i: int) -> str:
+        ptr, ids = self._seq
+        return " ".join(self.vocab[j] for j in np.asarray(ids[ptr[i]:ptr[i + 1]]).tolist())
+
+    def hit_docs(self, kw: str) -> np.ndarray:
+        """
+        kw를 (대소문자 무시) 부분 문자열로 포함하는 문서 id. 문서 텍스트 = 명사 필터 토큰을 공백으로 이은 것이므로
+        공백 없는 kw는 '그 kw를 포함하는 용어가 하나라도 있는 문서'와 같다 → 어휘 한 번 검색 + 역색인 합집합.
+        """
+        hit = self._hits.get(kw)
+        if hit is not None:
+            return hit
+        if not kw:
+            hit = np.flatnonzero(self.has_text)
+        elif re.search(r"\s", kw):
+            # 여러 낱말 kw는 토큰 경계를 넘을 수 있음 → 해당 낱말이 모두 있는 문서만 텍스트로 확인
+            pat = re.compile(re.escape(kw), re.I)
+            cand = None
+            for w in kw.split():
+                d = self.hit_docs(w)
+                cand = d if cand is None else np.intersect1d(cand, d, assume_unique=True)
+            hit = np.array([i for i in cand.tolist() if pat.search(self._doc_text(i))], dtype=np.int64)
+        else:
+            if self._blob is None:
+                terms = self.vocab[:self.n_terms]
+                self._blob = ("\n".join(terms), np.cumsum([0] + [len(t) + 1 for t in terms[:-1]]))
+            blob, starts = self._blob
+            pos = [m.start() for m in re.finditer(re.escape(kw), blob, re.I)]
+            cols = np.unique(np.searchsorted(starts, pos, side="right") - 1)
+            t = self._t
+            hit = np.unique(np.concatenate([t.indices[t.indptr[j]:t.indptr[j + 1]] for j in cols.tolist()]
+                                           or [np.zeros(0, dtype=np.int64)])).astype(np.int64)
+        self._hits[kw] = hit
+        return hit
+
+    def doc_share(self, kw: str, mask: np.ndarray) -> tuple[tuple[int, int, float], tuple[int, int, float]]:
+        """
+        ((포함 문서, 문서 수, 비율) mask 쪽, (…) 나머지 쪽). 나머지 = 전체 − mask(텍스트 재처리 없음).
+        문서 수가 0이면 1로 둔다.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        hit = self.hit_docs(kw)
+        hit_c = int(np.count_nonzero(mask[hit]))
+        hit_n = len(hit) - hit_c
+        n_all = int(np.count_nonzero(self.has_text))
+        n_c = int(np.count_nonzero(self.has_text & mask))
+        n_c, n_n = n_c or 1, (n_all - n_c) or 1
+        return (hit_c, n_c, hit_c / n_c), (hit_n, n_n, hit_n / n_n)
+
+class CorpusView(NamedTuple):
+    version: str
+    countries: list       # 행 순서(df와 동일)
+    years: list
+    docs_per_year: Counter
+    kw_doc: dict          # {연도: Counter(해시태그 → 문서수)}
+    class_docs: Counter   # ICT 유형 → 본문 있는 문서 수(용어 빈도는 TermMatrix가 토큰에서 직접)
+    n_text_docs: int
+    year_ptr: np.ndarray  # 문서 → 연도 CSR(years와 같은 내용, 벡터 연산용)
+    year_vals: np.ndarray
+    tokens: TokenStore    # 문서별 토큰 id(보기별)
+    has_text: np.ndarray  # 문서 bool — 대비 키워드 문서 집합(RowDerived.has_text)
+
+    def years_of(self, ids) -> np.ndarray:
+        """문서 id들의 연도(문서 순서대로 평탄화, 문서 간 중복 포함)"""
+        return _ragged_take(self.year_ptr, self.year_vals, np.asarray(ids, dtype=np.int64))[1]
+
+def row_digests(df_in: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df_in, index=False).to_numpy()
+
+def _counter_add(c: Counter, items, k: int):
+    for t, v in items:
+        n = c[t] + v * k
+        if n: c[t] = n
+        else: del c[t]
+
+def derive_rows(df_in: pd.DataFrame) -> list[RowDerived]:
+    """df_in의 각 행을 파싱(증분 갱신 시에는 새로 들어온 행만 넘어온다)"""
+    n = len(df_in)
+    countries = countries_by_row(df_in["대상국"]) if "대상국" in df_in.columns else [()] * n
+    years = csr_rows(*year_spans(_year_text_series(df_in)))
+    hcol = "Hashtag" if "Hashtag" in df_in.columns else ("Hashtag_str" if "Hashtag_str" in df_in.columns else None)
+    tags = ([tuple(split_hashtags(s, set())) for s in df_in[hcol].fillna("").astype(str)]
+            if hcol else [()] * n)
+    classes = df_in["ICT 유형"].astype(str).str.strip().tolist() if "ICT 유형" in df_in.columns else ["nan"] * n
+    pieces = [hashtag_pieces(s) for s in df_in[hcol].astype(object)] if hcol else [()] * n
+    # 워드클라우드: 해시태그는 Hashtag_str 우선(없거나 결측이면 Hashtag), 본문은 요약 + 주요 내용
+    ctag = pd.Series([None] * n, index=df_in.index, dtype=object)
+    for c in ("Hashtag", "Hashtag_str"):
+        if c in df_in.columns:
+            v = df_in[c].astype(object)
+            ctag = v.where(v.notna(), ctag)
+    pcols = [c for c in CLOUD_TEXT_COLS if c in df_in.columns]
+    pool = (df_in[pcols].astype(object).fillna("").astype(str).agg(" ".join, axis=1).tolist() if pcols else [""] * n)
+    tcols = [c for c in TERM_TEXT_COLS if c in df_in.columns]
+    out = []
+    for i, vals in enumerate(df_in[tcols].itertuples(index=False, name=None) if tcols else [()] * n):
+        t = " ".join(str(v or "") for v in vals).strip()     # 텍스트 컬럼을 공백으로 이어 붙임
+        terms, breaks = term_tokens(vals) if t else ((), ())
+        out.append(RowDerived(countries[i], years[i], tags[i], classes[i], bool(t), terms, breaks, pieces[i],
+                              *cloud_tokens(ctag.iat[i], pool[i])))
+    return out
+
+def corpus_version(digests: np.ndarray) -> str:
+    return hashlib.sha1(digests.tobytes()).hexdigest()[:16]
+
+class CorpusIndex:
+    """스키마(컬럼 구성)별 1개. 여러 세션이 공유하므로 sync는 lock 안에서만 상태를 바꾼다."""
+
+    def __init__(self, bundle_root: Optional[Path] = None):
+        self._lock = threading.Lock()
+        self._records: dict = {}          # digest → RowDerived (현재/과거 버전 행)
+        self._counts: Counter = Counter() # 현재 반영된 digest 멀티셋
+        self.docs_per_year = Counter()
+        self.kw_doc = defaultdict(Counter)
+        self.class_docs = Counter()
+        self._views = OrderedDict()       # version → CorpusView (최근 몇 개만)
+        self._bundle_root = bundle_root   # 지정하면 첫 sync 때 오프라인 번들에서 시작
+        self._base = None                 # 채택한 CorpusBundle(행 파생값은 필요할 때만 꺼냄)
+        self._base_pos: dict = {}
+
+    def _record(self, d) -> RowDerived:
+        r = self._records.get(d)
+        if r is None:
+            r = self._records[d] = self._base.record(self._base_pos[d])
+        return r
+
+    def _apply(self, r: RowDerived, k: int):
+        for y in r.years:
+            _counter_add(self.docs_per_year, [(y, 1)], k)
+            if r.tags:
+                _counter_add(self.kw_doc[y], ((t, 1) for t in set(r.tags)), k)
+            if y not in self.docs_per_year:
+                self.kw_doc.pop(y, None)
+        if r.has_text:
+            _counter_add(self.class_docs, [(r.cls, 1)], k)
+
+    def _adopt(self, bundle: "CorpusBundle"):
+        """빈 인덱스를 번들 상태(digest 멀티셋 + 집계)로 채운다. 행별 파생값은 지연 로드."""
+        keys = bundle.digests.tolist()
+        agg = bundle.aggregates()
+        self._base = bundle
+        self._base_pos = {d: i for i, d in enumerate(keys)}
+        self._counts = Counter(keys)
+        self.docs_per_year = agg["docs_per_year"]
+        self.kw_doc = defaultdict(Counter, agg["kw_doc"])
+        self.class_docs = agg["class_docs"]
+
+    def _make_view(self, version: str, countries: list, years: list, tokens: TokenStore,
+                   has_text: np.ndarray) -> CorpusView:
+        view = CorpusView(
+            version=version,
+            countries=countries,
+            years=years,
+            docs_per_year=Counter(self.docs_per_year),
+            kw_doc={y: Counter(c) for y, c in self.kw_doc.items()},
+            class_docs=Counter(self.class_docs),
+            n_text_docs=sum(self.class_docs.values()),
+            **dict(zip(("year_ptr", "year_vals"), years_csr(years))),
+            tokens=tokens,
+            has_text=np.asarray(has_text, dtype=bool),
+        )
+        self._views[version] = view
+        while len(self._views) > 4:
+            self._views.popitem(last=False)
+        return view
+
+    def sync(self, df_in: pd.DataFrame, derive=derive_rows, digests: Optional[np.ndarray] = None) -> CorpusView:
+        if digests is None:
+            digests = row_digests(df_in)
+        version = corpus_version(digests)
+        with self._lock:
+            if version in self._views:
+                self._views.move_to_end(version)
+                return self._views[version]
+
+            # ⓪ 프로세스 첫 sync: 같은 스키마의 빌드 번들이 있으면 그 상태에서 출발(버전이 같으면 파싱 0)
+            if self._bundle_root is not None and not self._counts:
+                bundle = find_bundle(tuple(map(str, df_in.columns)), version, self._bundle_root)
+                self._bundle_root = None
+                if bundle is not None:
+                    self._adopt(bundle)
+                    if bundle.version == version:
+                        return self._make_view(version, bundle.countries(), bundle.years(), bundle.tokens(),
+                                               bundle.array("has_text"))
+
+            # ① 처음 보는 행만 파싱
+            keys = digests.tolist()
+            new_pos, seen = [], set()
+            for i, d in enumerate(keys):
+                if d not in self._records and d not in self._base_pos and d not in seen:
+                    new_pos.append(i); seen.add(d)
+            if new_pos:
+                for i, r in zip(new_pos, derive(df_in.iloc[new_pos])):
+                    self._records[keys[i]] = r
+
+            # ② 집계는 추가/삭제분만 ±
+            target = Counter(keys)
+            for d, k in (self._counts - target).items():
+                self._apply(self._record(d), -k)
+            for d, k in (target - self._counts).items():
+                self._apply(self._record(d), +k)
+            self._counts = target
+
+            # ③ 기록이 현재 버전의 2배를 넘으면 지금 안 쓰는 행은 정리(번들 행은 다시 꺼낼 수 있음)
+            if len(self._records) > 2 * max(len(target), 1):
+                self._records = {d: self._records[d] for d in target if d in self._records}
+
+            rows = [self._record(d) for d in keys]
+            return self._make_view(version, [r.countries for r in rows], [r.years for r in rows],
+                                   TokenStore.from_rows(rows), [r.has_text for r in rows])
+
+
+# --------------------- 코퍼스 번들(오프라인 빌드 산출물) ---------------------
+# ksp_build.py가 전체 파이프라인을 한 번 돌려 행별 파생값(토큰 id, 문서→국가/연도)과
+# 연도×해시태그 집계 행렬을 .npy로 남긴다. 앱은 np.load(mmap_mode="r")로 열어
+# 텍스트 처리 없이 CorpusIndex를 채운다. 가변 길이 값은 CSR(ptr + flat) 배열.
+BUNDLE_DIR = CACHE_DIR / "bundles"
+BUNDLE_FORMAT = 4   # 파일 구성이 바뀌면 올릴 것
+
+def pipeline_fingerprint() -> str:
+    """파생 규칙(불용어/국가표/토크나이저/텍스트 컬럼)이 바뀌면 달라지는 키 → 낡은 번들 무시"""
+    h = hashlib.sha1()
+    for part in (BUNDLE_FORMAT, USE_NOUN_FILTER, YEAR_SOURCE, TERM_TEXT_COLS, CLOUD_TEXT_COLS, sorted(STOP_ALL),
+                 _TOKEN_RE.pattern, _TERM_BREAK_RE.pattern, _KO_POSTFIX_DROP, sorted(_KO_SINGLE_PARTICLE), _EN_SHORT_MIN,
+                 sorted(COUNTRY_MAP.items()), sorted(REGION_RULES.items()), sorted(COUNTRY_ALIASES.items()),
+                 sorted(_KO_TAIL), sorted(SYN.items())):
+        h.update(repr(part).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _ragged(seqs: list, ids: Optional[dict], dtype) -> tuple[np.ndarray, np.ndarray]:
+    ptr = np.zeros(len(seqs) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(x) for x in seqs])
+    flat = np.fromiter((ids[v] if ids is not None else v for x in seqs for v in x),
+                       dtype=dtype, count=int(ptr[-1]))
+    return ptr, flat
+
+def write_bundle(index: CorpusIndex, df_in: pd.DataFrame, root: Path = BUNDLE_DIR, source: str = "",
+                 digests: Optional[np.ndarray] = None) -> Path:
+    """index.sync(df_in, digests=…) 직후 같은 digests로 호출. 임시 폴더에 모두 쓴 뒤 rename(읽는 쪽은 완성본만 본다)"""
+    if digests is None:
+        digests = row_digests(df_in)
+    version = corpus_version(digests)
+    rows = [index._record(d) for d in digests.tolist()]
+
+    country_tab = sorted({c for r in rows for c in r.countries})
+    tags = sorted({t for r in rows for t in r.tags})
+    terms = sorted({t for r in rows for t in r.terms})
+    pieces = sorted({t for r in rows for t in r.hashtags})
+    cloud = sorted({t for r in rows for t in r.cloud_tags} | {t for r in rows for t in r.cloud_words})
+    classes = sorted({r.cls for r in rows})
+    years = sorted({y for r in rows for y in r.years})
+    cid = {c: i for i, c in enumerate(country_tab)}
+    gid = {t: i for i, t in enumerate(tags)}
+    wid = {t: i for i, t in enumerate(terms)}
+    kid = {c: i for i, c in enumerate(classes)}
+    pid = {t: i for i, t in enumerate(pieces)}
+    lid = {t: i for i, t in enumerate(cloud)}
+
+    arrays = {"digests": digests.astype(np.uint64)}
+    for name, seqs, ids, dt in (("doc_country", [r.countries for r in rows], cid, np.int32),
+                                ("doc_year", [r.years for r in rows], None, np.int16),
+                                ("doc_tag", [r.tags for r in rows], gid, np.int32),
+                                ("doc_term", [r.terms for r in rows], wid, np.int32),
+                                ("doc_term_breaks", [r.term_breaks for r in rows], None, np.int32),
+                                ("doc_hashtags", [r.hashtags for r in rows], pid, np.int32),
+                                ("doc_cloud_tags", [r.cloud_tags for r in rows], lid, np.int32),
+                                ("doc_cloud_words", [r.cloud_words for r in rows], lid, np.int32)):
+        arrays[name + "_ptr"], arrays[name] = _ragged(seqs, ids, dt)
+    arrays["doc_class"] = np.array([kid[r.cls] for r in rows], dtype=np.int32)
+    arrays["has_text"] = np.array([r.has_text for r in rows], dtype=bool)
+
+    # 집계(문서수). 연도×해시태그 행렬 + 클래스별 본문 문서 수
+    arrays["years"] = np.array(years, dtype=np.int16)
+    arrays["year_docs"] = np.array([index.docs_per_year.get(y, 0) for y in years], dtype=np.int32)
+    year_tag = np.zeros((len(years), len(tags)), dtype=np.int32)
+    for yi, y in enumerate(years):
+        for t, v in index.kw_doc.get(y, {}).items():
+            year_tag[yi, gid[t]] = v
+    arrays["year_tag"] = year_tag
+    arrays["class_docs"] = np.array([index.class_docs.get(c, 0) for c in classes], dtype=np.int32)
+
+    fp = pipeline_fingerprint()
+    out = Path(root) / f"{version}-{fp}"
+    tmp = out.with_name(out.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, a in arrays.items():
+        np.save(tmp / f"{name}.npy", a)
+    vocab = {"countries": country_tab, "tags": tags, "terms": terms, "classes": classes,
+             "hashtags": pieces, "cloud": cloud}
+    (tmp / "vocab.json").write_text(json.dumps(vocab, ensure_ascii=False), encoding="utf-8")
+    manifest = {
+        "format": BUNDLE_FORMAT, "fingerprint": fp, "version": version,
+        "schema": list(map(str, df_in.columns)), "source": str(source), "created": time.time(),
+        "n_docs": len(rows), "n_terms": len(terms), "n_tags": len(tags), "n_classes": len(classes),
+        "years": [years[0], years[-1]] if years else [],
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+    return out
+
+class CorpusBundle:
+    """write_bundle 산출물(읽기 전용). 배열은 처음 접근할 때 mmap으로 연다."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / "manifest.json").read_text(encoding="utf-8"))
+        self.version = self.manifest["version"]
+        self._arrays: dict = {}
+        self._vocab = None
+
+    def array(self, name: str) -> np.ndarray:
+        a = self._arrays.get(name)
+        if a is None:
+            a = self._arrays[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+        return a
+
+    @property
+    def vocab(self) -> dict:
+        if self._vocab is None:
+            v = json.loads((self.path / "vocab.json").read_text(encoding="utf-8"))
+            v["countries"] = [tuple(c) for c in v["countries"]]
+            self._vocab = v
+        return self._vocab
+
+    @property
+    def digests(self) -> np.ndarray:
+        return self.array("digests")
+
+    def _segment(self, name: str, i: int) -> list:
+        ptr = self.array(name + "_ptr")
+        return self.array(name)[ptr[i]:ptr[i + 1]].tolist()
+
+    def _segments(self, name: str) -> list:
+        ptr, flat = self.array(name + "_ptr").tolist(), self.array(name).tolist()
+        return [flat[a:b] for a, b in zip(ptr[:-1], ptr[1:])]
+
+    def countries(self) -> list:
+        tab = self.vocab["countries"]
+        return [tuple(tab[j] for j in seg) for seg in self._segments("doc_country")]
+
+    def years(self) -> list:
+        return [tuple(seg) for seg in self._segments("doc_year")]
+
+    def record(self, i: int) -> RowDerived:
+        v = self.vocab
+        return RowDerived(
+            countries=tuple(v["countries"][j] for j in self._segment("doc_country", i)),
+            years=tuple(self._segment("doc_year", i)),
+            tags=tuple(v["tags"][j] for j in self._segment("doc_tag", i)),
+            cls=v["classes"][int(self.array("doc_class")[i])],
+            has_text=bool(self.array("has_text")[i]),
+            terms=tuple(v["terms"][j] for j in self._segment("doc_term", i)),
+            term_breaks=tuple(self._segment("doc_term_breaks", i)),
+            hashtags=tuple(v["hashtags"][j] for j in self._segment("doc_hashtags", i)),
+            cloud_tags=tuple(v["cloud"][j] for j in self._segment("doc_cloud_tags", i)),
+            cloud_words=tuple(v["cloud"][j] for j in self._segment("doc_cloud_words", i)),
+        )
+
+    def tokens(self) -> TokenStore:
+        """문서별 토큰 id를 그대로(mmap) TokenStore로 — 번들 버전과 같으면 토큰화 0"""
+        arr = {"terms": "doc_term", "tags": "doc_tag", "hashtags": "doc_hashtags",
+               "cloud_tags": "doc_cloud_tags", "cloud_words": "doc_cloud_words", "term_breaks": "doc_term_breaks"}
+        return TokenStore({v: self.vocab[v] for v in set(TOKEN_VOCAB.values())},
+                          {k: np.asarray(self.array(a + "_ptr")) for k, a in arr.items()},
+                          {k: self.array(a) for k, a in arr.items()})
+
+    def aggregates(self) -> dict:
+        """CorpusIndex 집계와 같은 모양의 Counter들(0인 항목 없음)"""
+        v = self.vocab
+        years, classes = self.array("years").tolist(), v["classes"]
+
+        def _nonzero(row, names) -> Counter:
+            row = np.asarray(row)
+            nz = np.flatnonzero(row)
+            return Counter(dict(zip([names[j] for j in nz], row[nz].tolist())))
+
+        kw_doc = {}
+        for yi, y in enumerate(years):
+            c = _nonzero(self.array("year_tag")[yi], v["tags"])
+            if c:
+                kw_doc[y] = c
+        return {
+            "docs_per_year": _nonzero(self.array("year_docs"), years),
+            "kw_doc": kw_doc,
+            "class_docs": _nonzero(self.array("class_docs"), classes),
+        }
+
+def list_bundles(root: Path = BUNDLE_DIR, schema: Optional[tuple] = None) -> list[CorpusBundle]:
+    """현재 파이프라인과 호환되는(포맷/지문/스키마 일치) 번들, 최신 순"""
+    root = Path(root)
+    if not root.exists():
+        return []
+    fp, out = pipeline_fingerprint(), []
+    for d in root.iterdir():
+        if d.name.endswith(".tmp") or not (d / "manifest.json").exists():
+            continue
+        try:
+            b = CorpusBundle(d)
+        except Exception:
+            continue   # 깨진 번들은 건너뜀
+        m = b.manifest
+        if m.get("format") != BUNDLE_FORMAT or m.get("fingerprint") != fp:
+            continue
+        if schema is not None and tuple(m.get("schema", ())) != tuple(schema):
+            continue
+        out.append(b)
+    out.sort(key=lambda b: b.manifest.get("created", 0), reverse=True)
+    return out
+
+def find_bundle(schema: tuple, version: Optional[str] = None, root: Path = BUNDLE_DIR) -> Optional[CorpusBundle]:
+    """같은 버전이 있으면 그것, 없으면 같은 스키마의 최신 번들(이후 변경분만 증분 반영)"""
+    cands = list_bundles(root, schema)
+    for b in cands:
+        if b.version == version:
+            return b
+    return cands[0] if cands else None
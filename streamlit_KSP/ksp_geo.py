@@ -0,0 +1,240 @@
+# ===============================================
+# 세계 경계 지오메트리 번들(오프라인 · 줌 단계별 LOD)
+#   python ksp_build.py --geo world-countries.json      # → assets/geo/world_lod.json
+# 원본 GeoJSON 경계를 TopoJSON처럼 '공유 arc'로 분해하고(이웃 국가가 같은 arc를 참조), 정수 격자로
+# 양자화한 뒤 arc마다 Douglas–Peucker를 줌 단계별로 미리 돌려 한 파일에 담는다. 접점(junction)은
+# 모든 단계에서 고정되므로 단순화해도 국경 사이에 틈/겹침이 생기지 않는다.
+# 앱은 네트워크 없이 이 파일을 읽고 지도 줌 범위에 맞는 단계를 골라 GeoJSON으로 복원한다.
+# ===============================================
+import os, json, math
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+GEO_ASSET = Path(__file__).resolve().parent / "assets" / "geo" / "world_lod.json"
+GEO_FORMAT = 1
+GEO_QUANT = 1 << 20          # 경도/위도 격자 칸 수(약 0.0003°) — 접점 판정이 정수 비교가 되도록
+# (이 단계를 쓰는 최대 줌, 허용 오차[도]). 오차 ≈ 그 줌에서 화면 1px(360° / 256px / 2^z)
+GEO_LOD = ((3, 0.18), (5, 0.045), (7, 0.011))
+
+def pick_lod(zoom: int) -> int:
+    """줌 → LOD 단계 인덱스(그 줌까지 1px 오차 이내인 가장 거친 단계)"""
+    for i, (max_zoom, _) in enumerate(GEO_LOD):
+        if zoom <= max_zoom:
+            return i
+    return len(GEO_LOD) - 1
+
+# --------------------- 인코딩(빌드 시 1회) ---------------------
+def _quantize_ring(ring) -> list:
+    """[[lon, lat], ...] → 닫힘점 제외 정수 좌표 리스트(연속 중복 제거)"""
+    out = []
+    for lon, lat in ((p[0], p[1]) for p in ring):
+        q = (int(round((min(max(lon, -180.0), 180.0) + 180.0) / 360.0 * (GEO_QUANT - 1))),
+             int(round((min(max(lat, -90.0), 90.0) + 90.0) / 180.0 * (GEO_QUANT - 1))))
+        if not out or out[-1] != q:
+            out.append(q)
+    if len(out) > 1 and out[0] == out[-1]:
+        out.pop()
+    return out
+
+def _polygons_of(geom: Optional[dict]) -> list:
+    """Polygon/MultiPolygon → [[ring, ...], ...] (양자화, 점 3개 미만 링 제외)"""
+    if not geom:
+        return []
+    t, coords = geom.get("type"), geom.get("coordinates") or []
+    polys = [coords] if t == "Polygon" else (coords if t == "MultiPolygon" else [])
+    out = []
+    for poly in polys:
+        rings = [r for r in (_quantize_ring(r) for r in poly) if len(r) >= 3]
+        if rings:
+            out.append(rings)
+    return out
+
+def _junctions(rings: list) -> set:
+    """이웃(앞/뒤 점) 조합이 두 가지 이상인 점 = 여러 경계가 갈라지는 접점"""
+    seen: dict = {}
+    junc = set()
+    for r in rings:
+        n = len(r)
+        for i, p in enumerate(r):
+            a, b = r[i - 1], r[(i + 1) % n]
+            nb = (a, b) if a <= b else (b, a)
+            prev = seen.setdefault(p, nb)
+            if prev != nb:
+                junc.add(p)
+    return junc
+
+def _cut_ring(ring: list, junc: set) -> list:
+    """링 → arc 점열 리스트(각 arc는 접점에서 시작/끝, 접점 없으면 닫힌 arc 1개)"""
+    idx = [i for i, p in enumerate(ring) if p in junc]
+    if not idx:
+        return [None]
+    rot = ring[idx[0]:] + ring[:idx[0]]
+    cuts = [i - idx[0] for i in idx] + [len(ring)]
+    closed = rot + [rot[0]]
+    return [closed[a:b + 1] for a, b in zip(cuts[:-1], cuts[1:])]
+
+def _canonical_closed(ring: list) -> tuple[tuple, bool]:
+    """접점 없는 링 → (최소점에서 시작하는 표준 순서, 원래 방향 여부). 뒤집힌 같은 링과 한 arc를 공유"""
+    k = ring.index(min(ring))
+    fwd = ring[k:] + ring[:k]
+    rev = [fwd[0]] + fwd[:0:-1]
+    if fwd <= rev:
+        return tuple(fwd + [fwd[0]]), True
+    return tuple(rev + [rev[0]]), False
+
+def _dp_keep(xy: np.ndarray, tol: float) -> np.ndarray:
+    """Douglas–Peucker 유지 마스크(양 끝점 유지)"""
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        seg = xy[b] - xy[a]
+        pts = xy[a + 1:b] - xy[a]
+        L = math.hypot(seg[0], seg[1])
+        d = (np.abs(seg[0] * pts[:, 1] - seg[1] * pts[:, 0]) / L) if L > 0 else np.hypot(pts[:, 0], pts[:, 1])
+        k = int(np.argmax(d))
+        if d[k] > tol:
+            m = a + 1 + k
+            keep[m] = True
+            stack += [(a, m), (m, b)]
+    return keep
+
+def _simplify_arc(arc: np.ndarray, tol: float) -> np.ndarray:
+    """정수 arc → 단순화 arc. 닫힌 arc는 최소 4점(삼각형)을 남겨 링이 사라지지 않게"""
+    deg = arc * np.array([360.0 / (GEO_QUANT - 1), 180.0 / (GEO_QUANT - 1)])
+    if len(arc) > 2 and (arc[0] == arc[-1]).all():
+        far = int(np.argmax(np.hypot(*(deg - deg[0]).T)))
+        keep = np.zeros(len(arc), dtype=bool)
+        keep[:far + 1] |= _dp_keep(deg[:far + 1], tol)
+        keep[far:] |= _dp_keep(deg[far:], tol)
+        if keep.sum() < 4:
+            seg = deg[far] - deg[0]
+            d = np.abs(seg[0] * (deg[:, 1] - deg[0, 1]) - seg[1] * (deg[:, 0] - deg[0, 0]))
+            d[keep] = -1
+            keep[int(np.argmax(d))] = True
+        return arc[keep]
+    return arc[_dp_keep(deg, tol)]
+
+def _delta(arc: np.ndarray) -> list:
+    d = arc.copy()
+    d[1:] -= arc[:-1]
+    return d.tolist()
+
+def build_world_lod(gj: dict) -> dict:
+    """GeoJSON FeatureCollection → LOD 번들(dict). 지오메트리 참조는 단계 공통, arc 좌표만 단계별"""
+    feats = gj.get("features") or []
+    polys_by_feat = [_polygons_of(f.get("geometry")) for f in feats]
+    junc = _junctions([r for polys in polys_by_feat for rings in polys for r in rings])
+
+    arcs: list = []
+    index: dict = {}
+
+    def ref(points: tuple, forward: bool = True) -> int:
+        if points in index:
+            i = index[points]
+            return i if forward else ~i
+        rev = points[::-1]
+        if rev in index:
+            i = index[rev]
+            return ~i if forward else i
+        index[points] = len(arcs)
+        arcs.append(points)
+        return len(arcs) - 1 if forward else ~(len(arcs) - 1)
+
+    out_feats = []
+    for f, polys in zip(feats, polys_by_feat):
+        enc = []
+        for rings in polys:
+            enc_rings = []
+            for r in rings:
+                pieces = _cut_ring(r, junc)
+                if pieces == [None]:
+                    canon, fwd = _canonical_closed(r)
+                    enc_rings.append([ref(canon, fwd)])
+                else:
+                    enc_rings.append([ref(tuple(p)) for p in pieces])
+            enc.append(enc_rings)
+        out_feats.append({"id": f.get("id"), "properties": f.get("properties") or {}, "arcs": enc})
+
+    np_arcs = [np.array(a, dtype=np.int64) for a in arcs]
+    levels = [[_delta(_simplify_arc(a, tol)) for a in np_arcs] for _, tol in GEO_LOD]
+    return {"format": GEO_FORMAT, "quant": GEO_QUANT, "lod": [list(x) for x in GEO_LOD],
+            "features": out_feats, "arcs": levels}
+
+def write_world_lod(src: str, dst: Path = GEO_ASSET) -> Path:
+    """원본 GeoJSON 파일 → 번들 파일(임시 파일에 쓴 뒤 교체)"""
+    with open(src, encoding="utf-8") as fh:
+        bundle = build_world_lod(json.load(fh))
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_suffix(".tmp")
+    tmp.write_text(json.dumps(bundle, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, dst)
+    return dst
+
+# --------------------- 디코딩(앱) ---------------------
+@lru_cache(maxsize=4)
+def _read_bundle(path: str, mtime_ns: int) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        b = json.load(fh)
+    if b.get("format") != GEO_FORMAT:
+        raise ValueError(f"지원하지 않는 경계 번들 형식: {b.get('format')}")
+    return b
+
+@lru_cache(maxsize=8)
+def _level_arcs(path: str, mtime_ns: int, level: int) -> list:
+    """단계별 arc → 경위도 float 배열(소수 자릿수는 그 단계 오차에 맞춰 반올림 → 지도 payload 축소)"""
+    b = _read_bundle(path, mtime_ns)
+    q = b["quant"] - 1
+    tol = b["lod"][level][1]
+    nd = max(2, int(math.ceil(-math.log10(tol / 10.0))))
+    scale = np.array([360.0 / q, 180.0 / q])
+    offset = np.array([-180.0, -90.0])
+    return [np.round(np.cumsum(np.array(a, dtype=np.int64), axis=0) * scale + offset, nd)
+            for a in b["arcs"][level]]
+
+def _ring_coords(refs: list, arcs: list) -> list:
+    pts: list = []
+    for r in refs:
+        a = arcs[r] if r >= 0 else arcs[~r][::-1]
+        pts.extend(a.tolist() if not pts else a[1:].tolist())
+    dedup = [p for i, p in enumerate(pts) if i == 0 or p != pts[i - 1]]
+    return dedup if len(dedup) >= 4 else []    # 점 3개 미만으로 줄어든 링 = 퇴화
+
+def _feature_polygons(feat: dict, arcs: list) -> list:
+    polys = []
+    for enc_rings in feat["arcs"]:
+        rings = [_ring_coords(r, arcs) for r in enc_rings]
+        if rings and rings[0]:
+            polys.append([rings[0]] + [h for h in rings[1:] if h])
+    return polys
+
+def load_world_lod(level: int = 0, path: Path = GEO_ASSET) -> dict:
+    """번들 → GeoJSON FeatureCollection(해당 단계). 단순화로 다각형이 모두 사라진 국가는 더 세밀한 단계에서"""
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+    b = _read_bundle(str(path), mtime)
+    level = min(max(level, 0), len(b["lod"]) - 1)
+    feats = []
+    for feat in b["features"]:
+        polys = []
+        for lv in range(level, len(b["lod"])):
+            polys = _feature_polygons(feat, _level_arcs(str(path), mtime, lv))
+            if polys:
+                break
+        if not polys:
+            continue
+        geom = ({"type": "Polygon", "coordinates": polys[0]} if len(polys) == 1
+                else {"type": "MultiPolygon", "coordinates": polys})
+        out = {"type": "Feature"}
+        if feat.get("id") is not None:
+            out["id"] = feat["id"]
+        out.update(properties=dict(feat["properties"]), geometry=geom)
+        feats.append(out)
+    return {"type": "FeatureCollection", "features": feats}
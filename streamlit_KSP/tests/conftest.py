@@ -0,0 +1,23 @@
+# 테스트 공용: ksp_core/ksp_geo(앱 폴더)를 import 경로에 + 저장소의 샘플 코퍼스
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(APP_DIR))
+
+SAMPLE_CSV = APP_DIR / "20251014_KSP_82.csv"
+
+
+@pytest.fixture(scope="session")
+def sample_csv() -> Path:
+    return SAMPLE_CSV
+
+
+@pytest.fixture(scope="session")
+def sample_df() -> pd.DataFrame:
+    """샘플 CSV → 앱과 같은 정규화 프레임"""
+    from ksp_core import normalize_frame
+    return normalize_frame(pd.read_csv(SAMPLE_CSV))
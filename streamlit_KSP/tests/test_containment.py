@@ -0,0 +1,44 @@
+# ContainmentFilter(접미사 오토마톤 + 트라이) == 채택어 전체를 도는 부분 문자열 검사
+import random
+
+from ksp_core import ContainmentFilter
+
+
+def _brute_offer(kept: list, term: str) -> bool:
+    if any(term in s or s in term for s in kept):
+        return False
+    kept.append(term)
+    return True
+
+
+def _words(rng: random.Random, alphabet: str, n: int, max_len: int) -> list:
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, max_len))) for _ in range(n)]
+
+
+def test_offer_matches_brute_force():
+    rng = random.Random(0)
+    for alphabet in ("ab", "abc", "가나다 "):
+        for _ in range(200):
+            f, kept = ContainmentFilter(), []
+            for w in _words(rng, alphabet, rng.randint(1, 30), 7):
+                assert f.offer(w) == _brute_offer(kept, w), (kept, w)
+            assert f.terms == kept
+
+
+def test_within_and_covers():
+    rng = random.Random(1)
+    for _ in range(200):
+        f = ContainmentFilter()
+        kept = _words(rng, "abc", rng.randint(1, 8), 6)
+        for w in kept:
+            f.add(w)
+        for q in _words(rng, "abc", 40, 8):
+            assert f.within(q) == any(q in s for s in kept)
+            assert f.covers(q) == any(s in q for s in kept)
+
+
+def test_empty_filter():
+    f = ContainmentFilter()
+    assert not f.within("x") and not f.covers("x")
+    assert f.offer("디지털 정부") and not f.offer("디지털") and not f.offer("디지털 정부 혁신")
+    assert len(f) == 1
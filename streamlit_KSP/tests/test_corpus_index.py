@@ -0,0 +1,86 @@
+# CorpusIndex: 증분 sync / 번들 채택 결과 == 새 인덱스에서 한 번에 sync
+import numpy as np
+import pandas as pd
+import pytest
+
+from ksp_core import TOKEN_VOCAB, CorpusIndex, CountryIncidence, country_bridge, row_digests, write_bundle
+
+
+def _state(view) -> dict:
+    """뷰 → 비교용 파이썬 값(어휘 id 순서는 만든 경로마다 다르므로 문자열로 풀어서)"""
+    tok = view.tokens
+    seqs = {}
+    for kind in list(TOKEN_VOCAB) + ["term_breaks"]:
+        ptr, ids = np.asarray(tok.ptr[kind]), np.asarray(tok.ids[kind]).tolist()
+        voc = tok.vocab[TOKEN_VOCAB[kind]] if kind in TOKEN_VOCAB else None
+        seqs[kind] = [[voc[j] if voc is not None else j for j in ids[a:b]] for a, b in zip(ptr[:-1], ptr[1:])]
+    return {
+        "countries": list(view.countries), "years": list(view.years),
+        "docs_per_year": dict(view.docs_per_year),
+        "kw_doc": {y: dict(c) for y, c in view.kw_doc.items() if c},
+        "class_docs": dict(view.class_docs), "n_text_docs": view.n_text_docs,
+        "year_ptr": np.asarray(view.year_ptr).tolist(), "year_vals": np.asarray(view.year_vals).tolist(),
+        "has_text": np.asarray(view.has_text, dtype=bool).tolist(), "tokens": seqs,
+    }
+
+
+def _fresh(df: pd.DataFrame) -> dict:
+    return _state(CorpusIndex().sync(df))
+
+
+def _edited(df: pd.DataFrame) -> pd.DataFrame:
+    """행 삭제 + 중복 행 + 본문 수정 + 순서 바꿈"""
+    out = pd.concat([df.iloc[5:], df.iloc[:3]], ignore_index=True)
+    out.loc[0, "요약"] = "라틴 아메리카 지역의 전자조달 시스템. 비용 절감"
+    return out.iloc[::-1].reset_index(drop=True)
+
+
+def test_delta_sync_matches_fresh_build(sample_df):
+    idx = CorpusIndex()
+    idx.sync(sample_df.iloc[:40])
+    assert _state(idx.sync(sample_df)) == _fresh(sample_df)
+    edited = _edited(sample_df)
+    assert _state(idx.sync(edited)) == _fresh(edited)
+    assert _state(idx.sync(sample_df.iloc[10:20])) == _fresh(sample_df.iloc[10:20])
+    assert _state(idx.sync(sample_df)) == _fresh(sample_df)
+
+
+def test_bundle_adoption_matches_fresh_build(sample_df, tmp_path):
+    idx = CorpusIndex()
+    digests = row_digests(sample_df)
+    idx.sync(sample_df, digests=digests)
+    write_bundle(idx, sample_df, root=tmp_path, digests=digests)
+
+    same = CorpusIndex(bundle_root=tmp_path)
+    assert _state(same.sync(sample_df)) == _fresh(sample_df)
+    assert same._base is not None                    # 번들에서 출발했는지
+
+    edited = _edited(sample_df)
+    delta = CorpusIndex(bundle_root=tmp_path)
+    assert _state(delta.sync(edited)) == _fresh(edited)
+    assert delta._base is not None
+
+
+@pytest.mark.parametrize("dup_keys", [False, True])
+def test_counts_by_year_matches_per_year_masks(dup_keys):
+    rng = np.random.default_rng(0)
+    isos = [("KOR", "Korea", "한국"), ("VNM", "Vietnam", "베트남"), ("GHA", "Ghana", "가나"), ("PER", "Peru", "페루")]
+    for _ in range(30):
+        n = int(rng.integers(1, 60))
+        countries = [tuple(isos[j] for j in rng.choice(len(isos), int(rng.integers(0, 3)), replace=True))
+                     for _ in range(n)]
+        years = [tuple(int(y) for y in rng.choice([2014, 2015, 2016, 2020], int(rng.integers(0, 3))))
+                 for _ in range(n)]
+        keys = [None if rng.random() < 0.1 else f"f{int(rng.integers(0, n // 2 + 1)) if dup_keys else i}"
+                for i in range(n)]
+        inc = CountryIncidence(country_bridge(countries), n, keys)
+        ptr = np.r_[0, np.cumsum([len(y) for y in years])].astype(np.int64)
+        vals = np.array([y for ys in years for y in ys], dtype=np.int64)
+        mask = rng.random(n) < 0.7
+        for m in (None, mask):
+            ys, mat = inc.counts_by_year(ptr, vals, m)
+            assert ys == sorted({y for t in years for y in t})
+            for yi, y in enumerate(ys):
+                in_year = np.array([y in t for t in years])
+                ref = inc.counts(in_year if m is None else in_year & m)
+                assert mat[yi].tolist() == ref.tolist()
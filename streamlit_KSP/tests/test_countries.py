@@ -0,0 +1,47 @@
+# 국가 트라이 해석기: 표의 모든 이름이 자기 ISO3로, 여러 나라가 섞인 셀은 등장 순서대로
+import random
+
+import pytest
+
+from ksp_core import COUNTRY_ALIASES, COUNTRY_MAP, countries_by_row, countries_of
+
+
+def _iso(text) -> list:
+    return [c[0] for c in countries_of(text)]
+
+
+@pytest.mark.parametrize("key", sorted(COUNTRY_MAP))
+def test_every_table_name_resolves_to_itself(key):
+    iso, en, ko = COUNTRY_MAP[key]
+    for text in (key, en, ko, iso, key + "의", f"및 {key}에서 ", f"Project in {en}, 2019"):
+        assert _iso(text) == [iso], text
+
+
+@pytest.mark.parametrize("alias", sorted(COUNTRY_ALIASES))
+def test_aliases(alias):
+    assert _iso(alias) == [COUNTRY_ALIASES[alias]]
+
+
+@pytest.mark.parametrize("text, want", [
+    ("Guinea-Bissau", ["GNB"]), ("Guinea Bissau", ["GNB"]), ("기니비사우", ["GNB"]), ("기니-비사우", ["GNB"]),
+    ("기니", ["GIN"]), ("Guinea", ["GIN"]), ("Equatorial Guinea", ["GNQ"]), ("Papua New Guinea", ["PNG"]),
+    ("Niger", ["NER"]), ("Nigeria", ["NGA"]), ("Dominica", ["DMA"]), ("Dominican Republic", ["DOM"]),
+    ("India", ["IND"]), ("Indonesia", ["IDN"]), ("Viet Nam", ["VNM"]), ("라오스·캄보디아 등", ["LAO", "KHM"]),
+    ("가나다라", []), ("우간다", ["UGA"]), ("", []),
+])
+def test_known_cells(text, want):
+    assert _iso(text) == want
+
+
+def test_mixed_cells_keep_order():
+    rng = random.Random(0)
+    names = [(k, v[0]) for k, v in COUNTRY_MAP.items()] + [(v[1], v[0]) for v in COUNTRY_MAP.values()]
+    for _ in range(500):
+        picks = rng.sample(names, rng.randint(1, 4))
+        text = rng.choice([", ", " / ", "·", " 및 "]).join(n for n, _ in picks)
+        assert _iso(text) == [iso for _, iso in picks], text
+
+
+def test_countries_by_row_handles_missing():
+    rows = countries_by_row(["가나", None, float("nan"), "가나", "Peru"])
+    assert [[c[0] for c in r] for r in rows] == [["GHA"], [], [], ["GHA"], ["PER"]]
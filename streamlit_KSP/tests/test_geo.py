@@ -0,0 +1,73 @@
+# 경계 LOD 번들: 이웃 국가가 같은 arc를 공유하고, 어느 단계로 복원해도 국경에 틈이 없다
+import json
+import math
+
+import pytest
+
+from ksp_geo import GEO_LOD, build_world_lod, load_world_lod, write_world_lod
+
+
+def _border(n: int = 400) -> list:
+    """x ≈ 0 근처에서 구불거리는 국경(위 → 아래 방향 아님, 아래 → 위)"""
+    return [[round(0.8 * math.sin(k / 7.0) + 0.2 * math.sin(k / 1.3), 6), -10.0 + 20.0 * k / (n - 1)]
+            for k in range(n)]
+
+
+def _world() -> dict:
+    b = _border()
+    west = [[-20.0, -10.0]] + b + [[-20.0, 10.0], [-20.0, -10.0]]
+    east = [b[0], [20.0, -10.0], [20.0, 10.0]] + b[::-1]
+    lake = [[-12.0, -2.0], [-8.0, -2.0], [-8.0, 2.0], [-12.0, 2.0], [-12.0, -2.0]]   # 서쪽 나라 안 호수(구멍)
+    isle = [[30.0, 0.0], [31.0, 0.0], [31.0, 1.0], [30.0, 1.0], [30.0, 0.0]]
+    feat = lambda iso, geom: {"type": "Feature", "id": iso, "properties": {"name": iso}, "geometry": geom}
+    return {"type": "FeatureCollection", "features": [
+        feat("WST", {"type": "Polygon", "coordinates": [west, lake]}),
+        feat("EST", {"type": "MultiPolygon", "coordinates": [[east], [isle]]}),
+        feat("NUL", None),
+    ]}
+
+
+@pytest.fixture(scope="module")
+def bundle_path(tmp_path_factory):
+    d = tmp_path_factory.mktemp("geo")
+    src = d / "world.json"
+    src.write_text(json.dumps(_world()), encoding="utf-8")
+    return write_world_lod(str(src), d / "world_lod.json")
+
+
+def test_neighbours_share_one_arc():
+    b = build_world_lod(_world())
+    wst, est = ({abs(r if r >= 0 else ~r) for poly in f["arcs"] for ring in poly for r in ring}
+                for f in b["features"][:2])
+    shared = wst & est
+    assert len(shared) == 1
+    assert len(b["arcs"]) == len(GEO_LOD)
+
+
+def _points(feat: dict) -> set:
+    g = feat["geometry"]
+    polys = [g["coordinates"]] if g["type"] == "Polygon" else g["coordinates"]
+    return {tuple(p) for poly in polys for ring in poly for p in ring}
+
+
+@pytest.mark.parametrize("level", range(len(GEO_LOD)))
+def test_decoded_border_has_no_gaps(bundle_path, level):
+    fc = load_world_lod(level, path=bundle_path)
+    feats = {f["id"]: f for f in fc["features"]}
+    assert set(feats) == {"WST", "EST"}                      # 지오메트리 없는 국가는 빠진다
+    for f in feats.values():
+        g = f["geometry"]
+        polys = [g["coordinates"]] if g["type"] == "Polygon" else g["coordinates"]
+        for poly in polys:
+            for ring in poly:
+                assert ring[0] == ring[-1] and len(ring) >= 4
+    assert len(feats["WST"]["geometry"]["coordinates"]) == 2   # 호수 구멍 유지
+    assert feats["EST"]["geometry"]["type"] == "MultiPolygon"
+
+    # 국경 위 점(x가 ±20이 아닌 구간)은 두 나라가 정확히 같은 좌표열을 쓴다
+    on_border = lambda pts: {p for p in pts if abs(p[0]) < 5 and abs(p[1]) <= 10}
+    west, east = on_border(_points(feats["WST"])), on_border(_points(feats["EST"]))
+    assert west == east
+    assert len(west) >= 2
+    if level < len(GEO_LOD) - 1:                              # 거친 단계는 실제로 단순화됐는지
+        assert len(west) < len(_border())
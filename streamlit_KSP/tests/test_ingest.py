@@ -0,0 +1,74 @@
+# 청크 적재(ingest_chunked) == 한 번에 읽어 normalize_frame — 뒤 청크에서 스키마가 어긋나는 경우 포함
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ksp_core import _restore_missing, ingest_chunked, normalize_frame
+
+
+def _drift_frame(n: int = 1000) -> pd.DataFrame:
+    """첫 청크만 보면 정수/단일 범주/빈 컬럼인데 뒤에서 실수·문자열·범위가 나오는 프레임"""
+    df = pd.DataFrame({
+        "사업명": [f"p{i}" for i in range(n)], "연도": [str(2000 + i % 20) for i in range(n)],
+        "예산": [str(i) for i in range(n)], "비율": [f"{i / 3:.2f}" for i in range(n)],
+        "ICT 유형": ["A"] * n, "메모": [""] * n, "코드": [str(i % 7) for i in range(n)],
+        "요약": [f"요약 {i}. 비용 절감" for i in range(n)],
+    })
+    df.loc[n - 300, "연도"] = "2019-2020"
+    df.loc[n - 400, "예산"] = "12.5"
+    df.loc[n - 200, "비율"] = "n/a"
+    df.loc[n - 100, "메모"] = "hello"
+    df.loc[n - 50, "ICT 유형"] = "B"
+    return df
+
+
+def _values(s: pd.Series) -> list:
+    return [None if pd.isna(v) else v for v in s.astype(object)]
+
+
+def _assert_same(ref: pd.DataFrame, got: pd.DataFrame):
+    assert list(got.columns) == list(ref.columns)
+    assert len(got) == len(ref)
+    for c in ref.columns:
+        a, b = ref[c], got[c]
+        if isinstance(a.dtype, pd.CategoricalDtype):
+            assert isinstance(b.dtype, pd.CategoricalDtype), c
+        else:
+            assert a.dtype.kind == b.dtype.kind, (c, a.dtype, b.dtype)   # int64 ↔ Int64 허용
+        assert _values(a) == _values(b), c
+
+
+@pytest.mark.parametrize("as_file", [False, True])
+def test_csv_chunks_match_read_csv(tmp_path, as_file):
+    data = _drift_frame().to_csv(index=False).encode("utf-8")
+    ref = normalize_frame(pd.read_csv(io.BytesIO(data)))
+    if as_file:
+        (tmp_path / "in.csv").write_bytes(data)
+        src = str(tmp_path / "in.csv")
+    else:
+        src = io.BytesIO(data)
+    out = ingest_chunked(src, ".csv", tmp_path / "out.parquet", chunk_rows=100)
+    _assert_same(ref, _restore_missing(pd.read_parquet(out)))
+
+
+def test_xlsx_chunks_match_read_excel(tmp_path):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "in.xlsx"
+    _drift_frame(600).to_excel(path, index=False)
+    ref = normalize_frame(pd.read_excel(path))
+    out = ingest_chunked(str(path), ".xlsx", tmp_path / "out.parquet", chunk_rows=64)
+    _assert_same(ref, _restore_missing(pd.read_parquet(out)))
+
+
+def test_sample_csv_matches_read_csv(tmp_path, sample_csv, sample_df):
+    out = ingest_chunked(str(sample_csv), ".csv", tmp_path / "out.parquet", chunk_rows=16)
+    _assert_same(sample_df, _restore_missing(pd.read_parquet(out)))
+
+
+def test_header_only_file_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ingest_chunked(io.BytesIO(b"a,b\n"), ".csv", tmp_path / "out.parquet")
+    assert not (tmp_path / "out.parquet").exists()
+    assert np.all([not p.name.endswith(".tmp") for p in tmp_path.iterdir()])
@@ -0,0 +1,79 @@
+# 대비 키워드 토큰열: term_tokens == 명사 필터 결과, phrase_candidates == n-그램 직접 세기
+import math
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import ksp_core
+from ksp_core import _PREDICATE_RE, _vocab_tokens, extract_nouns_korean, phrase_candidates, term_tokens
+
+
+@pytest.mark.parametrize("noun_filter", [True, False])
+def test_term_tokens_match_noun_filter(monkeypatch, noun_filter):
+    monkeypatch.setattr(ksp_core, "USE_NOUN_FILTER", noun_filter)
+    rng = random.Random(0)
+    alphabet = list("가나다보고서는의을를에서으로 .,!?\n()\"'-_3.5abcAB ICT데이터하였습니다 ") + ["nan"]
+    for _ in range(2000):
+        vals = tuple(rng.choice([None, float("nan"), "", "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))])
+                     for _ in range(3))
+        text = " ".join(str(v or "") for v in vals).strip()
+        terms, breaks = term_tokens(vals)
+        assert terms == tuple(_vocab_tokens(extract_nouns_korean(text) if noun_filter else text))
+        assert list(breaks) == sorted(set(breaks)) and all(0 < b < len(terms) for b in breaks)
+
+
+def test_term_breaks_at_punctuation_columns_and_particles():
+    terms, breaks = term_tokens(("비용 절감. 라틴 아메리카", "지역 보고서는 가나의 세제 개혁"))
+    assert terms == ("비용", "절감", "라틴", "아메리카", "지역", "보고서", "가나", "세제", "개혁")
+    assert breaks == (2, 4, 6, 7)
+
+
+def _reference(seqs, brs, vocab, min_count, min_docs, min_npmi) -> list:
+    total = sum(map(len, seqs))
+    uni = Counter(t for s in seqs for t in s)
+    pred = [bool(_PREDICATE_RE.search(w)) for w in vocab]
+
+    def grams(s, b, n):
+        for i in range(len(s) - n + 1):
+            if not any(j in b for j in range(i + 1, i + n)) and not any(pred[t] for t in s[i:i + n]):
+                yield tuple(s[i:i + n])
+
+    c2, c3, docs = Counter(), Counter(), Counter()
+    for s, b in zip(seqs, brs):
+        c2.update(grams(s, set(b), 2)); c3.update(grams(s, set(b), 3))
+        docs.update({g for n in (2, 3) for g in grams(s, set(b), n)})
+    npmi = lambda c, cx, cy: math.log((c / total) / ((cx / total) * (cy / total))) / -math.log(c / total)
+    score = {g: npmi(c, uni[g[0]], uni[g[1]]) for g, c in c2.items() if c >= min_count}
+    score.update({g: min(npmi(c, c2[g[:2]], uni[g[2]]), npmi(c, uni[g[0]], c2[g[1:]]))
+                  for g, c in c3.items() if c >= min_count and c2[g[:2]] >= min_count and c2[g[1:]] >= min_count})
+    return sorted(" ".join(vocab[t] for t in g) for g, s in score.items() if s >= min_npmi and docs[g] >= min_docs)
+
+
+def test_phrase_candidates_match_brute_force():
+    rng = random.Random(1)
+    vocab = ["가", "나", "다", "라", "마", "모색한다", "있는", "전환하", "abc", "권한"]
+    for _ in range(300):
+        seqs = [[rng.randrange(len(vocab)) for _ in range(rng.randint(0, 15))] for _ in range(rng.randint(1, 12))]
+        brs = [sorted(rng.sample(range(1, len(s)), rng.randint(0, len(s) - 1))) if len(s) > 1 else [] for s in seqs]
+        ptr = np.r_[0, np.cumsum([len(s) for s in seqs])]
+        ids = np.array([t for s in seqs for t in s], dtype=np.int32)
+        bptr = np.r_[0, np.cumsum([len(b) for b in brs])]
+        bpos = np.array([p for b in brs for p in b], dtype=np.int32)
+        mc, md, mn = rng.choice([(1, 1, -1.0), (2, 1, 0.0), (3, 2, 0.1)])
+        want = _reference(seqs, brs, vocab, mc, md, mn)
+        for buckets in (1 << 10, 4):                        # 작은 해시 표(충돌 다수)도 결과는 같다
+            got, rows, cols = phrase_candidates(ptr, ids, vocab, min_count=mc, min_docs=md, min_npmi=mn,
+                                                buckets=buckets, breaks=(bptr, bpos))
+            assert sorted(got) == want
+            assert len(rows) == len(cols)
+
+
+@pytest.mark.parametrize("tok, pred", [
+    ("모색한다", True), ("하였습니다", True), ("분산되어", True), ("있게", True), ("있는", True), ("복잡한", True),
+    ("전환하", True), ("이는", True), ("권한", False), ("역할", False), ("캐나다", False), ("비용", False),
+    ("모니터링", False), ("koneps", False),
+])
+def test_predicate_tokens(tok, pred):
+    assert bool(_PREDICATE_RE.search(tok)) == pred
@@ -0,0 +1,43 @@
+# year_spans(벡터화 CSR) == 행마다 years_from_span
+import random
+
+import numpy as np
+import pandas as pd
+
+from ksp_core import csr_rows, year_spans, years_from_span, years_csr
+
+
+def _cells(rng: random.Random, n: int) -> list:
+    pieces = ["2014", "2019", "1989", "2036", "2035", "1990", "2021-2023", "2023-2021", "2018 ~ 2020",
+              "(2015)", "2016–2017", "2012—2013", "사업", "기간:", " ", "20", "199", "2020.5"]
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.1:
+            out.append(None)
+        elif r < 0.15:
+            out.append(np.nan)
+        elif r < 0.25:
+            out.append(rng.choice([2014, 1985, 2020.0, np.int64(2030), np.float64(2040.0)]))
+        else:
+            out.append("".join(rng.choice(pieces) for _ in range(rng.randint(0, 5))))
+    return out
+
+
+def test_year_spans_matches_scalar_parser():
+    rng = random.Random(0)
+    for _ in range(20):
+        cells = _cells(rng, 300)
+        ptr, vals = year_spans(pd.Series(cells, dtype=object))
+        assert len(ptr) == len(cells) + 1
+        assert csr_rows(ptr, vals) == [tuple(years_from_span(c)) for c in cells]
+
+
+def test_year_spans_examples():
+    ptr, vals = year_spans(["2025-2026", "2025", None, "2019~2017 (2030)", 2014, "없음"])
+    assert csr_rows(ptr, vals) == [(2025, 2026), (2025,), (), (2017, 2018, 2019, 2030), (2014,), ()]
+
+
+def test_years_csr_round_trip():
+    rows = [(2014, 2015), (), (2020,), ()]
+    assert csr_rows(*years_csr(rows)) == rows